@@ -1,40 +1,124 @@
 """Activity feed endpoints."""
 
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.deps import get_current_active_user, get_optional_user
 from app.models.user import User
+from app.realtime import Message, get_broker, realtime_metrics
 from app.schemas.activity import ActivityFeedResponse
-from app.services.activity_service import ActivityService
+from app.services.activity_service import ActivityService, FeedPage
+from app.services.feed_cache import get_feed_cache
 
 router = APIRouter()
 
 
+def _feed_response(feed: FeedPage, page: int, per_page: int) -> ActivityFeedResponse:
+    """Build a feed response from a page of events."""
+    return ActivityFeedResponse(
+        items=feed.items,
+        total=feed.total,
+        page=page,
+        per_page=per_page,
+        has_more=feed.next_cursor is not None,
+        next_cursor=feed.next_cursor,
+    )
+
+
+def _cached_feed_response(
+    scope: str,
+    page: int,
+    per_page: int,
+    cursor: Optional[str],
+    include_total: bool,
+    load: Callable[[], FeedPage],
+) -> Response:
+    """Serve a feed page, using the pre-rendered first-page cache when possible."""
+    cache = get_feed_cache()
+    cacheable = page == 1 and cursor is None and not include_total
+    if cacheable:
+        body, generation = cache.get(scope, per_page)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+    
+    try:
+        feed = load()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        ) from e
+    
+    body = _feed_response(feed, page, per_page).model_dump_json().encode()
+    if cacheable:
+        cache.set(scope, per_page, body, generation)
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+
+def _sse(message: Message) -> str:
+    """Format a message as a Server-Sent Event."""
+    return f"id: {message.id}\nevent: {message.event}\ndata: {message.data}\n\n"
+
+
+async def _stream_events(scope: str, last_event_id: Optional[int]) -> AsyncIterator[str]:
+    """Replay missed events, then relay live ones until the client goes away."""
+    broker = get_broker()
+    subscription, replay, missed = broker.subscribe(scope, last_event_id)
+    with realtime_metrics.track("sse"):
+        try:
+            yield "retry: 3000\n\n"
+            if missed:
+                # Older events are no longer buffered; the client should refetch the feed
+                yield "event: resync\ndata: {}\n\n"
+            for message in replay:
+                yield _sse(message)
+            realtime_metrics.sent("sse", len(replay))
+            
+            while True:
+                try:
+                    message = await subscription.get(settings.ACTIVITY_STREAM_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    # Too far behind; the client reconnects and resumes via Last-Event-ID
+                    realtime_metrics.dropped("sse")
+                    break
+                yield _sse(message)
+                realtime_metrics.sent("sse")
+        finally:
+            broker.unsubscribe(subscription)
+
+
 @router.get("/", response_model=ActivityFeedResponse)
 def get_activity_feed(
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user),
 ):
     """Get public activity feed."""
     activity_service = ActivityService(db)
-    items, total = activity_service.get_feed(
-        page=page,
-        per_page=per_page,
-        public_only=current_user is None,
-    )
-    
-    return ActivityFeedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_more=(page * per_page) < total,
+    return _cached_feed_response(
+        "public" if current_user is None else "all",
+        page,
+        per_page,
+        cursor,
+        include_total,
+        lambda: activity_service.get_feed(
+            page=page,
+            per_page=per_page,
+            public_only=current_user is None,
+            cursor=cursor,
+            include_total=include_total,
+        ),
     )
 
 
@@ -42,24 +126,56 @@ def get_activity_feed(
 def get_my_activity(
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Get current user's activity."""
     activity_service = ActivityService(db)
-    items, total = activity_service.get_user_activity(
-        user_id=current_user.id,
-        page=page,
-        per_page=per_page,
-    )
+    try:
+        feed = activity_service.get_user_activity(
+            user_id=current_user.id,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        ) from e
     
-    return ActivityFeedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_more=(page * per_page) < total,
-    )
+    return _feed_response(feed, page, per_page)
+
+
+@router.get("/home", response_model=ActivityFeedResponse)
+def get_home_activity(
+    page: int = Query(default=1, ge=1),
+    per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get activity from the current user's teams and projects."""
+    activity_service = ActivityService(db)
+    try:
+        feed = activity_service.get_home_activity(
+            user_id=current_user.id,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        ) from e
+    
+    return _feed_response(feed, page, per_page)
 
 
 @router.get("/user/{user_id}", response_model=ActivityFeedResponse)
@@ -67,24 +183,28 @@ def get_user_activity(
     user_id: int,
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
     db: Session = Depends(get_db),
 ):
     """Get a user's public activity."""
     activity_service = ActivityService(db)
-    items, total = activity_service.get_user_activity(
-        user_id=user_id,
-        page=page,
-        per_page=per_page,
-        public_only=True,
-    )
+    try:
+        feed = activity_service.get_user_activity(
+            user_id=user_id,
+            page=page,
+            per_page=per_page,
+            public_only=True,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        ) from e
     
-    return ActivityFeedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_more=(page * per_page) < total,
-    )
+    return _feed_response(feed, page, per_page)
 
 
 @router.get("/team/{team_id}", response_model=ActivityFeedResponse)
@@ -92,22 +212,25 @@ def get_team_activity(
     team_id: int,
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
     db: Session = Depends(get_db),
 ):
     """Get activity for a team."""
     activity_service = ActivityService(db)
-    items, total = activity_service.get_team_activity(
-        team_id=team_id,
-        page=page,
-        per_page=per_page,
-    )
-    
-    return ActivityFeedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_more=(page * per_page) < total,
+    return _cached_feed_response(
+        f"team:{team_id}",
+        page,
+        per_page,
+        cursor,
+        include_total,
+        lambda: activity_service.get_team_activity(
+            team_id=team_id,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total,
+        ),
     )
 
 
@@ -116,20 +239,36 @@ def get_project_activity(
     project_id: int,
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    include_total: bool = Query(default=False, description="Include an estimated total"),
     db: Session = Depends(get_db),
 ):
     """Get activity for a project."""
     activity_service = ActivityService(db)
-    items, total = activity_service.get_project_activity(
-        project_id=project_id,
-        page=page,
-        per_page=per_page,
+    return _cached_feed_response(
+        f"project:{project_id}",
+        page,
+        per_page,
+        cursor,
+        include_total,
+        lambda: activity_service.get_project_activity(
+            project_id=project_id,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            include_total=include_total,
+        ),
     )
-    
-    return ActivityFeedResponse(
-        items=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        has_more=(page * per_page) < total,
+
+
+@router.get("/stream")
+async def stream_activity(
+    scope: str = Query(default="public", pattern=r"^(public|(user|team|project):\d+)$"),
+    last_event_id: Optional[int] = Header(default=None),
+):
+    """Stream public activity for a scope as Server-Sent Events."""
+    return StreamingResponse(
+        _stream_events(scope, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
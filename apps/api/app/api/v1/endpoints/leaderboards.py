@@ -1,20 +1,60 @@
 """Leaderboard endpoints."""
 
+import hashlib
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.leaderboard import LeaderboardType
 from app.schemas.leaderboard import LeaderboardResponse, LeaderboardEntryRead
-from app.services.leaderboard_service import LeaderboardService
+from app.services.leaderboard_service import (
+    LeaderboardService,
+    monthly_period_key,
+    weekly_period_key,
+)
+from app.services.user_service import UserService
 
 router = APIRouter()
 
 
+def _board_response(request: Request, response: Response, board: LeaderboardResponse):
+    """
+    Attach freshness headers to a board and honour If-None-Match.
+
+    The ETag is derived from the ranked content, so it only changes when the
+    board itself does; `X-Computed-At` reports when the data was computed.
+    """
+    if board.computed_at is None:
+        board.computed_at = min(
+            (entry.computed_at for entry in board.entries),
+            default=datetime.utcnow(),
+        )
+    fingerprint = repr((
+        board.leaderboard_type.value,
+        board.scope_id,
+        board.period_key,
+        [(e.rank, e.user_id, e.xp, e.level, e.username, e.avatar_url) for e in board.entries],
+    ))
+    etag = f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "X-Computed-At": board.computed_at.isoformat(),
+    }
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return board
+
+
 @router.get("/global", response_model=LeaderboardResponse)
 def get_global_leaderboard(
+    request: Request,
+    response: Response,
     limit: int = Query(default=10, le=100),
     db: Session = Depends(get_db),
 ):
@@ -22,6 +62,63 @@ def get_global_leaderboard(
     leaderboard_service = LeaderboardService(db)
     entries = leaderboard_service.get_global_leaderboard(limit=limit)
     
+    return _board_response(request, response, LeaderboardResponse(
+        leaderboard_type=LeaderboardType.GLOBAL,
+        entries=entries,
+        total_count=len(entries),
+    ))
+
+
+@router.get("/global/rank/{user_id}", response_model=LeaderboardEntryRead)
+def get_global_rank(
+    user_id: int,
+    db: Session = Depends(get_db),
+):
+    """Get a user's rank on the global leaderboard."""
+    user = UserService(db).get_by_id(user_id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    
+    leaderboard_service = LeaderboardService(db)
+    entry = leaderboard_service.get_global_rank(user)
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not ranked",
+        )
+    
+    return entry
+
+
+@router.get("/global/around/{user_id}", response_model=LeaderboardResponse)
+def get_global_leaderboard_around(
+    user_id: int,
+    radius: int = Query(default=5, ge=0, le=50),
+    db: Session = Depends(get_db),
+):
+    """Get the users ranked within `radius` places of a user on the global leaderboard."""
+    user = UserService(db).get_by_id(user_id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    
+    leaderboard_service = LeaderboardService(db)
+    entries = leaderboard_service.get_global_around(user, radius=radius)
+    
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not ranked",
+        )
+    
     return LeaderboardResponse(
         leaderboard_type=LeaderboardType.GLOBAL,
         entries=entries,
@@ -31,69 +128,99 @@ def get_global_leaderboard(
 
 @router.get("/weekly", response_model=LeaderboardResponse)
 def get_weekly_leaderboard(
+    request: Request,
+    response: Response,
     limit: int = Query(default=10, le=100),
     db: Session = Depends(get_db),
 ):
     """Get weekly leaderboard."""
+    period_key = weekly_period_key(datetime.utcnow())
     leaderboard_service = LeaderboardService(db)
-    entries, period_key = leaderboard_service.get_weekly_leaderboard(limit=limit)
+    snapshot = leaderboard_service.get_cached_leaderboard(
+        LeaderboardType.WEEKLY,
+        limit=limit,
+        period_key=period_key,
+    )
     
-    return LeaderboardResponse(
+    return _board_response(request, response, LeaderboardResponse(
         leaderboard_type=LeaderboardType.WEEKLY,
         period_key=period_key,
-        entries=entries,
-        total_count=len(entries),
-    )
+        entries=snapshot.entries,
+        total_count=len(snapshot.entries),
+        computed_at=snapshot.computed_at,
+    ))
 
 
 @router.get("/monthly", response_model=LeaderboardResponse)
 def get_monthly_leaderboard(
+    request: Request,
+    response: Response,
     limit: int = Query(default=10, le=100),
     db: Session = Depends(get_db),
 ):
     """Get monthly leaderboard."""
+    period_key = monthly_period_key(datetime.utcnow())
     leaderboard_service = LeaderboardService(db)
-    entries, period_key = leaderboard_service.get_monthly_leaderboard(limit=limit)
+    snapshot = leaderboard_service.get_cached_leaderboard(
+        LeaderboardType.MONTHLY,
+        limit=limit,
+        period_key=period_key,
+    )
     
-    return LeaderboardResponse(
+    return _board_response(request, response, LeaderboardResponse(
         leaderboard_type=LeaderboardType.MONTHLY,
         period_key=period_key,
-        entries=entries,
-        total_count=len(entries),
-    )
+        entries=snapshot.entries,
+        total_count=len(snapshot.entries),
+        computed_at=snapshot.computed_at,
+    ))
 
 
 @router.get("/team/{team_id}", response_model=LeaderboardResponse)
 def get_team_leaderboard(
     team_id: int,
+    request: Request,
+    response: Response,
     limit: int = Query(default=10, le=100),
     db: Session = Depends(get_db),
 ):
     """Get leaderboard for a specific team."""
     leaderboard_service = LeaderboardService(db)
-    entries = leaderboard_service.get_team_leaderboard(team_id=team_id, limit=limit)
+    snapshot = leaderboard_service.get_cached_leaderboard(
+        LeaderboardType.TEAM,
+        limit=limit,
+        scope_id=team_id,
+    )
     
-    return LeaderboardResponse(
+    return _board_response(request, response, LeaderboardResponse(
         leaderboard_type=LeaderboardType.TEAM,
         scope_id=team_id,
-        entries=entries,
-        total_count=len(entries),
-    )
+        entries=snapshot.entries,
+        total_count=len(snapshot.entries),
+        computed_at=snapshot.computed_at,
+    ))
 
 
 @router.get("/project/{project_id}", response_model=LeaderboardResponse)
 def get_project_leaderboard(
     project_id: int,
+    request: Request,
+    response: Response,
     limit: int = Query(default=10, le=100),
     db: Session = Depends(get_db),
 ):
     """Get leaderboard for a specific project (based on quest completions)."""
     leaderboard_service = LeaderboardService(db)
-    entries = leaderboard_service.get_project_leaderboard(project_id=project_id, limit=limit)
+    snapshot = leaderboard_service.get_cached_leaderboard(
+        LeaderboardType.PROJECT,
+        limit=limit,
+        scope_id=project_id,
+    )
     
-    return LeaderboardResponse(
+    return _board_response(request, response, LeaderboardResponse(
         leaderboard_type=LeaderboardType.PROJECT,
         scope_id=project_id,
-        entries=entries,
-        total_count=len(entries),
-    )
+        entries=snapshot.entries,
+        total_count=len(snapshot.entries),
+        computed_at=snapshot.computed_at,
+    ))
@@ -0,0 +1,105 @@
+"""Realtime notification endpoints."""
+
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import decode_token
+from app.models.user import User
+from app.realtime import Subscription, get_broker, notification_channel, realtime_metrics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _authenticate(db: Session, token: Optional[str]) -> Optional[User]:
+    """Resolve an access token to an active user, or None."""
+    payload = decode_token(token) if token else None
+    if payload is None or payload.get("type") != "access" or payload.get("sub") is None:
+        return None
+
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+async def _push_notifications(websocket: WebSocket, subscription: Subscription) -> None:
+    """Forward notifications to the socket, with heartbeats while idle."""
+    while True:
+        try:
+            message = await subscription.get(settings.REALTIME_HEARTBEAT_SECONDS)
+        except TimeoutError:
+            await websocket.send_json({"topic": "heartbeat"})
+            continue
+
+        if message is None:
+            # Too far behind; the client should reconnect and refetch state
+            realtime_metrics.dropped("websocket")
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+
+        await websocket.send_json({
+            "id": message.id,
+            "topic": message.event,
+            "data": json.loads(message.data),
+        })
+        realtime_metrics.sent("websocket")
+
+
+async def _receive_pings(websocket: WebSocket) -> None:
+    """Answer client pings until the client disconnects."""
+    while True:
+        text = await websocket.receive_text()
+        if text == "ping":
+            await websocket.send_json({"topic": "pong"})
+
+
+@router.websocket("/ws")
+async def notifications_socket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    """
+    Push the current user's notifications over a WebSocket.
+
+    Authenticate with `?token=<access token>`. Every frame is JSON with a
+    `topic` (xp_gained, level_up, badge_earned, rank_change, heartbeat or
+    pong) and, for notifications, an `id` and `data`.
+    """
+    user = _authenticate(db, token)
+    user_id = user.id if user else None
+    # End the read so the socket, which may stay open for hours, holds no pooled connection
+    db.rollback()
+
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    broker = get_broker()
+    subscription, _, _ = broker.subscribe(notification_channel(user_id))
+
+    with realtime_metrics.track("websocket"):
+        tasks = {
+            asyncio.create_task(_push_notifications(websocket, subscription)),
+            asyncio.create_task(_receive_pings(websocket)),
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.warning("Notification socket for user %s closed: %r", user_id, error)
+        finally:
+            for task in tasks:
+                task.cancel()
+            broker.unsubscribe(subscription)
@@ -9,11 +9,19 @@ from app.core.database import get_db
 from app.core.deps import get_current_active_user, get_optional_user
 from app.models.user import User
 from app.models.project import ProjectStatus
+from app.models.xp_ledger import XPSource
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectRead
+from app.services.badge_catalog import stat_window
 from app.services.project_service import ProjectService
 from app.services.activity_service import ActivityService
-from app.jobs.gamification_jobs import check_achievements_for_user
+from app.jobs.gamification_jobs import (
+    check_achievements_for_user,
+    mark_leaderboards_dirty,
+    process_achievement_progress,
+    schedule_xp_materialization,
+)
 from app.models.activity import ActivityType
+from app.models.gamification import AchievementTrigger
 
 router = APIRouter()
 
@@ -38,7 +46,6 @@ def list_projects(
 @router.post("/", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
 def create_project(
     project_in: ProjectCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -63,9 +70,7 @@ def create_project(
         project_id=project.id,
     )
     
-    # Check for achievements in background
-    background_tasks.add_task(check_achievements_for_user, db, current_user.id)
-    
+    # No badge requirement counts projects, so there is nothing to check
     return project
 
 
@@ -179,9 +184,18 @@ def publish_project(
     # Award XP and check achievements
     from app.services.user_service import UserService
     user_service = UserService(db)
-    user_service.add_xp(current_user, 50)
-    
-    background_tasks.add_task(check_achievements_for_user, db, current_user.id)
+    xp_change = user_service.apply_xp(current_user, 50, XPSource.PROJECT_PUBLISH, project.id)
+    db.commit()
+    if xp_change is not None:
+        user_service.after_xp_commit(xp_change)
+    schedule_xp_materialization(current_user.id)
+    previous, current = stat_window(xp_change)
+    
+    from app.services.leaderboard_service import LeaderboardService
+    mark_leaderboards_dirty(LeaderboardService(db).boards_affected_by_xp(current_user.id))
+    
+    background_tasks.add_task(check_achievements_for_user, db, current_user.id, previous, current)
+    process_achievement_progress(current_user.id, AchievementTrigger.PROJECT_PUBLISHED)
     
     return published
 
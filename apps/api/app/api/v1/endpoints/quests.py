@@ -1,19 +1,27 @@
 """Quest endpoints."""
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, BackgroundTasks
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.models.user import User
 from app.schemas.quest import QuestCreate, QuestUpdate, QuestRead, QuestCompletionRead
+from app.services.badge_catalog import stat_window
+from app.services.idempotency_service import IdempotencyKeyInUse, IdempotencyService
 from app.services.quest_service import QuestService
-from app.services.user_service import UserService
 from app.services.activity_service import ActivityService
-from app.jobs.gamification_jobs import check_achievements_for_user, recalculate_leaderboards
+from app.services.leaderboard_service import LeaderboardService
+from app.jobs.gamification_jobs import (
+    check_achievements_for_user,
+    mark_leaderboards_dirty,
+    process_achievement_progress,
+    schedule_xp_materialization,
+)
 from app.models.activity import ActivityType
+from app.models.gamification import AchievementTrigger
 
 router = APIRouter()
 
@@ -111,15 +119,47 @@ def update_quest(
     return quest_service.update(quest, quest_in)
 
 
+def _replay(idempotency_service: IdempotencyService, user_id: int, key: str, scope: str) -> Optional[Response]:
+    """Replay the recorded response for an Idempotency-Key, if there is one."""
+    try:
+        record = idempotency_service.get_response(user_id, key, scope)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        ) from e
+    if record is None:
+        return None
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
 @router.post("/{quest_id}/complete", response_model=QuestCompletionRead)
 def complete_quest(
     quest_id: int,
     background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Complete a quest."""
+    """
+    Complete a quest.
+    
+    Send an `Idempotency-Key` header to make retries safe: a repeated key
+    returns the original response instead of completing the quest again.
+    """
     quest_service = QuestService(db)
+    idempotency_service = IdempotencyService(db)
+    scope = quest_service.completion_scope(quest_id)
+    if idempotency_key:
+        replay = _replay(idempotency_service, current_user.id, idempotency_key, scope)
+        if replay is not None:
+            return replay
+    
     quest = quest_service.get_by_id(quest_id)
     
     if not quest:
@@ -134,51 +174,35 @@ def complete_quest(
             detail="Quest is not active",
         )
     
-    # Check if already completed (non-repeatable)
-    if not quest.is_repeatable and quest_service.is_completed_by_user(quest_id, current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Quest already completed",
-        )
-    
     try:
-        completion = quest_service.complete_quest(quest, current_user)
+        result = quest_service.complete_quest(quest, current_user, idempotency_key=idempotency_key)
+    except IdempotencyKeyInUse:
+        # A concurrent request with the same key got there first
+        replay = _replay(idempotency_service, current_user.id, idempotency_key, scope)
+        if replay is not None:
+            return replay
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is already in progress",
+        ) from None
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
-        )
-    
-    # Award XP
-    user_service = UserService(db)
-    user, leveled_up = user_service.add_xp(current_user, quest.xp_reward)
-    
-    # Create activity
-    activity_service = ActivityService(db)
-    activity_service.create_event(
-        user_id=current_user.id,
-        event_type=ActivityType.QUEST_COMPLETED,
-        title=f"{current_user.username} completed quest: {quest.title}",
-        description=f"Earned {quest.xp_reward} XP!",
-        quest_id=quest.id,
-        xp_amount=quest.xp_reward,
+        ) from e
+    
+    # Check achievements in background; affected leaderboards refresh on the
+    # next coalesced scheduler run
+    schedule_xp_materialization(current_user.id)
+    # Under XP_LEDGER_ASYNC the XP is not in this window; the materializer checks it
+    previous, current = stat_window(result.xp_change, (result.quest_count - 1, result.quest_count))
+    background_tasks.add_task(check_achievements_for_user, db, current_user.id, previous, current)
+    process_achievement_progress(current_user.id, AchievementTrigger.QUEST_COMPLETED)
+    mark_leaderboards_dirty(
+        LeaderboardService(db).boards_affected_by_xp(current_user.id, quest=quest)
     )
     
-    # If leveled up, create another activity
-    if leveled_up:
-        activity_service.create_event(
-            user_id=current_user.id,
-            event_type=ActivityType.USER_LEVEL_UP,
-            title=f"{current_user.username} reached level {user.level}!",
-            description=f"🎉 Congratulations on reaching level {user.level}!",
-            xp_amount=0,
-        )
-    
-    # Check achievements and recalculate leaderboards in background
-    background_tasks.add_task(check_achievements_for_user, db, current_user.id)
-    background_tasks.add_task(recalculate_leaderboards, db)
-    
-    return completion
+    return result.completion
 
 
 @router.get("/{quest_id}/status")
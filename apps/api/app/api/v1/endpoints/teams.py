@@ -14,6 +14,8 @@ from app.services.team_service import TeamService
 from app.services.user_service import UserService
 from app.services.activity_service import ActivityService
 from app.models.activity import ActivityType
+from app.models.gamification import AchievementTrigger
+from app.jobs.gamification_jobs import process_achievement_progress
 
 router = APIRouter()
 
@@ -135,11 +137,11 @@ def get_team_members(
         )
     
     members = team_service.get_members(team_id)
+    users = UserService(db).get_many_by_ids(m.user_id for m in members)
     result = []
-    user_service = UserService(db)
     
     for member in members:
-        user = user_service.get_by_id(member.user_id)
+        user = users[member.user_id]
         result.append(TeamMemberRead(
             id=member.id,
             user_id=member.user_id,
@@ -207,6 +209,7 @@ def add_team_member(
         title=f"{user_to_add.username} joined team {team.name}",
         team_id=team.id,
     )
+    process_achievement_progress(user_to_add.id, AchievementTrigger.TEAM_JOINED)
     
     return TeamMemberRead(
         id=membership.id,
@@ -1,6 +1,6 @@
 """User endpoints."""
 
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -8,14 +8,32 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.models.user import User
-from app.schemas.user import UserRead, UserUpdate, UserPublic
+from app.models.user_stats import UserStatCounters
+from app.schemas.user import UserRead, UserUpdate, UserPublic, UserStatsRead
 from app.schemas.gamification import UserBadgeRead, UserAchievementRead
 from app.services.user_service import UserService
 from app.services.gamification_service import GamificationService
+from app.services.user_stats_service import UserStatsService
 
 router = APIRouter()
 
 
+def _stats_read(user_id: int, stats: Optional[UserStatCounters]) -> UserStatsRead:
+    if stats is None:
+        return UserStatsRead(user_id=user_id)
+    return UserStatsRead(
+        user_id=user_id,
+        quest_completions=stats.quest_completions,
+        projects_created=stats.projects_created,
+        projects_published=stats.projects_published,
+        badges=stats.badges,
+        achievements=stats.achievements,
+        streak=stats.streak(),
+        longest_streak=stats.longest_streak,
+        last_active_on=stats.last_active_on,
+    )
+
+
 @router.get("/me", response_model=UserRead)
 def get_current_user_info(
     current_user: User = Depends(get_current_active_user),
@@ -55,6 +73,15 @@ def get_current_user_achievements(
     return gamification_service.get_user_achievements(current_user.id)
 
 
+@router.get("/me/stats", response_model=UserStatsRead)
+def get_current_user_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get current user's stat counters."""
+    return _stats_read(current_user.id, UserStatsService(db).get(current_user.id))
+
+
 @router.get("/{user_id}", response_model=UserPublic)
 def get_user(
     user_id: int,
@@ -109,3 +136,21 @@ def get_user_achievements(
     
     gamification_service = GamificationService(db)
     return gamification_service.get_user_achievements(user_id)
+
+
+@router.get("/{user_id}/stats", response_model=UserStatsRead)
+def get_user_stats(
+    user_id: int,
+    db: Session = Depends(get_db),
+):
+    """Get a user's stat counters."""
+    stats = UserStatsService(db).get(user_id)
+    
+    # Users without a stats row have all counters at zero
+    if stats is None and not UserService(db).get_by_id(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    
+    return _stats_read(user_id, stats)
@@ -10,6 +10,7 @@ from app.api.v1.endpoints import (
     quests,
     leaderboards,
     activity,
+    notifications,
     badges,
     achievements,
     integrations,
@@ -38,6 +39,9 @@ api_router.include_router(leaderboards.router, prefix="/leaderboards", tags=["le
 # Activity Feed
 api_router.include_router(activity.router, prefix="/activity", tags=["activity"])
 
+# Realtime notifications
+api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+
 # Badges
 api_router.include_router(badges.router, prefix="/badges", tags=["badges"])
 
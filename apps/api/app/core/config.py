@@ -36,6 +36,60 @@ class Settings(BaseSettings):
         """Parse CORS origins from comma-separated string."""
         return [origin.strip() for origin in self.CORS_ORIGINS_STR.split(",") if origin.strip()]
 
+    # Leaderboards
+    LEADERBOARD_CACHE_TTL_SECONDS: int = 60  # max age of a served snapshot
+    LEADERBOARD_SNAPSHOT_SIZE: int = 100  # ranks stored per cached board
+    LEADERBOARD_REFRESH_DEBOUNCE_SECONDS: float = 2.0  # quiet period before a refresh
+    LEADERBOARD_MAX_STALENESS_SECONDS: float = 10.0  # refresh at least this often while dirty
+
+    # Badges
+    BADGE_CATALOG_TTL_SECONDS: float = 300.0  # how long a worker reuses its badge rule table
+    BADGE_BACKFILL_CHUNK_SIZE: int = 10000  # users scanned per backfill transaction
+
+    # Achievements
+    ACHIEVEMENT_CATALOG_TTL_SECONDS: float = 300.0  # how long a worker reuses its achievements-by-trigger table
+    ACHIEVEMENT_PROGRESS_DEBOUNCE_SECONDS: float = 0.5  # quiet period before progress is flushed
+    ACHIEVEMENT_PROGRESS_MAX_DELAY_SECONDS: float = 2.0  # max lag of progress counters behind events
+    DAILY_BONUS_XP: int = 10  # XP for the first login of each UTC day
+
+    # XP ledger
+    XP_LEDGER_ASYNC: bool = False  # queue XP in the ledger and materialize balances in batches
+    XP_LEDGER_BATCH_SIZE: int = 1000  # ledger entries applied per transaction
+    XP_LEDGER_DEBOUNCE_SECONDS: float = 0.5  # quiet period before balances are materialized
+    XP_LEDGER_MAX_DELAY_SECONDS: float = 2.0  # max lag of users.xp behind the ledger
+
+    # Idempotency-Key replay
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24  # how long a recorded response is replayed
+
+    # Activity timelines
+    TIMELINE_MAX_ENTRIES: int = 500  # events kept per home timeline
+    TIMELINE_TRIM_PROBABILITY: float = 0.05  # share of fan-outs that trim their recipients' timelines
+    TIMELINE_FANOUT_MAX_TEAM_SIZE: int = 500  # larger teams are merged in at read time
+
+    # Activity storage (monthly partitions on Postgres)
+    ACTIVITY_RETENTION_MONTHS: int = 12  # older events are archived and leave the feeds; 0 keeps all
+    ACTIVITY_PARTITIONS_AHEAD: int = 3  # future monthly partitions kept ready
+    ACTIVITY_ARCHIVE_DIR: str = "archive/activity"  # gzip JSONL exports of archived months
+
+    # Activity feed first-page cache
+    FEED_CACHE_BACKEND: str = "memory"  # "memory" per worker, invalidated over the realtime broker; "redis" shared
+    FEED_CACHE_TTL_SECONDS: float = 30.0
+    FEED_CACHE_MAX_ENTRIES: int = 1000  # in-memory backend only
+
+    # Activity write-behind buffer (events may be lost on a crash while buffered)
+    ACTIVITY_WRITE_BEHIND_ENABLED: bool = False
+    ACTIVITY_WRITE_BEHIND_QUEUE_SIZE: int = 10000  # callers write inline when full
+    ACTIVITY_WRITE_BEHIND_BATCH_SIZE: int = 500
+    ACTIVITY_WRITE_BEHIND_INTERVAL_MS: int = 200
+
+    # Realtime (SSE activity stream and WebSocket notifications)
+    REALTIME_BROKER: str = "memory"  # "memory" for a single node, "redis" to fan out across nodes
+    REALTIME_HEARTBEAT_SECONDS: float = 25.0  # WebSocket heartbeat interval
+    ACTIVITY_STREAM_QUEUE_SIZE: int = 100  # per-connection backlog before it is dropped
+    ACTIVITY_STREAM_REPLAY_SIZE: int = 500  # events kept per channel for Last-Event-ID resume
+    ACTIVITY_STREAM_RESUME_GRACE_SECONDS: float = 60.0  # channels keep publishing this long after their last subscriber leaves
+    ACTIVITY_STREAM_KEEPALIVE_SECONDS: float = 15.0
+
     # AI Providers
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
@@ -1,8 +1,9 @@
 """Database configuration and session management."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import Table, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
 
@@ -28,3 +29,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def upsert_insert(db: Session, table: Table):
+    """
+    Build an INSERT for the session's dialect that supports ON CONFLICT.
+
+    Postgres is the production database; SQLite is used by the test suite.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -3,13 +3,33 @@
 from app.jobs.gamification_jobs import (
     check_achievements_for_user,
     recalculate_leaderboards,
+    mark_leaderboards_dirty,
     award_daily_bonus,
     process_achievement_progress,
+    materialize_xp_balances,
+    schedule_xp_materialization,
+)
+from app.jobs.activity_jobs import (
+    ensure_activity_partitions,
+    archive_activity_partitions,
+)
+from app.jobs.badge_jobs import (
+    BackfillProgress,
+    backfill_badge,
+    backfill_badges,
 )
 
 __all__ = [
     "check_achievements_for_user",
     "recalculate_leaderboards",
+    "mark_leaderboards_dirty",
     "award_daily_bonus",
     "process_achievement_progress",
+    "materialize_xp_balances",
+    "schedule_xp_materialization",
+    "ensure_activity_partitions",
+    "archive_activity_partitions",
+    "BackfillProgress",
+    "backfill_badge",
+    "backfill_badges",
 ]
@@ -0,0 +1,199 @@
+"""Maintenance jobs for partitioned activity storage."""
+
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.activity_service import add_months, is_partitioned, retention_cutoff
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME = re.compile(r"^activity_events_y(\d{4})m(\d{2})$")
+
+# Catches rows for months with no partition yet (migration 006)
+_DEFAULT_PARTITION = "activity_events_default"
+
+# Rows fetched per round trip while exporting a partition
+_EXPORT_BATCH_SIZE = 5000
+
+
+def partition_name(month: datetime) -> str:
+    """Name of the monthly activity_events partition containing `month`."""
+    return f"activity_events_y{month:%Y}m{month:%m}"
+
+
+def ensure_activity_partitions(db: Session, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create monthly partitions from the current month through `months_ahead`.
+
+    No-op unless activity_events is partitioned (Postgres after migration
+    006). Returns the names of the partitions created.
+    """
+    if not is_partitioned(db, cached=False):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.ACTIVITY_PARTITIONS_AHEAD
+
+    created = []
+    current = add_months(datetime.utcnow(), 0)
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            continue
+        _create_partition(db, name, month, add_months(month, 1))
+        db.commit()
+        created.append(name)
+    return created
+
+
+def _create_partition(db: Session, name: str, start: datetime, end: datetime) -> None:
+    """
+    Create the partition for [start, end) in the caller's transaction.
+
+    Postgres refuses to create a partition while the default partition holds
+    rows in its range, so those rows are moved: the default partition is
+    detached, the new one created and filled from it, and the default
+    re-attached, all before the caller commits.
+    """
+    bounds = {"start": start, "end": end}
+    in_range = "created_at >= :start AND created_at < :end"
+    create = text(
+        f"CREATE TABLE {name} PARTITION OF activity_events "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+    has_default = db.execute(
+        text("SELECT to_regclass(:name)"), {"name": _DEFAULT_PARTITION}
+    ).scalar()
+    if not has_default or not db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {_DEFAULT_PARTITION} WHERE {in_range})"), bounds
+    ).scalar():
+        db.execute(create)
+        return
+
+    db.execute(text(f"ALTER TABLE activity_events DETACH PARTITION {_DEFAULT_PARTITION}"))
+    db.execute(create)
+    moved = db.execute(
+        text(f"INSERT INTO {name} SELECT * FROM {_DEFAULT_PARTITION} WHERE {in_range}"), bounds
+    ).rowcount
+    db.execute(text(f"DELETE FROM {_DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    db.execute(text(f"ALTER TABLE activity_events ATTACH PARTITION {_DEFAULT_PARTITION} DEFAULT"))
+    logger.info("Moved %d activity events from %s to %s", moved, _DEFAULT_PARTITION, name)
+
+
+def _monthly_partitions(db: Session) -> List[Tuple[str, datetime, bool, bool]]:
+    """List monthly partition tables as (name, month, attached, detach_pending), oldest first."""
+    rows = db.execute(text(
+        "SELECT c.relname, i.inhparent IS NOT NULL, coalesce(i.inhdetachpending, false) "
+        "FROM pg_class c "
+        "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+        "AND i.inhparent = to_regclass('activity_events') "
+        "WHERE c.relkind = 'r' AND c.relname LIKE 'activity_events_y%'"
+    ))
+    partitions = []
+    for name, attached, detach_pending in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            month = datetime(int(match.group(1)), int(match.group(2)), 1)
+            partitions.append((name, month, attached, detach_pending))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _detach_partition(db: Session, name: str, detach_pending: bool) -> None:
+    """
+    Detach a monthly partition, blocking feed reads as little as Postgres allows.
+
+    DETACH PARTITION CONCURRENTLY only waits for running queries, but it
+    cannot run inside a transaction and Postgres refuses it while the table
+    has a default partition; the plain form is used then. A concurrent
+    detach that was interrupted is completed with FINALIZE.
+    """
+    if detach_pending:
+        mode = " FINALIZE"
+    elif db.execute(text("SELECT to_regclass(:name)"), {"name": _DEFAULT_PARTITION}).scalar():
+        mode = ""
+    else:
+        mode = " CONCURRENTLY"
+    db.commit()
+    with db.get_bind().connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+            text(f"ALTER TABLE activity_events DETACH PARTITION {name}{mode}")
+        )
+
+
+def export_rows_jsonl(rows: Iterable[dict], path: str) -> int:
+    """Write rows to a gzip-compressed JSON Lines file atomically. Returns the row count."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial_path = f"{path}.partial"
+    count = 0
+    with gzip.open(partial_path, "wt", encoding="utf-8") as archive:
+        for row in rows:
+            archive.write(json.dumps(row, default=str))
+            archive.write("\n")
+            count += 1
+    os.replace(partial_path, path)
+    return count
+
+
+def archive_activity_partitions(
+    db: Session,
+    archive_dir: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Detach, export and drop monthly partitions older than the retention window.
+
+    Each month is detached first, so feeds stop reading it at once, then
+    exported to `<archive_dir>/<partition>.jsonl.gz` and dropped. A partition
+    left detached by an interrupted run is picked up by the next one.
+    Returns the names of the partitions archived.
+    """
+    cutoff = retention_cutoff(now)
+    if cutoff is None or not is_partitioned(db, cached=False):
+        return []
+    archive_dir = archive_dir or settings.ACTIVITY_ARCHIVE_DIR
+
+    archived = []
+    for name, month, attached, detach_pending in _monthly_partitions(db):
+        if add_months(month, 1) > cutoff:
+            break
+
+        if attached:
+            _detach_partition(db, name, detach_pending)
+
+        result = db.connection().execution_options(yield_per=_EXPORT_BATCH_SIZE).execute(
+            text(f"SELECT * FROM {name} ORDER BY created_at, id")
+        )
+        path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+        count = export_rows_jsonl((dict(row._mapping) for row in result), path)
+        db.commit()
+
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        logger.info("Archived %d activity events from %s to %s", count, name, path)
+        archived.append(name)
+    return archived
+
+
+def prepare_activity_partitions() -> None:
+    """Create upcoming activity partitions at startup; failures are logged, not raised."""
+    db = SessionLocal()
+    try:
+        created = ensure_activity_partitions(db)
+        if created:
+            logger.info("Created activity partitions: %s", ", ".join(created))
+    except SQLAlchemyError:
+        db.rollback()
+        logger.warning("Could not create activity partitions at startup", exc_info=True)
+    finally:
+        db.close()
@@ -0,0 +1,252 @@
+"""Batch jobs for awarding badges to existing users."""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import exists, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.jobs.gamification_jobs import (
+    check_achievements_for_user,
+    mark_leaderboards_dirty,
+    schedule_xp_materialization,
+)
+from app.models.activity import ActivityType
+from app.models.gamification import Badge, UserBadge
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.leaderboard import LeaderboardType
+from app.models.team import TeamMember
+from app.models.user import User
+from app.models.user_stats import UserStatCounters
+from app.models.xp_ledger import XPSource
+from app.realtime import NotificationTopic, notify
+from app.services.activity_service import ActivityService
+from app.services.badge_catalog import badge_catalog, stat_window
+from app.services.user_service import UserService, XPChange
+from app.services.user_stats_service import UserStatsService
+
+logger = logging.getLogger(__name__)
+
+_users = User.__table__
+_user_badges = UserBadge.__table__
+
+
+class BackfillProgress(NamedTuple):
+    """Where a badge backfill has got to."""
+    badge_id: int
+    position: int  # highest user id processed
+    scanned: int  # users processed so far, across resumed runs
+    awarded: int
+    total_users: int
+
+
+def _requirement_met(badge: Badge):
+    """SQL condition on users that is true when the badge's requirement is met, or None for unknown types."""
+    if badge.requirement_type == "xp_total":
+        return _users.c.xp >= badge.requirement_value
+    if badge.requirement_type == "level":
+        return _users.c.level >= badge.requirement_value
+    if badge.requirement_type == "quest_count":
+        quest_count = (
+            select(UserStatCounters.quest_completions)
+            .where(UserStatCounters.user_id == _users.c.id)
+            .scalar_subquery()
+        )
+        return func.coalesce(quest_count, 0) >= badge.requirement_value
+    return None
+
+
+def backfill_badge(
+    db: Session,
+    badge_id: int,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+    progress: Optional[Callable[[BackfillProgress], None]] = None,
+) -> BackfillProgress:
+    """
+    Award a badge to every active user who already meets its requirement.
+
+    Users are scanned in id order, `chunk_size` at a time. Each chunk is
+    one transaction: an `INSERT INTO user_badges SELECT ... WHERE NOT
+    EXISTS` finds and awards eligible users, then their XP bonuses and
+    BADGE_EARNED events, and USER_LEVEL_UP events for users the bonus
+    levels up, are written in bulk and the checkpoint is saved. Bonus XP
+    then goes through the usual post-commit path: rank index, XP, level-up
+    and rank notifications, and a check of the badges it crossed.
+    An interrupted run resumes after the last committed chunk unless
+    `restart` is set. `progress` is called after every chunk.
+
+    Events are not pushed to live activity streams, so a large backfill
+    does not flood them; cached feed pages are invalidated as usual.
+
+    Like the badge catalog, inactive badges and badges with an unknown
+    requirement type are never awarded: they are logged and skipped.
+    """
+    badge = db.query(Badge).filter(Badge.id == badge_id).first()
+    if badge is None:
+        raise ValueError(f"Badge {badge_id} not found")
+    total_users = db.query(func.count(User.id)).scalar()
+    requirement_met = _requirement_met(badge)
+    if not badge.is_active:
+        logger.warning("Skipping backfill of inactive badge %s", badge.id)
+        return BackfillProgress(badge.id, 0, 0, 0, total_users)
+    if requirement_met is None:
+        logger.warning(
+            "Skipping backfill of badge %s: unknown requirement type %r",
+            badge.id, badge.requirement_type,
+        )
+        return BackfillProgress(badge.id, 0, 0, 0, total_users)
+    chunk_size = chunk_size or settings.BADGE_BACKFILL_CHUNK_SIZE
+
+    name = f"badge_backfill:{badge_id}"
+    checkpoint = db.get(JobCheckpoint, name)
+    if checkpoint is not None and restart:
+        db.delete(checkpoint)
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=name, position=0, processed=0, affected=0)
+        db.add(checkpoint)
+        db.commit()
+
+    user_service = UserService(db)
+    activity_service = ActivityService(db)
+
+    while True:
+        chunk = (
+            select(_users.c.id)
+            .where(_users.c.id > checkpoint.position)
+            .order_by(_users.c.id)
+            .limit(chunk_size)
+            .subquery()
+        )
+        scanned, last_id = db.execute(select(func.count(), func.max(chunk.c.id))).one()
+        if not scanned:
+            break
+
+        now = datetime.utcnow()
+        already_earned = exists().where(
+            _user_badges.c.user_id == _users.c.id,
+            _user_badges.c.badge_id == badge.id,
+        )
+        stmt = upsert_insert(db, _user_badges).from_select(
+            ["user_id", "badge_id", "earned_at"],
+            select(_users.c.id, literal(badge.id), literal(now)).where(
+                _users.c.id > checkpoint.position,
+                _users.c.id <= last_id,
+                _users.c.is_active == True,
+                requirement_met,
+                ~already_earned,
+            ),
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "badge_id"])
+        awarded_ids: List[int] = list(db.scalars(stmt.returning(_user_badges.c.user_id)))
+
+        xp_changes = []
+        events = []
+        if awarded_ids:
+            UserStatsService(db).increment("badges", awarded_ids)
+            if badge.xp_bonus > 0:
+                xp_changes = user_service.apply_xp_to_many(awarded_ids, badge.xp_bonus, XPSource.BADGE, badge.id)
+            usernames = dict(db.execute(
+                select(_users.c.id, _users.c.username).where(_users.c.id.in_(awarded_ids))
+            ).all())
+            rows = [
+                {
+                    "user_id": user_id,
+                    "event_type": ActivityType.BADGE_EARNED,
+                    "title": f"{username} earned the '{badge.name}' badge!",
+                    "description": badge.description,
+                    "badge_id": badge.id,
+                    "xp_amount": badge.xp_bonus,
+                    "is_public": True,
+                    "created_at": now,
+                }
+                for user_id, username in usernames.items()
+            ]
+            rows.extend(
+                {
+                    "user_id": change.user_id,
+                    "event_type": ActivityType.USER_LEVEL_UP,
+                    "title": f"{usernames[change.user_id]} reached level {change.level}!",
+                    "description": f"🎉 Congratulations on reaching level {change.level}!",
+                    "xp_amount": 0,
+                    "is_public": True,
+                    "created_at": now,
+                }
+                for change in xp_changes
+                if change.leveled_up
+            )
+            events = activity_service.insert_events(rows, commit=False)
+
+        checkpoint.position = last_id
+        checkpoint.processed += scanned
+        checkpoint.affected += len(awarded_ids)
+        db.commit()
+
+        _after_chunk_commit(db, badge, awarded_ids, xp_changes)
+        activity_service.invalidate_feed_cache(events)
+
+        state = BackfillProgress(badge.id, checkpoint.position, checkpoint.processed, checkpoint.affected, total_users)
+        logger.info(
+            "Badge %s backfill: %d/%d users scanned, %d awarded",
+            badge.id, state.scanned, total_users, state.awarded,
+        )
+        if progress is not None:
+            progress(state)
+
+    state = BackfillProgress(badge.id, checkpoint.position, checkpoint.processed, checkpoint.affected, total_users)
+    db.delete(checkpoint)
+    db.commit()
+    return state
+
+
+def _after_chunk_commit(db: Session, badge: Badge, awarded_ids: List[int], xp_changes: List[XPChange]) -> None:
+    """Notify newly awarded users, apply their bonus XP changes and refresh rankings it touched."""
+    for user_id in awarded_ids:
+        notify(
+            user_id,
+            NotificationTopic.BADGE_EARNED,
+            badge_id=badge.id,
+            name=badge.name,
+            icon=badge.icon,
+            xp_bonus=badge.xp_bonus,
+        )
+        if badge.xp_bonus > 0:
+            schedule_xp_materialization(user_id)
+    if not xp_changes:
+        return
+
+    user_service = UserService(db)
+    for change in xp_changes:
+        user_service.after_xp_commit(change)
+        check_achievements_for_user(db, change.user_id, *stat_window(change))
+
+    boards = [(LeaderboardType.GLOBAL, None)]
+    boards.extend(
+        (LeaderboardType.TEAM, team_id)
+        for (team_id,) in db.query(TeamMember.team_id)
+        .filter(TeamMember.user_id.in_([change.user_id for change in xp_changes]))
+        .distinct()
+    )
+    mark_leaderboards_dirty(boards)
+
+
+def backfill_badges(
+    db: Session,
+    badge_ids: Optional[List[int]] = None,
+    chunk_size: Optional[int] = None,
+    restart: bool = False,
+    progress: Optional[Callable[[BackfillProgress], None]] = None,
+) -> List[BackfillProgress]:
+    """Backfill the given badges, or every active badge, one after another."""
+    if badge_ids is None:
+        badge_ids = [badge_id for (badge_id,) in db.query(Badge.id).filter(Badge.is_active == True).order_by(Badge.id)]
+    results = [
+        backfill_badge(db, badge_id, chunk_size=chunk_size, restart=restart, progress=progress)
+        for badge_id in badge_ids
+    ]
+    badge_catalog.invalidate()
+    return results
@@ -1,97 +1,253 @@
 """Background jobs for gamification and leaderboards."""
 
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.jobs.scheduler import CoalescingScheduler
+from app.models.gamification import AchievementTrigger
 from app.models.user import User
-from app.models.activity import ActivityType
+from app.models.xp_ledger import XPSource
+from app.services.badge_catalog import UserStats, badge_catalog, stat_window
 from app.services.gamification_service import GamificationService
-from app.services.activity_service import ActivityService
-from app.services.leaderboard_service import LeaderboardService
+from app.services.idempotency_service import IdempotencyService
+from app.services.leaderboard_service import LeaderboardService, period_key_for
+from app.services.user_service import UserService
+from app.services.xp_ledger_service import XPLedgerService
 from app.models.leaderboard import LeaderboardType
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEADERBOARDS = [
+    (LeaderboardType.GLOBAL, None),
+    (LeaderboardType.WEEKLY, None),
+    (LeaderboardType.MONTHLY, None),
+]
+
+SCOPED_LEADERBOARD_TYPES = (LeaderboardType.TEAM, LeaderboardType.PROJECT)
+
 
-def check_achievements_for_user(db: Session, user_id: int):
+def check_achievements_for_user(
+    db: Session,
+    user_id: int,
+    previous: Optional[UserStats] = None,
+    current: Optional[UserStats] = None,
+):
     """
     Background job to check and award badges/achievements for a user.
     
     This is called after quest completions, project publications, etc.
+    `previous` and `current` are the user's stats around the triggering
+    change, captured in its transaction; when given, only badges that
+    change crossed are checked. Without them the whole catalog is.
     """
+    if previous is not None and current is not None and not badge_catalog.eligible(db, current, previous):
+        return
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return
     
-    gamification_service = GamificationService(db)
-    activity_service = ActivityService(db)
+    # Badges, their XP bonuses and activity events are written in one transaction
+    awarded_badges = GamificationService(db).check_and_award_badges(user, previous, current)
     
-    # Check and award badges
-    awarded_badges = gamification_service.check_and_award_badges(user)
+    if any(badge.xp_bonus > 0 for badge in awarded_badges):
+        schedule_xp_materialization(user.id)
+        mark_leaderboards_dirty(LeaderboardService(db).boards_affected_by_xp(user.id))
+
+
+def recalculate_leaderboards(
+    db: Session,
+    boards: Optional[Iterable[Tuple[LeaderboardType, Optional[int]]]] = None,
+):
+    """
+    Background job to recalculate and cache leaderboards.
     
-    for user_badge in awarded_badges:
-        badge = user_badge.badge
-        
-        # Award bonus XP
-        if badge.xp_bonus > 0:
-            user.xp += badge.xp_bonus
-            db.commit()
-        
-        # Create activity event
-        activity_service.create_event(
-            user_id=user.id,
-            event_type=ActivityType.BADGE_EARNED,
-            title=f"{user.username} earned the '{badge.name}' badge!",
-            description=badge.description,
-            badge_id=badge.id,
-            xp_amount=badge.xp_bonus,
+    Recomputes the given (leaderboard_type, scope_id) boards. When none are
+    given, rebuilds the global, weekly and monthly boards plus every team
+    and project board.
+    """
+    leaderboard_service = LeaderboardService(db)
+    now = datetime.utcnow()
+    
+    if boards is None:
+        boards = DEFAULT_LEADERBOARDS
+        scoped = {LeaderboardType.TEAM: None, LeaderboardType.PROJECT: None}
+    else:
+        boards = list(boards)
+        scoped = {
+            leaderboard_type: [scope_id for board_type, scope_id in boards if board_type == leaderboard_type]
+            for leaderboard_type in SCOPED_LEADERBOARD_TYPES
+        }
+        boards = [board for board in boards if board[0] not in SCOPED_LEADERBOARD_TYPES]
+    
+    for leaderboard_type, scope_id in boards:
+        period_key = period_key_for(leaderboard_type, now)
+        entries = leaderboard_service.compute_leaderboard(
+            leaderboard_type,
+            limit=settings.LEADERBOARD_SNAPSHOT_SIZE,
+            scope_id=scope_id,
+            period_key=period_key,
+        )
+        leaderboard_service.cache_leaderboard(
+            leaderboard_type=leaderboard_type,
+            entries=entries,
+            scope_id=scope_id,
+            period_key=period_key,
         )
+    
+    # Team and project boards are ranked set-wise, all scopes in one query
+    for leaderboard_type, scope_ids in scoped.items():
+        if scope_ids is None or scope_ids:
+            leaderboard_service.precompute_scoped_leaderboards(leaderboard_type, scope_ids)
+
+
+def _refresh_dirty_leaderboards(db: Session, dirty: Counter):
+    """Scheduler job: recompute each board marked dirty since the last run."""
+    recalculate_leaderboards(db, boards=list(dirty))
 
 
-def recalculate_leaderboards(db: Session):
+# Coalesces per-board refresh requests from XP changes into batched recomputes
+leaderboard_refresh_scheduler = CoalescingScheduler(
+    _refresh_dirty_leaderboards,
+    debounce_seconds=settings.LEADERBOARD_REFRESH_DEBOUNCE_SECONDS,
+    max_delay_seconds=settings.LEADERBOARD_MAX_STALENESS_SECONDS,
+)
+
+
+def mark_leaderboards_dirty(boards: Iterable[Tuple[LeaderboardType, Optional[int]]]):
+    """Request a refresh of the given boards on the next scheduler run."""
+    for board in boards:
+        leaderboard_refresh_scheduler.mark(board)
+
+
+def materialize_xp_balances(db: Session, dirty: Optional[Counter] = None):
     """
-    Background job to recalculate and cache leaderboards.
+    Add pending XP ledger entries to user balances.
     
-    This can be called periodically or after significant XP changes.
+    Every pending entry is applied, not only those of the users in `dirty`,
+    so entries left behind by a stopped worker are picked up too. XP
+    awards made while XP_LEDGER_ASYNC is on could not check badges, so
+    each batch's balance change is checked here, from its pre-batch to its
+    post-batch balance.
     """
+    changes = XPLedgerService(db).materialize_pending(settings.XP_LEDGER_BATCH_SIZE)
+    
+    for change in changes:
+        check_achievements_for_user(db, change.user_id, *stat_window(change))
+    
     leaderboard_service = LeaderboardService(db)
+    for user_id in {change.user_id for change in changes}:
+        mark_leaderboards_dirty(leaderboard_service.boards_affected_by_xp(user_id))
+
+
+# Coalesces XP awards into batched balance updates while XP_LEDGER_ASYNC is on
+xp_balance_scheduler = CoalescingScheduler(
+    materialize_xp_balances,
+    debounce_seconds=settings.XP_LEDGER_DEBOUNCE_SECONDS,
+    max_delay_seconds=settings.XP_LEDGER_MAX_DELAY_SECONDS,
+)
+
+
+def schedule_xp_materialization(user_id: int):
+    """Request that a user's pending XP is applied on the next aggregator run."""
+    if settings.XP_LEDGER_ASYNC:
+        xp_balance_scheduler.mark(user_id)
+
+
+def apply_pending_xp() -> None:
+    """
+    Apply XP left pending by a previous process; failures are logged, not raised.
+
+    Entries are only left pending while XP_LEDGER_ASYNC is on; otherwise
+    each one is applied as it is written and this does nothing.
+    """
+    if not settings.XP_LEDGER_ASYNC:
+        return
+    db = SessionLocal()
+    try:
+        materialize_xp_balances(db)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.warning("Could not apply pending XP at startup", exc_info=True)
+    finally:
+        db.close()
+
+
+def award_daily_bonus(db: Session, user_id: int) -> bool:
+    """
+    Background job to award the daily login bonus.
+    
+    The first call for a user on each UTC day claims a per-day key, adds
+    DAILY_BONUS_XP and counts a daily_login towards achievements; later
+    calls that day do nothing. Returns whether the bonus was awarded.
+    """
+    day = datetime.utcnow().date()
+    if not IdempotencyService(db).claim(user_id, f"daily-bonus:{day.isoformat()}", "daily_bonus"):
+        db.rollback()
+        return False
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        db.rollback()
+        return False
+    
+    user_service = UserService(db)
+    change = user_service.apply_xp(user, settings.DAILY_BONUS_XP, XPSource.DAILY_BONUS)
+    db.commit()
     
-    # Recalculate global leaderboard
-    global_entries = leaderboard_service.get_global_leaderboard(limit=100)
-    leaderboard_service.cache_leaderboard(
-        leaderboard_type=LeaderboardType.GLOBAL,
-        entries=global_entries,
-    )
-    
-    # Recalculate weekly leaderboard
-    weekly_entries, weekly_key = leaderboard_service.get_weekly_leaderboard(limit=100)
-    leaderboard_service.cache_leaderboard(
-        leaderboard_type=LeaderboardType.WEEKLY,
-        entries=weekly_entries,
-        period_key=weekly_key,
-    )
-    
-    # Recalculate monthly leaderboard
-    monthly_entries, monthly_key = leaderboard_service.get_monthly_leaderboard(limit=100)
-    leaderboard_service.cache_leaderboard(
-        leaderboard_type=LeaderboardType.MONTHLY,
-        entries=monthly_entries,
-        period_key=monthly_key,
-    )
-
-
-def award_daily_bonus(db: Session, user_id: int):
+    if change is not None:
+        user_service.after_xp_commit(change)
+        check_achievements_for_user(db, user_id, *stat_window(change))
+    schedule_xp_materialization(user_id)
+    mark_leaderboards_dirty(LeaderboardService(db).boards_affected_by_xp(user_id))
+    process_achievement_progress(user_id, AchievementTrigger.DAILY_LOGIN)
+    return True
+
+
+def _flush_achievement_progress(db: Session, increments: Counter):
     """
-    Background job to award daily login bonus.
+    Scheduler job: apply the achievement progress counted since the last run.
     
-    This is a placeholder for future implementation.
+    The progress is committed by `advance_achievements`; failures after
+    that are logged here rather than raised, so the scheduler only retries
+    batches that were not applied.
     """
-    # TODO: Implement daily login bonus
-    pass
+    unlocks = GamificationService(db).advance_achievements(increments)
+    
+    try:
+        # Rewards can cross xp_total and level badge thresholds
+        for unlock in unlocks:
+            if unlock.xp_change is not None:
+                check_achievements_for_user(db, unlock.user_id, *stat_window(unlock.xp_change))
+        
+        leaderboard_service = LeaderboardService(db)
+        for user_id in {unlock.user_id for unlock in unlocks if unlock.achievement.xp_reward > 0}:
+            schedule_xp_materialization(user_id)
+            mark_leaderboards_dirty(leaderboard_service.boards_affected_by_xp(user_id))
+    except Exception:
+        db.rollback()
+        logger.exception("Follow-up of %d achievement unlocks failed", len(unlocks))
+
+
+# Coalesces trigger events into one progress upsert per flush window
+achievement_progress_scheduler = CoalescingScheduler(
+    _flush_achievement_progress,
+    debounce_seconds=settings.ACHIEVEMENT_PROGRESS_DEBOUNCE_SECONDS,
+    max_delay_seconds=settings.ACHIEVEMENT_PROGRESS_MAX_DELAY_SECONDS,
+    retry_failed=True,
+)
 
 
-def process_achievement_progress(db: Session, user_id: int, achievement_type: str, progress: int):
+def process_achievement_progress(user_id: int, trigger_event: AchievementTrigger, count: int = 1):
     """
-    Background job to update achievement progress.
+    Count occurrences of a trigger event towards a user's achievements.
     
-    This is a placeholder for more complex achievement tracking.
+    Counts are summed per user and event and applied on the next scheduler
+    run, so a burst of events costs one progress update per counter.
     """
-    # TODO: Implement achievement progress tracking
-    pass
+    achievement_progress_scheduler.mark((user_id, AchievementTrigger(trigger_event).value), count)
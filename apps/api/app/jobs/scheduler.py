@@ -0,0 +1,135 @@
+"""Debounced, coalescing scheduler for background jobs."""
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Callable, Hashable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingScheduler:
+    """
+    Collapses bursts of triggers into a single job run.
+
+    Callers mark keys as dirty; the job runs once with every key marked since
+    the previous run (and how many times each was marked). A run starts
+    after `debounce_seconds` without new marks, but never later than
+    `max_delay_seconds` after the first pending mark, so a steady stream of
+    triggers cannot postpone it forever.
+
+    The job receives its own database session from `session_factory`, so it
+    never shares a request's session. A failed run is logged and its batch
+    dropped, unless `retry_failed` is set: then the batch is marked again
+    and retried on the next run. Only jobs that commit nothing before they
+    can fail should retry, or part of a batch would be applied twice.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[Session, Counter], None],
+        debounce_seconds: float,
+        max_delay_seconds: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+        retry_failed: bool = False,
+    ):
+        self.job = job
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.session_factory = session_factory
+        self.retry_failed = retry_failed
+
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._first_mark_at: Optional[float] = None
+        self._last_mark_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self.runs = 0
+
+    @property
+    def pending(self) -> Counter:
+        """Keys waiting for the next run."""
+        with self._lock:
+            return Counter(self._pending)
+
+    def mark(self, key: Hashable, count: int = 1) -> None:
+        """Mark a key as dirty, scheduling a run if none is pending."""
+        with self._lock:
+            now = time.monotonic()
+            self._pending[key] += count
+            if self._first_mark_at is None:
+                self._first_mark_at = now
+            self._last_mark_at = now
+            if self._timer is None:
+                self._arm(self.debounce_seconds)
+
+    def flush(self) -> None:
+        """Run the job now for anything pending."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch = self._take_pending()
+        self._execute(batch)
+
+    def cancel(self) -> None:
+        """Drop pending keys without running the job."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._take_pending()
+
+    def _arm(self, delay: float) -> None:
+        self._timer = threading.Timer(max(delay, 0.0), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._pending:
+                return
+
+            # Keep waiting while marks are still arriving, up to the deadline
+            now = time.monotonic()
+            quiet_at = self._last_mark_at + self.debounce_seconds
+            deadline = self._first_mark_at + self.max_delay_seconds
+            if now < quiet_at and now < deadline:
+                self._arm(min(quiet_at, deadline) - now)
+                return
+
+            batch = self._take_pending()
+        self._execute(batch)
+
+    def _take_pending(self) -> Counter:
+        batch = self._pending
+        self._pending = Counter()
+        self._first_mark_at = None
+        self._last_mark_at = None
+        return batch
+
+    def _execute(self, batch: Counter) -> None:
+        if not batch:
+            return
+
+        # Runs are serialized so two batches never rewrite the same rows at once
+        with self._run_lock:
+            db = self.session_factory()
+            try:
+                self.job(db, batch)
+                self.runs += 1
+            except Exception:
+                db.rollback()
+                logger.exception("Scheduled job %s failed", getattr(self.job, "__name__", self.job))
+                if self.retry_failed:
+                    for key, count in batch.items():
+                        self.mark(key, count)
+            finally:
+                db.close()
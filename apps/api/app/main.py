@@ -5,14 +5,35 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.jobs.activity_jobs import prepare_activity_partitions
+from app.jobs.gamification_jobs import (
+    achievement_progress_scheduler,
+    apply_pending_xp,
+    leaderboard_refresh_scheduler,
+    xp_balance_scheduler,
+)
+from app.realtime import close_broker, get_broker, realtime_metrics
+from app.services.activity_service import activity_event_writer
+from app.services.feed_cache import get_feed_cache
+from app.services.leaderboard_service import warm_rank_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
+    apply_pending_xp()
+    warm_rank_index()
+    prepare_activity_partitions()
+    if settings.ACTIVITY_WRITE_BEHIND_ENABLED:
+        activity_event_writer.start()
     yield
     # Shutdown
+    activity_event_writer.close()
+    achievement_progress_scheduler.flush()
+    xp_balance_scheduler.flush()
+    leaderboard_refresh_scheduler.flush()
+    close_broker()
 
 
 app = FastAPI(
@@ -41,4 +62,13 @@ app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "version": "0.1.0"}
\ No newline at end of file
+    return {"status": "healthy", "version": "0.1.0"}
+
+@app.get("/metrics")
+async def metrics():
+    """Realtime connection and feed cache metrics for this process."""
+    return {
+        "connections": realtime_metrics.snapshot(),
+        "broker_subscribers": get_broker().subscriber_count(),
+        "feed_cache": get_feed_cache().stats(),
+    }
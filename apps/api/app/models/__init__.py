@@ -5,8 +5,12 @@ from app.models.team import Team, TeamMember, TeamRole
 from app.models.project import Project, ProjectStatus
 from app.models.quest import Quest, QuestCompletion, QuestDifficulty, QuestCategory
 from app.models.gamification import Badge, UserBadge, Achievement, UserAchievement
-from app.models.activity import ActivityEvent, ActivityType
-from app.models.leaderboard import LeaderboardEntry, LeaderboardType
+from app.models.activity import ActivityEvent, ActivityType, TimelineEntry
+from app.models.leaderboard import LeaderboardEntry, LeaderboardSnapshot, LeaderboardType, UserPeriodXP
+from app.models.idempotency import IdempotencyKey
+from app.models.xp_ledger import XPLedgerEntry, XPSource
+from app.models.job_checkpoint import JobCheckpoint
+from app.models.user_stats import UserStatCounters
 
 __all__ = [
     "User",
@@ -25,6 +29,14 @@ __all__ = [
     "UserAchievement",
     "ActivityEvent",
     "ActivityType",
+    "TimelineEntry",
     "LeaderboardEntry",
+    "LeaderboardSnapshot",
     "LeaderboardType",
+    "UserPeriodXP",
+    "IdempotencyKey",
+    "XPLedgerEntry",
+    "XPSource",
+    "JobCheckpoint",
+    "UserStatCounters",
 ]
@@ -3,7 +3,17 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum as SQLEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -73,3 +83,36 @@ class ActivityEvent(Base):
     
     # Relationships
     user = relationship("User", back_populates="activities")
+
+    # On Postgres the table is range-partitioned by month on created_at, with
+    # primary key (id, created_at); see migration 006.
+    # Feeds page newest-first by (created_at, id) within each filter
+    __table_args__ = (
+        Index("ix_activity_events_public_feed", "is_public", "created_at", "id"),
+        Index("ix_activity_events_user_feed", "user_id", "created_at", "id"),
+        Index("ix_activity_events_team_feed", "team_id", "created_at", "id"),
+        Index("ix_activity_events_project_feed", "project_id", "created_at", "id"),
+    )
+
+
+class TimelineEntry(Base):
+    """An event pushed into a user's home timeline (fan-out on write)."""
+
+    __tablename__ = "timeline_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Recipient whose home feed shows the event
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # No foreign key: activity_events may be partitioned or pruned, and a
+    # dangling entry simply drops out of the feed
+    event_id = Column(Integer, nullable=False)
+    
+    # Copied from the event so timelines can be trimmed newest-first
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "event_id", name="uq_timeline_entries_user_event"),
+        Index("ix_timeline_entries_user_recent", "user_id", "created_at", "event_id"),
+    )
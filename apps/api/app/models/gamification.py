@@ -12,6 +12,7 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 
@@ -70,6 +71,10 @@ class UserBadge(Base):
     user = relationship("User", back_populates="badges")
     badge = relationship("Badge", back_populates="user_badges")
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "badge_id", name="uq_user_badges_user_badge"),
+    )
+
 
 class AchievementCategory(str, Enum):
     """Achievement category types."""
@@ -80,6 +85,14 @@ class AchievementCategory(str, Enum):
     LEGENDARY = "legendary"
 
 
+class AchievementTrigger(str, Enum):
+    """Domain events that advance achievement progress."""
+    QUEST_COMPLETED = "quest_completed"
+    PROJECT_PUBLISHED = "project_published"
+    TEAM_JOINED = "team_joined"
+    DAILY_LOGIN = "daily_login"
+
+
 class Achievement(Base):
     """Achievement model - major milestones and accomplishments."""
 
@@ -104,6 +117,10 @@ class Achievement(Base):
     is_secret = Column(Boolean, default=False, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     
+    # Progress tracking: unlocked after `target` occurrences of the trigger event
+    trigger_event = Column(String(50), nullable=True, index=True)  # an AchievementTrigger value
+    target = Column(Integer, default=1, nullable=False)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
@@ -134,3 +151,7 @@ class UserAchievement(Base):
     # Relationships
     user = relationship("User", back_populates="achievements")
     achievement = relationship("Achievement", back_populates="user_achievements")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "achievement_id", name="uq_user_achievements_user_achievement"),
+    )
@@ -0,0 +1,35 @@
+"""Idempotency key model."""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response recorded for a client-supplied Idempotency-Key.
+
+    A row is claimed in the same transaction as the write it protects, so
+    a retry either finds the committed response or waits for the request
+    that is still running. Rows expire after IDEMPOTENCY_KEY_TTL_HOURS.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    scope = Column(String(100), nullable=False)  # the operation the key was used for
+
+    # Recorded response
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
@@ -0,0 +1,19 @@
+"""Job checkpoint model."""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.core.database import Base
+
+
+class JobCheckpoint(Base):
+    """Progress of a resumable batch job, saved with each chunk it commits."""
+
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String(100), primary_key=True)  # e.g. "badge_backfill:12"
+    position = Column(Integer, default=0, nullable=False)  # last key processed
+    processed = Column(Integer, default=0, nullable=False)
+    affected = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
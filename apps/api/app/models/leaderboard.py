@@ -1,7 +1,16 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Integer, String
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum as SQLEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -39,4 +48,37 @@ class LeaderboardEntry(Base):
     computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_leaderboard_entries_board", "leaderboard_type", "scope_id", "period_key", "rank"),
+    )
+
+
+class LeaderboardSnapshot(Base):
+    """When a cached board was last computed, so an empty board is still a cached one."""
+
+    __tablename__ = "leaderboard_snapshots"
+
+    board_key = Column(String(80), primary_key=True)  # "<type>:<scope_id>:<period_key>"
+    computed_at = Column(DateTime, nullable=False)
+
+
+class UserPeriodXP(Base):
+    """XP earned by a user in a weekly or monthly period (incremental rollup)."""
+
+    __tablename__ = "user_period_xp"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_type = Column(SQLEnum(LeaderboardType), nullable=False)  # WEEKLY or MONTHLY
+    period_key = Column(String(20), nullable=False)  # same format as LeaderboardEntry
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    xp = Column(Integer, default=0, nullable=False)
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("period_type", "period_key", "user_id", name="uq_user_period_xp_user"),
+        Index("ix_user_period_xp_board", "period_type", "period_key", "xp"),
+    )
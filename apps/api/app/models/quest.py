@@ -7,9 +7,11 @@ from sqlalchemy import (
     DateTime,
     Enum as SQLEnum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    false,
 )
 from sqlalchemy.orm import relationship
 
@@ -75,6 +77,20 @@ class QuestCompletion(Base):
     completed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     xp_earned = Column(Integer, nullable=False)
 
+    # Copied from the quest when completed; only one-off completions are unique
+    is_repeatable = Column(Boolean, default=False, nullable=False)
+
     # Relationships
     quest = relationship("Quest", back_populates="completions")
-    user = relationship("User", back_populates="quest_completions")
\ No newline at end of file
+    user = relationship("User", back_populates="quest_completions")
+
+    __table_args__ = (
+        Index(
+            "uq_quest_completions_once",
+            "quest_id",
+            "user_id",
+            unique=True,
+            postgresql_where=is_repeatable == false(),
+            sqlite_where=is_repeatable == false(),
+        ),
+    )
\ No newline at end of file
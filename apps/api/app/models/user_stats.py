@@ -0,0 +1,42 @@
+"""Materialized per-user stat counters."""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer
+
+from app.core.database import Base
+
+
+class UserStatCounters(Base):
+    """
+    Running totals for one user, kept in step with the rows they count.
+
+    Every write that changes a counted table updates this row in the same
+    transaction, so badge checks and profiles read one row by primary key
+    instead of counting. A user without a row has all counters at zero.
+    `repair_user_stats` rebuilds rows from the source tables.
+    """
+
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    quest_completions = Column(Integer, default=0, nullable=False)
+    projects_created = Column(Integer, default=0, nullable=False)
+    projects_published = Column(Integer, default=0, nullable=False)
+    badges = Column(Integer, default=0, nullable=False)
+    achievements = Column(Integer, default=0, nullable=False)
+
+    # Consecutive UTC days with a quest completion, ending at last_active_on
+    current_streak = Column(Integer, default=0, nullable=False)
+    longest_streak = Column(Integer, default=0, nullable=False)
+    last_active_on = Column(Date, nullable=True)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def streak(self, today: Optional[date] = None) -> int:
+        """The current streak, or 0 once a whole day has passed without activity."""
+        today = today or datetime.utcnow().date()
+        if self.last_active_on is None or self.last_active_on < today - timedelta(days=1):
+            return 0
+        return self.current_streak
@@ -0,0 +1,49 @@
+"""XP ledger model."""
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Index, Integer
+
+from app.core.database import Base
+
+
+class XPSource(str, Enum):
+    """What an XP ledger entry was earned for."""
+    QUEST_COMPLETION = "quest_completion"  # source_id: quest_completions.id
+    BADGE = "badge"  # source_id: badges.id
+    PROJECT_PUBLISH = "project_publish"  # source_id: projects.id
+    ACHIEVEMENT = "achievement"  # source_id: achievements.id
+    DAILY_BONUS = "daily_bonus"
+    OPENING_BALANCE = "opening_balance"  # XP held before the ledger existed
+    ADJUSTMENT = "adjustment"
+
+
+class XPLedgerEntry(Base):
+    """
+    Append-only record of every XP change.
+
+    `users.xp` is the sum of a user's applied entries. Entries written while
+    XP_LEDGER_ASYNC is on start with applied_at NULL and are added to the
+    balance in batches by the XP aggregator.
+    """
+
+    __tablename__ = "xp_ledger"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    source_type = Column(SQLEnum(XPSource), nullable=False)
+    source_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    applied_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_xp_ledger_user", "user_id", "id"),
+        Index(
+            "ix_xp_ledger_pending",
+            "id",
+            postgresql_where=applied_at.is_(None),
+            sqlite_where=applied_at.is_(None),
+        ),
+    )
@@ -0,0 +1,62 @@
+"""Realtime pub/sub for live activity and notifications."""
+
+from app.core.config import settings
+from app.realtime.base import Broker, Message, Subscription
+from app.realtime.memory_broker import InMemoryBroker
+from app.realtime.metrics import ConnectionMetrics, realtime_metrics
+from app.realtime.notifications import (
+    NOTIFICATION_CHANNEL_PREFIX,
+    NotificationTopic,
+    notification_channel,
+    notify,
+)
+
+_broker = None
+
+
+def get_broker() -> Broker:
+    """Get the process-wide broker configured by REALTIME_BROKER, creating it on first use."""
+    global _broker
+    if _broker is None:
+        if settings.REALTIME_BROKER == "redis":
+            from app.realtime.redis_broker import RedisBroker
+
+            _broker = RedisBroker(
+                redis_url=settings.REDIS_URL,
+                queue_size=settings.ACTIVITY_STREAM_QUEUE_SIZE,
+                replay_size=settings.ACTIVITY_STREAM_REPLAY_SIZE,
+                unbuffered_prefixes=(NOTIFICATION_CHANNEL_PREFIX,),
+            )
+        elif settings.REALTIME_BROKER == "memory":
+            _broker = InMemoryBroker(
+                queue_size=settings.ACTIVITY_STREAM_QUEUE_SIZE,
+                replay_size=settings.ACTIVITY_STREAM_REPLAY_SIZE,
+                idle_grace_seconds=settings.ACTIVITY_STREAM_RESUME_GRACE_SECONDS,
+                unbuffered_prefixes=(NOTIFICATION_CHANNEL_PREFIX,),
+            )
+        else:
+            raise ValueError(f"Unknown realtime broker: {settings.REALTIME_BROKER}")
+    return _broker
+
+
+def close_broker() -> None:
+    """Close the process-wide broker, if one was created."""
+    global _broker
+    if _broker is not None:
+        _broker.close()
+        _broker = None
+
+
+__all__ = [
+    "Broker",
+    "Message",
+    "Subscription",
+    "InMemoryBroker",
+    "ConnectionMetrics",
+    "realtime_metrics",
+    "NotificationTopic",
+    "notification_channel",
+    "notify",
+    "get_broker",
+    "close_broker",
+]
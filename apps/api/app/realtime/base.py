@@ -0,0 +1,121 @@
+"""Base pub/sub broker interface for live updates."""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+class Message(NamedTuple):
+    """A published message; `id` increases monotonically per channel."""
+
+    id: int
+    event: str
+    data: str
+
+
+class Subscription:
+    """
+    A subscriber's bounded inbox on one channel.
+
+    Messages are handed over to the subscriber's event loop. If the
+    subscriber falls `maxsize` messages behind, the backlog is dropped and
+    the subscription is closed; the client reconnects and resumes from its
+    last seen id.
+    """
+
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.channel = channel
+        self.overflowed = False
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: Message) -> bool:
+        """Queue a message from any thread. Returns False if the subscriber's loop is gone."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            return False
+        return True
+
+    async def get(self, timeout: float) -> Optional[Message]:
+        """
+        Wait for the next message.
+
+        Returns None once the subscription has overflowed, and raises
+        TimeoutError if nothing arrives within `timeout` seconds.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def _put(self, message: Message) -> None:
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+
+class Broker(ABC):
+    """Abstract base class for pub/sub brokers."""
+
+    @abstractmethod
+    def publish(self, channel: str, message: Message) -> None:
+        """Publish a message to every subscriber of a channel. Safe to call from any thread."""
+        pass
+
+    @abstractmethod
+    def subscribe(
+        self,
+        channel: str,
+        last_event_id: Optional[int] = None,
+    ) -> Tuple[Subscription, List[Message], bool]:
+        """
+        Subscribe to a channel from within a running event loop.
+
+        Returns the subscription, any buffered messages newer than
+        `last_event_id`, and whether messages may have been missed because
+        they are no longer buffered.
+        """
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to a subscription."""
+        pass
+
+    @abstractmethod
+    def add_listener(self, channel: str, callback: Callable[[Message], None]) -> None:
+        """
+        Call `callback` with every message on a channel, on every node.
+
+        Listeners serve in-process consumers that have no event loop. They
+        run on the publishing or relaying thread, so they must be quick and
+        thread-safe. Listened channels keep no replay buffer.
+        """
+        pass
+
+    @abstractmethod
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        """Count local subscribers on one channel, or on all channels."""
+        pass
+
+    def live_channels(self, channels: Iterable[str]) -> Set[str]:
+        """
+        Get the channels, among `channels`, that someone may be listening on.
+
+        Publishers can skip building messages for the others. By default
+        every channel is assumed live.
+        """
+        return set(channels)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all local subscribers and buffered messages."""
+        pass
+
+    def close(self) -> None:  # noqa: B027 - optional hook, most brokers hold no connections
+        """Release any connections held by the broker."""
+        pass
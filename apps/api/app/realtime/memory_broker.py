@@ -0,0 +1,163 @@
+"""In-process pub/sub broker."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.realtime.base import Broker, Message, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+class _ChannelHistory:
+    """Replay buffer for one channel."""
+
+    __slots__ = ("messages", "evicted_id")
+
+    def __init__(self, size: int):
+        self.messages: Deque[Message] = deque(maxlen=size)
+        # Newest message id that has fallen out of the buffer
+        self.evicted_id: Optional[int] = None
+
+    def append(self, message: Message) -> None:
+        if len(self.messages) == self.messages.maxlen:
+            self.evicted_id = self.messages[0].id
+        self.messages.append(message)
+
+
+class InMemoryBroker(Broker):
+    """
+    Broker that fans messages out to subscribers in this process.
+
+    Each channel keeps the last `replay_size` messages so reconnecting
+    clients can resume. A channel stays live for `idle_grace_seconds` after
+    its last subscriber leaves, long enough for a client to reconnect; after
+    that publishers may skip it and its replay buffer is dropped. Idle
+    subscribers cost one small queue each; no thread or database session is
+    held per subscriber. Channels starting with one of `unbuffered_prefixes`
+    keep no replay buffer at all.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        replay_size: int,
+        max_channels: int = 10000,
+        idle_grace_seconds: float = 60.0,
+        unbuffered_prefixes: Tuple[str, ...] = (),
+    ):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.max_channels = max_channels
+        self.idle_grace_seconds = idle_grace_seconds
+        self.unbuffered_prefixes = unbuffered_prefixes
+
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: "OrderedDict[str, _ChannelHistory]" = OrderedDict()
+        # When each channel lost its last subscriber
+        self._idle_since: Dict[str, float] = {}
+        self._listeners: Dict[str, List[Callable[[Message], None]]] = {}
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Publish a message to every subscriber of a channel. Safe to call from any thread."""
+        with self._lock:
+            listeners = list(self._listeners.get(channel, ()))
+            if not listeners and not channel.startswith(self.unbuffered_prefixes):
+                self._history_for(channel).append(message)
+            subscribers = list(self._subscribers.get(channel, ()))
+
+        for callback in listeners:
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Listener on %s failed", channel)
+        for subscription in subscribers:
+            if not subscription.deliver(message):
+                self.unsubscribe(subscription)
+
+    def subscribe(
+        self,
+        channel: str,
+        last_event_id: Optional[int] = None,
+    ) -> Tuple[Subscription, List[Message], bool]:
+        """Subscribe to a channel, replaying buffered messages after `last_event_id`."""
+        subscription = Subscription(channel, asyncio.get_running_loop(), self.queue_size)
+
+        # Register and snapshot history together so nothing is missed or repeated
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            self._idle_since.pop(channel, None)
+            if last_event_id is None:
+                return subscription, [], False
+            history = self._history.get(channel)
+            if history is None:
+                # Nothing buffered to resume from, so anything after last_event_id is lost
+                return subscription, [], True
+            replay = [message for message in history.messages if message.id > last_event_id]
+            missed = history.evicted_id is not None and history.evicted_id > last_event_id
+        return subscription, replay, missed
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to a subscription."""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+                self._idle_since[subscription.channel] = time.monotonic()
+
+    def add_listener(self, channel: str, callback: Callable[[Message], None]) -> None:
+        """Call `callback` with every message published to a channel in this process."""
+        with self._lock:
+            self._listeners.setdefault(channel, []).append(callback)
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        """Count subscribers on one channel, or on all channels."""
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def live_channels(self, channels: Iterable[str]) -> Set[str]:
+        """
+        Get the channels with subscribers, or whose last one left within the grace period.
+
+        The replay buffers of the other channels are dropped: messages
+        skipped for them would leave gaps, so a resume there reports missed.
+        """
+        cutoff = time.monotonic() - self.idle_grace_seconds
+        live = set()
+        with self._lock:
+            for channel in set(channels):
+                if channel in self._subscribers:
+                    live.add(channel)
+                elif self._idle_since.get(channel, cutoff) > cutoff:
+                    live.add(channel)
+                else:
+                    self._idle_since.pop(channel, None)
+                    self._history.pop(channel, None)
+        return live
+
+    def clear(self) -> None:
+        """Drop all subscribers and buffered messages; listeners stay registered."""
+        with self._lock:
+            self._subscribers.clear()
+            self._history.clear()
+            self._idle_since.clear()
+
+    def _history_for(self, channel: str) -> _ChannelHistory:
+        # Least recently published channels lose their replay buffer first
+        history = self._history.get(channel)
+        if history is None:
+            history = self._history[channel] = _ChannelHistory(self.replay_size)
+            while len(self._history) > self.max_channels:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(channel)
+        return history
@@ -0,0 +1,63 @@
+"""Connection metrics for realtime endpoints."""
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class ConnectionMetrics:
+    """Thread-safe counters of open connections and delivered messages, by kind."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Counter = Counter()
+        self._opened: Counter = Counter()
+        self._sent: Counter = Counter()
+        self._dropped: Counter = Counter()
+
+    @contextmanager
+    def track(self, kind: str) -> Iterator[None]:
+        """Count a connection as open for the duration of the block."""
+        with self._lock:
+            self._active[kind] += 1
+            self._opened[kind] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[kind] -= 1
+
+    def sent(self, kind: str, count: int = 1) -> None:
+        """Record messages delivered to clients."""
+        with self._lock:
+            self._sent[kind] += count
+
+    def dropped(self, kind: str) -> None:
+        """Record a connection closed for falling behind."""
+        with self._lock:
+            self._dropped[kind] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Get current counters per connection kind."""
+        with self._lock:
+            kinds = set(self._opened) | set(self._sent)
+            return {
+                kind: {
+                    "active": self._active[kind],
+                    "opened": self._opened[kind],
+                    "messages_sent": self._sent[kind],
+                    "dropped": self._dropped[kind],
+                }
+                for kind in sorted(kinds)
+            }
+
+    def reset(self) -> None:
+        """Zero every counter."""
+        with self._lock:
+            for counter in (self._active, self._opened, self._sent, self._dropped):
+                counter.clear()
+
+
+# Process-wide realtime metrics
+realtime_metrics = ConnectionMetrics()
@@ -0,0 +1,43 @@
+"""Per-user push notifications (XP, level-ups, badges, achievements, rank changes)."""
+
+import itertools
+import json
+from enum import Enum
+from typing import Any
+
+from app.realtime.base import Message
+
+_message_ids = itertools.count(1)
+
+# Notification sockets never resume, so these channels keep no replay buffer
+NOTIFICATION_CHANNEL_PREFIX = "notifications:"
+
+
+class NotificationTopic(str, Enum):
+    """Notification topics multiplexed over a user's channel."""
+    XP_GAINED = "xp_gained"
+    LEVEL_UP = "level_up"
+    BADGE_EARNED = "badge_earned"
+    ACHIEVEMENT_UNLOCKED = "achievement_unlocked"
+    RANK_CHANGE = "rank_change"
+
+
+def notification_channel(user_id: int) -> str:
+    """Get the broker channel carrying a user's notifications."""
+    return f"{NOTIFICATION_CHANNEL_PREFIX}{user_id}"
+
+
+def notify(user_id: int, topic: NotificationTopic, **data: Any) -> None:
+    """Publish a notification to a user's connected clients, if any are listening."""
+    from app.realtime import get_broker
+
+    broker = get_broker()
+    channel = notification_channel(user_id)
+    if not broker.live_channels([channel]):
+        return
+    message = Message(
+        id=next(_message_ids),
+        event=topic.value,
+        data=json.dumps(data, default=str),
+    )
+    broker.publish(channel, message)
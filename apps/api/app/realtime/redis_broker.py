@@ -0,0 +1,92 @@
+"""Redis pub/sub broker for multi-node deployments."""
+
+import json
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import redis
+
+from app.realtime.base import Broker, Message, Subscription
+from app.realtime.memory_broker import InMemoryBroker
+
+logger = logging.getLogger(__name__)
+
+
+class RedisBroker(Broker):
+    """
+    Broker that relays messages between nodes through Redis pub/sub.
+
+    Publishing goes to Redis only. Every node runs one listener thread that
+    pattern-subscribes to the key prefix and hands each message to a local
+    InMemoryBroker, which owns subscriptions, replay buffers and
+    backpressure. A node therefore holds a single Redis connection for
+    listening, however many clients are connected.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        queue_size: int,
+        replay_size: int,
+        prefix: str = "realtime:",
+        unbuffered_prefixes: Tuple[str, ...] = (),
+    ):
+        self.prefix = prefix
+        self.local = InMemoryBroker(
+            queue_size=queue_size,
+            replay_size=replay_size,
+            unbuffered_prefixes=unbuffered_prefixes,
+        )
+        self._redis = redis.Redis.from_url(redis_url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{f"{prefix}*": self._relay})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Publish a message to subscribers on every node."""
+        payload = json.dumps([message.id, message.event, message.data])
+        try:
+            self._redis.publish(f"{self.prefix}{channel}", payload)
+        except redis.RedisError:
+            # Keep this node's subscribers live while Redis is unavailable
+            logger.exception("Redis publish failed; delivering %s locally only", channel)
+            self.local.publish(channel, message)
+
+    def subscribe(
+        self,
+        channel: str,
+        last_event_id: Optional[int] = None,
+    ) -> Tuple[Subscription, List[Message], bool]:
+        """Subscribe to a channel on this node."""
+        return self.local.subscribe(channel, last_event_id)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering to a subscription."""
+        self.local.unsubscribe(subscription)
+
+    def add_listener(self, channel: str, callback: Callable[[Message], None]) -> None:
+        """Call `callback` with every message on a channel, published on any node."""
+        self.local.add_listener(channel, callback)
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        """Count subscribers connected to this node."""
+        return self.local.subscriber_count(channel)
+
+    def clear(self) -> None:
+        """Drop this node's subscribers and buffered messages."""
+        self.local.clear()
+
+    def close(self) -> None:
+        """Stop the listener thread and release Redis connections."""
+        self._listener.stop()
+        self._pubsub.close()
+        self._redis.close()
+
+    def _relay(self, item: dict) -> None:
+        try:
+            channel = item["channel"].decode()[len(self.prefix):]
+            message_id, event, data = json.loads(item["data"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Dropping malformed realtime message: %r", item)
+            return
+        self.local.publish(channel, Message(message_id, event, data))
@@ -54,7 +54,8 @@ class ActivityFeedResponse(BaseModel):
     """Activity feed response with pagination."""
 
     items: list[ActivityEventRead]
-    total: int
+    total: Optional[int] = None  # Estimated; only returned when include_total is set
     page: int
     per_page: int
     has_more: bool
+    next_cursor: Optional[str] = None
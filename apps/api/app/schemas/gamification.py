@@ -5,7 +5,7 @@ from typing import Optional
 
 from pydantic import BaseModel
 
-from app.models.gamification import BadgeCategory, AchievementCategory
+from app.models.gamification import BadgeCategory, AchievementCategory, AchievementTrigger
 
 
 class BadgeBase(BaseModel):
@@ -66,6 +66,8 @@ class AchievementCreate(AchievementBase):
     xp_reward: int = 50
     rarity_score: int = 100
     is_secret: bool = False
+    trigger_event: Optional[AchievementTrigger] = None
+    target: int = 1
 
 
 class AchievementRead(AchievementBase):
@@ -77,6 +79,8 @@ class AchievementRead(AchievementBase):
     rarity_score: int
     is_secret: bool
     is_active: bool
+    trigger_event: Optional[str] = None
+    target: int
     created_at: datetime
 
     class Config:
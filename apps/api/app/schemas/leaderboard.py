@@ -28,4 +28,5 @@ class LeaderboardResponse(BaseModel):
     scope_id: Optional[int] = None
     period_key: Optional[str] = None
     entries: list[LeaderboardEntryRead]
-    total_count: int
\ No newline at end of file
+    total_count: int
+    computed_at: Optional[datetime] = None
\ No newline at end of file
@@ -1,6 +1,6 @@
 """User schemas."""
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import BaseModel, EmailStr, Field
@@ -57,6 +57,20 @@ class UserPublic(BaseModel):
         from_attributes = True
 
 
+class UserStatsRead(BaseModel):
+    """Schema for a user's stat counters."""
+
+    user_id: int
+    quest_completions: int = 0
+    projects_created: int = 0
+    projects_published: int = 0
+    badges: int = 0
+    achievements: int = 0
+    streak: int = 0
+    longest_streak: int = 0
+    last_active_on: Optional[date] = None
+
+
 class UserLogin(BaseModel):
     """Schema for user login."""
 
@@ -7,6 +7,9 @@ from app.services.quest_service import QuestService
 from app.services.gamification_service import GamificationService
 from app.services.activity_service import ActivityService
 from app.services.leaderboard_service import LeaderboardService
+from app.services.timeline_service import TimelineService
+from app.services.idempotency_service import IdempotencyService
+from app.services.xp_ledger_service import XPLedgerService
 
 __all__ = [
     "UserService",
@@ -16,4 +19,7 @@ __all__ = [
     "GamificationService",
     "ActivityService",
     "LeaderboardService",
+    "TimelineService",
+    "IdempotencyService",
+    "XPLedgerService",
 ]
@@ -0,0 +1,55 @@
+"""Cached table of progress-tracked achievements, keyed by trigger event."""
+
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.gamification import Achievement
+from app.services.catalog_cache import CachedCatalog
+
+
+class AchievementRule(NamedTuple):
+    """The parts of an active achievement needed to track and announce it."""
+    id: int
+    name: str
+    description: str
+    icon: str
+    trigger_event: str
+    target: int
+    xp_reward: int
+
+
+class AchievementCatalog(CachedCatalog[Dict[str, List[AchievementRule]]]):
+    """
+    Active achievements grouped by trigger event, cached per process.
+
+    Progress updates read the cached groups, not the achievements table.
+    Achievements without a trigger are not tracked here.
+    """
+
+    def for_trigger(self, db: Session, trigger_event: str) -> List[AchievementRule]:
+        """Achievements advanced by an occurrence of `trigger_event`."""
+        return self._load(db).get(trigger_event, [])
+
+    def _build(self, db: Session) -> Dict[str, List[AchievementRule]]:
+        grouped: Dict[str, List[AchievementRule]] = defaultdict(list)
+        achievements = db.query(
+            Achievement.id,
+            Achievement.name,
+            Achievement.description,
+            Achievement.icon,
+            Achievement.trigger_event,
+            Achievement.target,
+            Achievement.xp_reward,
+        ).filter(
+            Achievement.is_active == True,
+            Achievement.trigger_event.isnot(None),
+        ).order_by(Achievement.id)
+        for row in achievements:
+            grouped[row.trigger_event].append(AchievementRule(*row))
+        return dict(grouped)
+
+
+achievement_catalog = AchievementCatalog(settings.ACHIEVEMENT_CATALOG_TTL_SECONDS)
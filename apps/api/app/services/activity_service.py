@@ -1,12 +1,135 @@
 """Activity service for managing activity events."""
 
-from typing import List, Optional, Tuple
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, text, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
 
+from app.core.config import settings
 from app.models.activity import ActivityEvent, ActivityType
 from app.models.user import User
+from app.realtime import Message, get_broker
 from app.schemas.activity import ActivityEventCreate, ActivityEventRead
+from app.services.activity_writer import ActivityEventWriter
+from app.services.feed_cache import get_feed_cache
+from app.services.timeline_service import TimelineService
+
+# Exactly the columns ActivityEventRead needs, author included
+_FEED_COLUMNS = (
+    ActivityEvent.id,
+    ActivityEvent.event_type,
+    ActivityEvent.title,
+    ActivityEvent.description,
+    ActivityEvent.user_id,
+    User.username,
+    User.avatar_url.label("user_avatar_url"),
+    ActivityEvent.project_id,
+    ActivityEvent.team_id,
+    ActivityEvent.quest_id,
+    ActivityEvent.badge_id,
+    ActivityEvent.achievement_id,
+    ActivityEvent.xp_amount,
+    ActivityEvent.is_public,
+    ActivityEvent.created_at,
+)
+
+# Events that are always written before create_event returns, never buffered
+DURABLE_EVENT_TYPES = frozenset({
+    ActivityType.USER_LEVEL_UP,
+    ActivityType.BADGE_EARNED,
+    ActivityType.ACHIEVEMENT_UNLOCKED,
+})
+
+
+class FeedPage(NamedTuple):
+    """One page of an activity feed."""
+
+    items: List[ActivityEventRead]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(event) -> str:
+    """Encode an event's (created_at, id) position as an opaque cursor."""
+    raw = f"{event.created_at.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a feed cursor, raising ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, event_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(event_id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """First instant of the month `months` after the one containing `moment`."""
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Oldest event time still served by feeds, or None if retention is off.
+
+    Aligned to a month boundary so it matches the monthly partitions that
+    the archive job detaches.
+    """
+    if settings.ACTIVITY_RETENTION_MONTHS <= 0:
+        return None
+    return add_months(now or datetime.utcnow(), -settings.ACTIVITY_RETENTION_MONTHS)
+
+
+# Whether activity_events is partitioned, per engine; only migrations change it
+_partitioned: Dict[Engine, bool] = {}
+
+
+def is_partitioned(db: Session, cached: bool = True) -> bool:
+    """
+    Whether activity_events is partitioned (Postgres after migration 006).
+
+    Feeds use the answer cached for the process; maintenance jobs pass
+    `cached=False` to ask the catalog again.
+    """
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        return False
+    if cached and engine in _partitioned:
+        return _partitioned[engine]
+    partitioned = _partitioned[engine] = bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('activity_events')"
+    )).scalar())
+    return partitioned
+
+
+def stream_channels(event: ActivityEvent) -> List[str]:
+    """Get the live stream channels an event is published to."""
+    channels = ["public", f"user:{event.user_id}"]
+    if event.team_id:
+        channels.append(f"team:{event.team_id}")
+    if event.project_id:
+        channels.append(f"project:{event.project_id}")
+    return channels
+
+
+def feed_cache_scopes(event: ActivityEvent) -> List[str]:
+    """Get the cached feed scopes whose first page an event changes."""
+    scopes = ["all"]
+    if event.is_public:
+        scopes.append("public")
+        if event.team_id:
+            scopes.append(f"team:{event.team_id}")
+        if event.project_id:
+            scopes.append(f"project:{event.project_id}")
+    return scopes
 
 
 class ActivityService:
@@ -29,50 +152,141 @@ class ActivityService:
         metadata: Optional[str] = None,
         xp_amount: int = 0,
         is_public: bool = True,
-    ) -> ActivityEvent:
-        """Create a new activity event."""
-        event = ActivityEvent(
-            user_id=user_id,
-            event_type=event_type,
-            title=title,
-            description=description,
-            project_id=project_id,
-            team_id=team_id,
-            quest_id=quest_id,
-            badge_id=badge_id,
-            achievement_id=achievement_id,
-            metadata=metadata,
-            xp_amount=xp_amount,
-            is_public=is_public,
-        )
-        self.db.add(event)
+        durable: bool = False,
+        commit: bool = True,
+    ) -> Optional[ActivityEvent]:
+        """
+        Create a new activity event.
+        
+        When the write-behind buffer is running, non-durable events are
+        queued and written in a later batch, and None is returned. Pass
+        `durable=True` to always write the event before returning; events in
+        DURABLE_EVENT_TYPES are always durable.
+        
+        With `commit=False` the event is written inside the caller's
+        transaction and not buffered; the caller commits and then calls
+        `after_commit` with the returned event.
+        """
+        values = {
+            "user_id": user_id,
+            "event_type": event_type,
+            "title": title,
+            "description": description,
+            "project_id": project_id,
+            "team_id": team_id,
+            "quest_id": quest_id,
+            "badge_id": badge_id,
+            "achievement_id": achievement_id,
+            "extra_data": metadata,
+            "xp_amount": xp_amount,
+            "is_public": is_public,
+            "created_at": datetime.utcnow(),
+        }
+        durable = durable or event_type in DURABLE_EVENT_TYPES
+        if commit and not durable and activity_event_writer.submit(values):
+            return None
+        
+        [event] = self.stage_events([values])
+        if not commit:
+            return event
+        
         self.db.commit()
         self.db.refresh(event)
+        self.after_commit([event])
         return event
 
+    def stage_events(self, rows: List[dict]) -> List[ActivityEvent]:
+        """Add events and their timeline entries to the current transaction with one flush."""
+        events = [ActivityEvent(**values) for values in rows]
+        self.db.add_all(events)
+        self.db.flush()
+        
+        timeline_service = TimelineService(self.db)
+        for event in events:
+            if event.team_id or event.project_id:
+                timeline_service.fan_out(event)
+        return events
+
+    def insert_events(self, rows: List[dict], commit: bool = True) -> list:
+        """
+        Write a batch of events with one multi-row insert, then fan out and publish them.
+        
+        Returns the inserted rows (id, user, team, project, visibility,
+        time). With `commit=False` they are left in the caller's transaction
+        and the caller commits and handles `after_commit`.
+        """
+        events = self.db.execute(
+            insert(ActivityEvent).returning(
+                ActivityEvent.id,
+                ActivityEvent.user_id,
+                ActivityEvent.team_id,
+                ActivityEvent.project_id,
+                ActivityEvent.is_public,
+                ActivityEvent.created_at,
+                sort_by_parameter_order=True,
+            ),
+            rows,
+        ).all()
+        
+        timeline_service = TimelineService(self.db)
+        for event in events:
+            if event.team_id or event.project_id:
+                timeline_service.fan_out(event)
+        
+        if commit:
+            self.db.commit()
+            self.after_commit(events)
+        return events
+
+    def after_commit(self, events) -> None:
+        """Invalidate cached feeds and notify stream subscribers of committed events."""
+        self.invalidate_feed_cache(events)
+        self.publish_events(events)
+
+    def invalidate_feed_cache(self, events) -> None:
+        """Drop cached first pages of every feed that committed events appear in."""
+        scopes = {scope for event in events for scope in feed_cache_scopes(event)}
+        get_feed_cache().invalidate(scopes)
+
+    def publish_events(self, events) -> None:
+        """Push committed public events to live stream subscribers, if there are any."""
+        broker = get_broker()
+        events = [event for event in events if event.is_public]
+        live = broker.live_channels(channel for event in events for channel in stream_channels(event))
+        targets = {}
+        for event in events:
+            channels = [channel for channel in stream_channels(event) if channel in live]
+            if channels:
+                targets[event.id] = channels
+        if not targets:
+            return
+        
+        # Serialized once here and shared by every subscriber
+        rows = self._feed_query().filter(ActivityEvent.id.in_(list(targets)))
+        payloads = {
+            row.id: ActivityEventRead.model_validate(row).model_dump_json()
+            for row in rows
+        }
+        for event_id, channels in targets.items():
+            message = Message(id=event_id, event="activity", data=payloads[event_id])
+            for channel in channels:
+                broker.publish(channel, message)
+
     def get_feed(
         self,
         page: int = 1,
         per_page: int = 20,
         public_only: bool = True,
-    ) -> Tuple[List[ActivityEventRead], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> FeedPage:
         """Get activity feed with pagination."""
-        query = self.db.query(ActivityEvent)
+        query = self._feed_query()
         
         if public_only:
             query = query.filter(ActivityEvent.is_public == True)
         
-        total = query.count()
-        
-        events = (
-            query
-            .order_by(ActivityEvent.created_at.desc())
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-            .all()
-        )
-        
-        return self._format_events(events), total
+        return self._paginate(query, page, per_page, cursor, include_total)
 
     def get_user_activity(
         self,
@@ -80,93 +294,152 @@ class ActivityService:
         page: int = 1,
         per_page: int = 20,
         public_only: bool = False,
-    ) -> Tuple[List[ActivityEventRead], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> FeedPage:
         """Get activity for a specific user."""
-        query = self.db.query(ActivityEvent).filter(ActivityEvent.user_id == user_id)
+        query = self._feed_query().filter(ActivityEvent.user_id == user_id)
         
         if public_only:
             query = query.filter(ActivityEvent.is_public == True)
         
-        total = query.count()
-        
-        events = (
-            query
-            .order_by(ActivityEvent.created_at.desc())
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-            .all()
-        )
+        return self._paginate(query, page, per_page, cursor, include_total)
+
+    def get_home_activity(
+        self,
+        user_id: int,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> FeedPage:
+        """Get a user's home feed: activity from their teams and projects."""
+        query = self._feed_query().filter(TimelineService(self.db).home_filter(user_id))
         
-        return self._format_events(events), total
+        return self._paginate(query, page, per_page, cursor, include_total)
 
     def get_team_activity(
         self,
         team_id: int,
         page: int = 1,
         per_page: int = 20,
-    ) -> Tuple[List[ActivityEventRead], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> FeedPage:
         """Get activity for a specific team."""
-        query = self.db.query(ActivityEvent).filter(
+        query = self._feed_query().filter(
             ActivityEvent.team_id == team_id,
             ActivityEvent.is_public == True,
         )
         
-        total = query.count()
-        
-        events = (
-            query
-            .order_by(ActivityEvent.created_at.desc())
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-            .all()
-        )
-        
-        return self._format_events(events), total
+        return self._paginate(query, page, per_page, cursor, include_total)
 
     def get_project_activity(
         self,
         project_id: int,
         page: int = 1,
         per_page: int = 20,
-    ) -> Tuple[List[ActivityEventRead], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> FeedPage:
         """Get activity for a specific project."""
-        query = self.db.query(ActivityEvent).filter(
+        query = self._feed_query().filter(
             ActivityEvent.project_id == project_id,
             ActivityEvent.is_public == True,
         )
         
-        total = query.count()
+        return self._paginate(query, page, per_page, cursor, include_total)
+
+    def _feed_query(self) -> Query:
+        """Select feed columns with the author's name and avatar in one statement."""
+        query = self.db.query(*_FEED_COLUMNS).join(User, User.id == ActivityEvent.user_id)
+        
+        # Bounding created_at lets Postgres skip partitions past retention.
+        # Unpartitioned tables are never archived, so nothing is hidden there.
+        cutoff = retention_cutoff()
+        if cutoff is not None and is_partitioned(self.db):
+            query = query.filter(ActivityEvent.created_at >= cutoff)
+        return query
+
+    def _paginate(
+        self,
+        query: Query,
+        page: int,
+        per_page: int,
+        cursor: Optional[str],
+        include_total: bool = False,
+    ) -> FeedPage:
+        """
+        Fetch one page of a feed, newest first.
+
+        With a cursor the page is found by seeking on (created_at, id), so
+        deep pages cost the same as the first one. `page` is still honoured
+        for clients that paginate by offset. `total` is only computed when
+        asked for, and is then an estimate.
+        """
+        total = self._estimate_total(query) if include_total else None
+        
+        query = query.order_by(ActivityEvent.created_at.desc(), ActivityEvent.id.desc())
+        if cursor:
+            created_at, event_id = decode_cursor(cursor)
+            # The plain created_at bound is implied by the row comparison, but
+            # only it can be used to prune newer partitions
+            query = query.filter(
+                ActivityEvent.created_at <= created_at,
+                tuple_(ActivityEvent.created_at, ActivityEvent.id) < tuple_(created_at, event_id),
+            )
+        else:
+            query = query.offset((page - 1) * per_page)
         
-        events = (
-            query
-            .order_by(ActivityEvent.created_at.desc())
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-            .all()
+        # One extra row tells us whether another page exists
+        events = query.limit(per_page + 1).all()
+        next_cursor = None
+        if len(events) > per_page:
+            events = events[:per_page]
+            next_cursor = encode_cursor(events[-1])
+        
+        return FeedPage(
+            [ActivityEventRead.model_validate(event) for event in events],
+            total,
+            next_cursor,
         )
+
+    def _estimate_total(self, query: Query) -> int:
+        """
+        Estimate how many events a feed query matches.
+
+        On Postgres this reads the planner's row estimate instead of counting,
+        so it stays cheap however large the feed is; filter values are sent
+        as bound parameters, never inlined. Other databases fall back to an
+        exact count.
+        """
+        bind = self.db.get_bind()
+        if bind.dialect.name != "postgresql":
+            return query.count()
         
-        return self._format_events(events), total
+        compiled = query.order_by(None).statement.compile(
+            dialect=bind.dialect,
+            compile_kwargs={"render_postcompile": True},
+        )
+        params = compiled.params
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        plan = self.db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
-    def _format_events(self, events: List[ActivityEvent]) -> List[ActivityEventRead]:
-        """Format activity events with user info."""
-        result = []
-        for event in events:
-            user = self.db.query(User).filter(User.id == event.user_id).first()
-            result.append(ActivityEventRead(
-                id=event.id,
-                event_type=event.event_type,
-                title=event.title,
-                description=event.description,
-                user_id=event.user_id,
-                username=user.username if user else "Unknown",
-                user_avatar_url=user.avatar_url if user else None,
-                project_id=event.project_id,
-                team_id=event.team_id,
-                quest_id=event.quest_id,
-                badge_id=event.badge_id,
-                achievement_id=event.achievement_id,
-                xp_amount=event.xp_amount,
-                is_public=bool(event.is_public),
-                created_at=event.created_at,
-            ))
-        return result
+
+def _write_buffered_events(db: Session, rows: List[dict]) -> None:
+    ActivityService(db).insert_events(rows)
+
+
+# Process-wide write-behind buffer; started in the app lifespan when enabled
+activity_event_writer = ActivityEventWriter(
+    _write_buffered_events,
+    max_queue_size=settings.ACTIVITY_WRITE_BEHIND_QUEUE_SIZE,
+    batch_size=settings.ACTIVITY_WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=settings.ACTIVITY_WRITE_BEHIND_INTERVAL_MS,
+)
@@ -0,0 +1,155 @@
+"""Write-behind buffer for activity events."""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ActivityEventWriter:
+    """
+    Buffers activity events in memory and writes them in batches.
+
+    Events are queued by `submit` and written by one background thread with
+    a multi-row insert once `batch_size` events are waiting or
+    `flush_interval_ms` has passed since the first of them arrived. The
+    queue is bounded; when it is full `submit` returns False and the caller
+    writes the event itself, so bursts slow down rather than drop events.
+
+    A batch that fails to write is retried once after `retry_delay_seconds`;
+    if it fails again its events are written one at a time, so one bad row
+    only loses itself. Buffered events are lost if the process dies before
+    they are flushed.
+    Callers that cannot accept that write synchronously instead (see
+    `ActivityService.create_event(durable=True)`).
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[Session, List[dict]], None],
+        max_queue_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        retry_delay_seconds: float = 0.5,
+    ):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.retry_delay_seconds = retry_delay_seconds
+        self.session_factory = session_factory
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the background writer is accepting events."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, values: dict) -> bool:
+        """Queue an event's column values. Returns False if not running or the buffer is full."""
+        if not self.is_running:
+            return False
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Write everything currently buffered, on the calling thread."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop accepting events, write what is buffered and stop the thread."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # Gather a batch until it is full or the first event has waited long enough
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval_ms / 1000
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[dict]) -> None:
+        if not batch:
+            return
+
+        with self._write_lock:
+            if self._try_write(batch):
+                return
+            time.sleep(self.retry_delay_seconds)
+            if self._try_write(batch):
+                return
+
+            # Fall back to one event per transaction so a bad row fails alone
+            for values in batch:
+                if not self._try_write([values]):
+                    self.failed += 1
+                    logger.error("Dropping buffered activity event %r", values)
+
+    def _try_write(self, batch: List[dict]) -> bool:
+        db = self.session_factory()
+        try:
+            self.write_batch(db, batch)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to write %d buffered activity events", len(batch))
+            return False
+        finally:
+            db.close()
+        self.written += len(batch)
+        return True
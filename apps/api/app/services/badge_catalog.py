@@ -0,0 +1,124 @@
+"""Cached badge rule table for set-based badge evaluation."""
+
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.gamification import Badge
+from app.services.catalog_cache import CachedCatalog
+from app.services.user_service import XPChange
+
+
+class BadgeRule(NamedTuple):
+    """The parts of an active badge needed to evaluate and announce it."""
+    id: int
+    name: str
+    description: str
+    icon: str
+    requirement_type: str
+    requirement_value: int
+    xp_bonus: int
+
+
+class UserStats(NamedTuple):
+    """The user figures badge requirements are checked against."""
+    quest_count: int
+    xp: int
+    level: int
+
+
+def stat_window(
+    xp_change: Optional[XPChange] = None,
+    quest_counts: Tuple[int, int] = (0, 0),
+) -> Tuple[UserStats, UserStats]:
+    """
+    A user's stats just before and just after one change, as its transaction wrote them.
+
+    `quest_counts` is the completion count before and after. Stats the
+    change did not touch are equal on both sides, so they unlock nothing.
+    """
+    before = UserStats(quest_counts[0], 0, 0)
+    after = UserStats(quest_counts[1], 0, 0)
+    if xp_change is not None:
+        before = before._replace(xp=xp_change.total_xp - xp_change.xp, level=xp_change.previous_level)
+        after = after._replace(xp=xp_change.total_xp, level=xp_change.level)
+    return before, after
+
+
+# The UserStats field each requirement type compares against
+REQUIREMENT_STATS = {
+    "quest_count": "quest_count",
+    "xp_total": "xp",
+    "level": "level",
+}
+
+
+class _ThresholdIndex(NamedTuple):
+    """Rules of one requirement type sorted by threshold, with the thresholds alongside for bisect."""
+    thresholds: List[int]
+    rules: List[BadgeRule]
+
+
+class BadgeCatalog(CachedCatalog[Dict[str, _ThresholdIndex]]):
+    """
+    Active badges indexed by requirement type and threshold, cached per process.
+
+    Badge checks read the cached index, not the badges table. Badges with
+    an unknown requirement type are never awarded.
+
+    Requirements are monotonic thresholds, so the badges a stat value
+    meets are a prefix of its sorted rules, and the badges a change from
+    `previous` to `stats` can newly unlock are the slice with thresholds
+    in (previous, current]; both are found by bisect.
+    """
+
+    def rules(self, db: Session) -> Dict[str, List[BadgeRule]]:
+        """Rules by requirement type, lowest threshold first."""
+        return {requirement_type: index.rules for requirement_type, index in self._load(db).items()}
+
+    def eligible(
+        self,
+        db: Session,
+        stats: UserStats,
+        previous: Optional[UserStats] = None,
+    ) -> List[BadgeRule]:
+        """
+        Badges whose requirement `stats` meets.
+
+        With `previous`, only badges whose threshold lies above the
+        previous value are returned: the ones this change can unlock.
+        """
+        eligible = []
+        for requirement_type, index in self._load(db).items():
+            field = REQUIREMENT_STATS[requirement_type]
+            stop = bisect_right(index.thresholds, getattr(stats, field))
+            start = bisect_right(index.thresholds, getattr(previous, field)) if previous else 0
+            eligible.extend(index.rules[start:stop])
+        return eligible
+
+    def _build(self, db: Session) -> Dict[str, _ThresholdIndex]:
+        grouped: Dict[str, List[BadgeRule]] = defaultdict(list)
+        badges = db.query(
+            Badge.id,
+            Badge.name,
+            Badge.description,
+            Badge.icon,
+            Badge.requirement_type,
+            Badge.requirement_value,
+            Badge.xp_bonus,
+        ).filter(Badge.is_active == True)
+        for row in badges:
+            if row.requirement_type in REQUIREMENT_STATS:
+                grouped[row.requirement_type].append(BadgeRule(*row))
+
+        index = {}
+        for requirement_type, rules in grouped.items():
+            rules.sort(key=lambda rule: (rule.requirement_value, rule.id))
+            index[requirement_type] = _ThresholdIndex([rule.requirement_value for rule in rules], rules)
+        return index
+
+
+badge_catalog = BadgeCatalog(settings.BADGE_CATALOG_TTL_SECONDS)
@@ -0,0 +1,44 @@
+"""Per-process TTL cache for small rule tables."""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Generic, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+class CachedCatalog(ABC, Generic[T]):
+    """
+    A table loaded with one query and reused for `ttl_seconds`.
+
+    Subclasses build their lookup structure in `_build`; lookups call
+    `_load`, which rebuilds it once it has expired. Call `invalidate`
+    after changing the table to pick the change up immediately in this
+    process.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._expires_at = 0.0
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog; the next lookup reloads it."""
+        with self._lock:
+            self._value = None
+
+    def _load(self, db: Session) -> T:
+        with self._lock:
+            if self._value is None or time.monotonic() >= self._expires_at:
+                self._value = self._build(db)
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            return self._value
+
+    @abstractmethod
+    def _build(self, db: Session) -> T:
+        """Load the table and build the cached lookup structure."""
+        pass
@@ -0,0 +1,247 @@
+"""Cache of pre-rendered first pages of activity feeds."""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.realtime import Broker, Message, get_broker
+
+logger = logging.getLogger(__name__)
+
+# Broker channel carrying in-memory cache invalidations between workers
+INVALIDATION_CHANNEL = "feed_cache:invalidate"
+
+# Store a page only if the scope is still at the generation it was rendered
+# under; checked and written in one atomic step so an invalidation cannot
+# land in between.
+# KEYS: generation, page. ARGV: generation, "<generation>:<body>", ttl seconds.
+_SET_IF_GENERATION = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class FeedPageCache(ABC):
+    """
+    Abstract cache of serialized feed pages, keyed by scope and page size.
+
+    Scopes are "public", "all" (the feed signed-in users see), "team:<id>"
+    and "project:<id>". Writers invalidate whole scopes. Every scope has a
+    generation number that invalidation bumps; a page rendered under an
+    older generation is not stored, so a page built from data read before
+    an invalidation never outlives it.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats: Counter = Counter()
+
+    @abstractmethod
+    def get(self, scope: str, per_page: int) -> Tuple[Optional[bytes], int]:
+        """Get a cached page and the scope's current generation."""
+        pass
+
+    @abstractmethod
+    def set(self, scope: str, per_page: int, body: bytes, generation: int) -> None:
+        """Store a page rendered while the scope was at `generation`."""
+        pass
+
+    @abstractmethod
+    def invalidate(self, scopes: Iterable[str]) -> None:
+        """Drop every cached page of the given scopes."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop everything."""
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process, with the hit rate."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = round(stats.get("hits", 0) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+
+class InMemoryFeedPageCache(FeedPageCache):
+    """
+    Per-process LRU cache with a TTL.
+
+    Given a broker, invalidations are broadcast on INVALIDATION_CHANNEL so
+    every worker drops the scopes, not just the one that handled the write.
+    That reaches other processes only through a broker that spans them
+    (REALTIME_BROKER=redis).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, broker: Optional[Broker] = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, bytes]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # Tags our own broadcasts so they are not applied twice
+        self._origin = uuid.uuid4().hex
+        if broker is not None:
+            broker.add_listener(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    def get(self, scope: str, per_page: int) -> Tuple[Optional[bytes], int]:
+        key = (scope, per_page)
+        with self._lock:
+            generation = self._generations.get(scope, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                body = entry[1]
+            else:
+                self._entries.pop(key, None)
+                body = None
+        self._count("hits" if body is not None else "misses")
+        return body, generation
+
+    def set(self, scope: str, per_page: int, body: bytes, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(scope, 0) != generation:
+                return
+            self._entries[(scope, per_page)] = (time.monotonic() + self.ttl_seconds, body)
+            self._entries.move_to_end((scope, per_page))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._count("evictions")
+
+    def invalidate(self, scopes: Iterable[str]) -> None:
+        scopes = set(scopes)
+        self._drop(scopes)
+        self._count("invalidations", len(scopes))
+        if self.broker is not None and scopes:
+            data = json.dumps({"origin": self._origin, "scopes": sorted(scopes)})
+            self.broker.publish(INVALIDATION_CHANNEL, Message(0, "invalidate", data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def _on_invalidation(self, message: Message) -> None:
+        data = json.loads(message.data)
+        if data["origin"] != self._origin:
+            self._drop(set(data["scopes"]))
+
+    def _drop(self, scopes: set) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+            for key in [key for key in self._entries if key[0] in scopes]:
+                del self._entries[key]
+
+
+class RedisFeedPageCache(FeedPageCache):
+    """
+    Cache shared by all workers through Redis.
+
+    Each (scope, per_page) page is its own key expiring after the TTL, so
+    storing one page never extends another's life. Pages are stored with the
+    scope generation they were rendered under, and invalidation only bumps
+    the generation: older pages read as misses until they expire. Redis
+    errors are logged and treated as misses so feeds keep working without
+    the cache.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: float, prefix: str = "feedcache:"):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(redis_url)
+        self._set_if_generation = self._redis.register_script(_SET_IF_GENERATION)
+
+    def get(self, scope: str, per_page: int) -> Tuple[Optional[bytes], int]:
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.get(self._page_key(scope, per_page))
+            pipe.get(f"{self.prefix}gen:{scope}")
+            stored, generation = pipe.execute()
+            generation = int(generation or 0)
+        except redis.RedisError:
+            logger.warning("Feed cache read failed", exc_info=True)
+            stored, generation = None, -1
+        body = None
+        if stored is not None:
+            stored_generation, _, page = stored.partition(b":")
+            if int(stored_generation) == generation:
+                body = page
+        self._count("hits" if body is not None else "misses")
+        return body, generation
+
+    def set(self, scope: str, per_page: int, body: bytes, generation: int) -> None:
+        if generation < 0:
+            return
+        try:
+            self._set_if_generation(
+                keys=[f"{self.prefix}gen:{scope}", self._page_key(scope, per_page)],
+                args=[generation, b"%d:%b" % (generation, body), max(int(self.ttl_seconds), 1)],
+            )
+        except redis.RedisError:
+            logger.warning("Feed cache write failed", exc_info=True)
+
+    def invalidate(self, scopes: Iterable[str]) -> None:
+        scopes = set(scopes)
+        try:
+            pipe = self._redis.pipeline()
+            for scope in scopes:
+                pipe.incr(f"{self.prefix}gen:{scope}")
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Feed cache invalidation failed", exc_info=True)
+        self._count("invalidations", len(scopes))
+
+    def clear(self) -> None:
+        try:
+            keys = list(self._redis.scan_iter(f"{self.prefix}*"))
+            if keys:
+                self._redis.delete(*keys)
+        except redis.RedisError:
+            logger.warning("Feed cache clear failed", exc_info=True)
+
+    def _page_key(self, scope: str, per_page: int) -> str:
+        return f"{self.prefix}page:{scope}:{per_page}"
+
+
+_feed_cache: Optional[FeedPageCache] = None
+
+
+def get_feed_cache() -> FeedPageCache:
+    """Get the process-wide feed cache configured by FEED_CACHE_BACKEND."""
+    global _feed_cache
+    if _feed_cache is None:
+        if settings.FEED_CACHE_BACKEND == "redis":
+            _feed_cache = RedisFeedPageCache(
+                redis_url=settings.REDIS_URL,
+                ttl_seconds=settings.FEED_CACHE_TTL_SECONDS,
+            )
+        elif settings.FEED_CACHE_BACKEND == "memory":
+            _feed_cache = InMemoryFeedPageCache(
+                max_entries=settings.FEED_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.FEED_CACHE_TTL_SECONDS,
+                broker=get_broker(),
+            )
+        else:
+            raise ValueError(f"Unknown feed cache backend: {settings.FEED_CACHE_BACKEND}")
+    return _feed_cache
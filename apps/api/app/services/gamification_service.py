@@ -1,13 +1,33 @@
 """Service for gamification operations."""
 
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
 
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
+from app.core.database import upsert_insert
+from app.models.activity import ActivityType
 from app.models.gamification import Badge, UserBadge, Achievement, UserAchievement
 from app.models.user import User
-from app.models.quest import QuestCompletion
+from app.models.user_stats import UserStatCounters
+from app.models.xp_ledger import XPSource
+from app.realtime import NotificationTopic, notify
+from app.services.achievement_catalog import AchievementRule, achievement_catalog
+from app.services.activity_service import ActivityService
+from app.services.badge_catalog import BadgeRule, UserStats, badge_catalog, stat_window
+from app.services.user_service import UserService, XPChange
+from app.services.user_stats_service import UserStatsService
+
+_user_achievements = UserAchievement.__table__
+
+
+class AchievementUnlock(NamedTuple):
+    """An achievement a user unlocked, with the XP change its reward caused."""
+    user_id: int
+    achievement: AchievementRule
+    xp_change: Optional[XPChange]
 
 
 class GamificationService:
@@ -42,38 +62,116 @@ class GamificationService:
 
         user_badge = UserBadge(user_id=user.id, badge_id=badge.id)
         self.db.add(user_badge)
+        UserStatsService(self.db).increment("badges", [user.id])
         self.db.commit()
         self.db.refresh(user_badge)
+        
+        self._notify_badge_earned(user.id, badge)
         return user_badge
 
-    def check_and_award_badges(self, user: User) -> List[UserBadge]:
-        """Check and award all eligible badges for a user."""
-        awarded = []
-        badges = self.get_all_badges()
+    def get_user_stats(self, user_id: int) -> Optional[UserStats]:
+        """Load the figures badge requirements are checked against, by primary key from users and user_stats."""
+        row = (
+            self.db.query(func.coalesce(UserStatCounters.quest_completions, 0), User.xp, User.level)
+            .outerjoin(UserStatCounters, UserStatCounters.user_id == User.id)
+            .filter(User.id == user_id)
+            .first()
+        )
+        return UserStats(*row) if row else None
+
+    def check_and_award_badges(
+        self,
+        user: User,
+        previous: Optional[UserStats] = None,
+        current: Optional[UserStats] = None,
+    ) -> List[BadgeRule]:
+        """
+        Award every badge the user now qualifies for, with its XP bonus and activity event.
         
-        for badge in badges:
-            if self._check_badge_requirement(user, badge):
-                user_badge = self.award_badge(user, badge)
-                if user_badge:
-                    awarded.append(user_badge)
+        Pass the stats just before and after the triggering change, as its
+        transaction wrote them (see `stat_window`), to only consider badges
+        that change crossed; concurrent changes each check their own window,
+        so none is skipped. Otherwise the user's stats are loaded and the
+        whole catalog is checked. Qualifying badges are written with one
+        multi-row insert that skips badges the user already holds, and
+        everything is committed together. Badge XP bonuses can cross further
+        xp_total and level thresholds, so the window of each bonus is
+        checked in turn until no more badges are earned. Returns the newly
+        earned badges.
+        """
+        if previous is None or current is None:
+            previous, current = None, self.get_user_stats(user.id)
+            if current is None:
+                return []
         
+        awarded = []
+        windows = [(previous, current)]
+        while windows:
+            earned, xp_changes = self._award_badges(user, *windows.pop())
+            awarded.extend(earned)
+            # None under XP_LEDGER_ASYNC; the XP aggregator checks those balances
+            windows.extend(stat_window(change) for change in xp_changes if change is not None)
         return awarded
 
-    def _check_badge_requirement(self, user: User, badge: Badge) -> bool:
-        """Check if user meets badge requirements."""
-        if badge.requirement_type == "quest_count":
-            count = self.db.query(QuestCompletion).filter(
-                QuestCompletion.user_id == user.id
-            ).count()
-            return count >= badge.requirement_value
+    def _award_badges(
+        self,
+        user: User,
+        previous: Optional[UserStats],
+        current: UserStats,
+    ) -> Tuple[List[BadgeRule], List[Optional[XPChange]]]:
+        """Award the badges one stat window unlocks; returns them and the XP changes of their bonuses."""
+        eligible = badge_catalog.eligible(self.db, current, previous)
+        if not eligible:
+            return [], []
         
-        elif badge.requirement_type == "xp_total":
-            return user.xp >= badge.requirement_value
+        stmt = upsert_insert(self.db, UserBadge.__table__).values([
+            {"user_id": user.id, "badge_id": rule.id, "earned_at": datetime.utcnow()}
+            for rule in eligible
+        ])
+        stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "badge_id"])
+        inserted = set(self.db.scalars(stmt.returning(UserBadge.__table__.c.badge_id)))
+        awarded = [rule for rule in eligible if rule.id in inserted]
+        if not awarded:
+            return [], []
+        UserStatsService(self.db).increment("badges", [user.id], len(awarded))
         
-        elif badge.requirement_type == "level":
-            return user.level >= badge.requirement_value
+        user_service = UserService(self.db)
+        xp_changes = [
+            user_service.apply_xp(user, rule.xp_bonus, XPSource.BADGE, rule.id)
+            for rule in awarded
+            if rule.xp_bonus > 0
+        ]
+        activity_service = ActivityService(self.db)
+        events = activity_service.stage_events([
+            {
+                "user_id": user.id,
+                "event_type": ActivityType.BADGE_EARNED,
+                "title": f"{user.username} earned the '{rule.name}' badge!",
+                "description": rule.description,
+                "badge_id": rule.id,
+                "xp_amount": rule.xp_bonus,
+            }
+            for rule in awarded
+        ])
+        self.db.commit()
         
-        return False
+        for rule in awarded:
+            self._notify_badge_earned(user.id, rule)
+        for change in xp_changes:
+            if change is not None:
+                user_service.after_xp_commit(change)
+        activity_service.after_commit(events)
+        return awarded, xp_changes
+
+    def _notify_badge_earned(self, user_id: int, badge: Union[Badge, BadgeRule]) -> None:
+        notify(
+            user_id,
+            NotificationTopic.BADGE_EARNED,
+            badge_id=badge.id,
+            name=badge.name,
+            icon=badge.icon,
+            xp_bonus=badge.xp_bonus,
+        )
 
     # Achievements
     def get_all_achievements(self) -> List[Achievement]:
@@ -92,6 +190,109 @@ class GamificationService:
             .all()
         )
 
+    def advance_achievements(self, increments: Mapping[Tuple[int, str], int]) -> List[AchievementUnlock]:
+        """
+        Add trigger event counts to achievement progress and unlock the ones that reach their target.
+        
+        `increments` maps (user_id, trigger_event) to how many times the
+        event happened. Every affected counter is advanced by one multi-row
+        upsert: `progress = progress + n` on existing rows, which is atomic
+        under concurrent flushes, and `is_completed` flips in the same
+        statement when the counter crosses its target. Completed rows are
+        left alone, so the rows RETURNING reports as completed are exactly
+        the new unlocks. Their XP rewards and activity events are written
+        in the same transaction. Returns the unlocks.
+        """
+        now = datetime.utcnow()
+        rules: Dict[int, AchievementRule] = {}
+        rows = []
+        for (user_id, trigger_event), count in increments.items():
+            for rule in achievement_catalog.for_trigger(self.db, trigger_event):
+                rules[rule.id] = rule
+                rows.append({
+                    "user_id": user_id,
+                    "achievement_id": rule.id,
+                    "progress": count,
+                    "target": rule.target,
+                    "is_completed": count >= rule.target,
+                    "completed_at": now if count >= rule.target else None,
+                    "started_at": now,
+                })
+        if not rows:
+            return []
+        
+        stmt = upsert_insert(self.db, _user_achievements).values(rows)
+        progress = _user_achievements.c.progress + stmt.excluded.progress
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "achievement_id"],
+            set_={
+                "progress": progress,
+                "is_completed": progress >= _user_achievements.c.target,
+                "completed_at": case((progress >= _user_achievements.c.target, stmt.excluded.started_at)),
+            },
+            where=_user_achievements.c.is_completed == False,
+        )
+        advanced = self.db.execute(stmt.returning(
+            _user_achievements.c.user_id,
+            _user_achievements.c.achievement_id,
+            _user_achievements.c.is_completed,
+        )).all()
+        unlocked = [(user_id, rules[achievement_id]) for user_id, achievement_id, completed in advanced if completed]
+        if not unlocked:
+            self.db.commit()
+            return []
+        UserStatsService(self.db).increment("achievements", [user_id for user_id, _ in unlocked])
+        
+        # Rewards are applied set-wise, one statement per achievement
+        winners: Dict[int, List[int]] = defaultdict(list)
+        for user_id, rule in unlocked:
+            winners[rule.id].append(user_id)
+        user_service = UserService(self.db)
+        xp_changes = {}
+        for achievement_id, user_ids in winners.items():
+            rule = rules[achievement_id]
+            if rule.xp_reward > 0:
+                for change in user_service.apply_xp_to_many(user_ids, rule.xp_reward, XPSource.ACHIEVEMENT, rule.id):
+                    xp_changes[(change.user_id, rule.id)] = change
+        
+        usernames = dict(
+            self.db.query(User.id, User.username).filter(User.id.in_({user_id for user_id, _ in unlocked}))
+        )
+        activity_service = ActivityService(self.db)
+        events = activity_service.stage_events([
+            {
+                "user_id": user_id,
+                "event_type": ActivityType.ACHIEVEMENT_UNLOCKED,
+                "title": f"{usernames[user_id]} unlocked the '{rule.name}' achievement!",
+                "description": rule.description,
+                "achievement_id": rule.id,
+                "xp_amount": rule.xp_reward,
+            }
+            for user_id, rule in unlocked
+        ])
+        self.db.commit()
+        
+        unlocks = [
+            AchievementUnlock(user_id, rule, xp_changes.get((user_id, rule.id)))
+            for user_id, rule in unlocked
+        ]
+        for unlock in unlocks:
+            self._notify_achievement_unlocked(unlock.user_id, unlock.achievement)
+            if unlock.xp_change is not None:
+                user_service.after_xp_commit(unlock.xp_change)
+        activity_service.after_commit(events)
+        return unlocks
+
+    def _notify_achievement_unlocked(self, user_id: int, achievement: AchievementRule) -> None:
+        notify(
+            user_id,
+            NotificationTopic.ACHIEVEMENT_UNLOCKED,
+            achievement_id=achievement.id,
+            name=achievement.name,
+            icon=achievement.icon,
+            xp_reward=achievement.xp_reward,
+        )
+
     def award_achievement(self, user: User, achievement: Achievement) -> Optional[UserAchievement]:
         """Award an achievement to a user."""
         existing = (
@@ -111,6 +312,7 @@ class GamificationService:
             existing.progress = existing.target
             existing.is_completed = True
             existing.completed_at = datetime.utcnow()
+            UserStatsService(self.db).increment("achievements", [user.id])
             self.db.commit()
             self.db.refresh(existing)
             return existing
@@ -124,6 +326,7 @@ class GamificationService:
             completed_at=datetime.utcnow(),
         )
         self.db.add(user_achievement)
+        UserStatsService(self.db).increment("achievements", [user.id])
         self.db.commit()
         self.db.refresh(user_achievement)
         return user_achievement
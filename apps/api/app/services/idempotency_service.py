@@ -0,0 +1,85 @@
+"""Service for Idempotency-Key handling."""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.models.idempotency import IdempotencyKey
+
+_keys = IdempotencyKey.__table__
+
+
+class IdempotencyKeyInUse(Exception):
+    """The key was claimed by a concurrent request that has not recorded a response."""
+
+
+class IdempotencyService:
+    """Service for recording and replaying responses by Idempotency-Key."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_response(self, user_id: int, key: str, scope: str) -> Optional[IdempotencyKey]:
+        """
+        Get the unexpired recorded response for a key, if any.
+
+        Raises ValueError if the key was used for a different operation.
+        """
+        record = (
+            self.db.query(IdempotencyKey)
+            .filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at > datetime.utcnow(),
+            )
+            .first()
+        )
+        if record is None:
+            return None
+        if record.scope != scope:
+            raise ValueError("Idempotency-Key was already used for a different request")
+        return record if record.status_code is not None else None
+
+    def claim(self, user_id: int, key: str, scope: str) -> bool:
+        """
+        Claim a key inside the caller's transaction. Does not commit.
+
+        Returns False if the key is already taken. On Postgres a concurrent
+        claim of the same key waits for the first transaction to finish,
+        so a retry sees the committed response rather than running twice.
+        """
+        now = datetime.utcnow()
+        self.db.execute(
+            delete(_keys).where(
+                _keys.c.user_id == user_id,
+                _keys.c.key == key,
+                _keys.c.expires_at <= now,
+            )
+        )
+        stmt = upsert_insert(self.db, _keys).values(
+            user_id=user_id,
+            key=key,
+            scope=scope,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "key"])
+        return self.db.execute(stmt.returning(_keys.c.id)).first() is not None
+
+    def record_response(self, user_id: int, key: str, status_code: int, body: str) -> None:
+        """Store the response for a claimed key. Does not commit."""
+        self.db.execute(
+            update(_keys)
+            .where(_keys.c.user_id == user_id, _keys.c.key == key)
+            .values(status_code=status_code, response_body=body)
+        )
+
+    def purge_expired(self) -> int:
+        """Delete expired keys. Returns the number removed."""
+        result = self.db.execute(delete(_keys).where(_keys.c.expires_at <= datetime.utcnow()))
+        self.db.commit()
+        return result.rowcount
@@ -1,16 +1,96 @@
 """Leaderboard service for ranking calculations."""
 
-from datetime import datetime
-from typing import List, Optional, Tuple
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import Integer, String, cast, func, insert, literal, select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.models.leaderboard import LeaderboardEntry, LeaderboardType
+from app.core.config import settings
+from app.core.database import SessionLocal, upsert_insert
+from app.models.leaderboard import LeaderboardEntry, LeaderboardSnapshot, LeaderboardType, UserPeriodXP
 from app.models.user import User
 from app.models.team import TeamMember
-from app.models.quest import QuestCompletion
+from app.models.quest import Quest, QuestCompletion
 from app.schemas.leaderboard import LeaderboardEntryRead
+from app.services.rank_index import global_rank_index
+from app.services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+
+class BoardSnapshot(NamedTuple):
+    """A cached board and when it was computed; `entries` may be empty."""
+    entries: List[LeaderboardEntryRead]
+    computed_at: datetime
+
+
+def weekly_period_key(moment: datetime) -> str:
+    """Period key for the Monday-based week containing `moment`."""
+    return moment.strftime("%Y-W%W")
+
+
+def monthly_period_key(moment: datetime) -> str:
+    """Period key for the calendar month containing `moment`."""
+    return moment.strftime("%Y-%m")
+
+
+# Fixed pool of locks striped by board, so memory does not grow with boards
+_RECOMPUTE_LOCK_STRIPES = 64
+_recompute_locks = [threading.Lock() for _ in range(_RECOMPUTE_LOCK_STRIPES)]
+
+
+def _recompute_lock(
+    leaderboard_type: LeaderboardType,
+    scope_id: Optional[int],
+    period_key: Optional[str],
+) -> threading.Lock:
+    """
+    Lock used to coalesce cold-path recomputes of a board in this process.
+
+    Boards sharing a stripe also share a lock, which only costs an
+    occasional wait behind an unrelated recompute.
+    """
+    return _recompute_locks[hash((leaderboard_type, scope_id, period_key)) % _RECOMPUTE_LOCK_STRIPES]
+
+
+def board_key(
+    leaderboard_type: LeaderboardType,
+    scope_id: Optional[int] = None,
+    period_key: Optional[str] = None,
+) -> str:
+    """Key of one board in leaderboard_snapshots."""
+    return f"{leaderboard_type.value}:{'' if scope_id is None else scope_id}:{period_key or ''}"
+
+
+def period_key_for(leaderboard_type: LeaderboardType, moment: datetime) -> Optional[str]:
+    """Period key of a board at `moment`, or None for boards without periods."""
+    if leaderboard_type == LeaderboardType.WEEKLY:
+        return weekly_period_key(moment)
+    if leaderboard_type == LeaderboardType.MONTHLY:
+        return monthly_period_key(moment)
+    return None
+
+
+def _period_keys(moment: datetime) -> List[Tuple[LeaderboardType, str]]:
+    return [
+        (LeaderboardType.WEEKLY, weekly_period_key(moment)),
+        (LeaderboardType.MONTHLY, monthly_period_key(moment)),
+    ]
+
+
+def warm_rank_index() -> None:
+    """Build the global rank index at startup."""
+    db = SessionLocal()
+    try:
+        LeaderboardService(db).load_rank_index()
+    except SQLAlchemyError:
+        logger.warning("Could not warm rank index; it will load on first use", exc_info=True)
+    finally:
+        db.close()
 
 
 class LeaderboardService:
@@ -19,118 +99,196 @@ class LeaderboardService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_global_leaderboard(self, limit: int = 10) -> List[LeaderboardEntryRead]:
-        """Get global leaderboard by XP."""
-        users = (
-            self.db.query(User)
+    def load_rank_index(self) -> None:
+        """Build the global rank index from users.xp."""
+        rows = (
+            self.db.query(User.id, User.xp)
             .filter(User.is_active == True)
-            .order_by(User.xp.desc())
-            .limit(limit)
-            .all()
+            .yield_per(10000)
         )
-        
+        global_rank_index.load((user_id, xp) for user_id, xp in rows)
+
+    def _ensure_rank_index(self) -> None:
+        """Load the rank index on first use if startup warm-up did not."""
+        if not global_rank_index.is_loaded:
+            self.load_rank_index()
+
+    def get_global_leaderboard(self, limit: int = 10) -> List[LeaderboardEntryRead]:
+        """Get global leaderboard by XP (served from the in-process rank index)."""
+        self._ensure_rank_index()
+        return self.hydrate_entries(global_rank_index.top(limit))
+
+    def get_global_around(self, user: User, radius: int = 5) -> List[LeaderboardEntryRead]:
+        """Get the users ranked just above and below a user on the global leaderboard."""
+        self._ensure_rank_index()
+        return self.hydrate_entries(global_rank_index.around(user.id, radius))
+
+    def hydrate_entries(
+        self,
+        ranked: Iterable[Tuple[int, int, int]],
+    ) -> List[LeaderboardEntryRead]:
+        """
+        Turn (rank, user_id, xp) tuples into leaderboard entries.
+
+        User display fields for the whole board are fetched in one query;
+        rows for users that no longer exist are dropped.
+        """
+        ranked = list(ranked)
+        users = UserService(self.db).get_many_by_ids(user_id for _, user_id, _ in ranked)
+        computed_at = datetime.utcnow()
+
         return [
             LeaderboardEntryRead(
-                rank=idx + 1,
-                user_id=user.id,
-                username=user.username,
-                avatar_url=user.avatar_url,
-                xp=user.xp,
-                level=user.level,
-                computed_at=datetime.utcnow(),
+                rank=rank,
+                user_id=user_id,
+                username=users[user_id].username,
+                avatar_url=users[user_id].avatar_url,
+                xp=int(xp),
+                level=users[user_id].level,
+                computed_at=computed_at,
             )
-            for idx, user in enumerate(users)
+            for rank, user_id, xp in ranked
+            if user_id in users
         ]
 
+    def get_global_rank(self, user: User) -> Optional[LeaderboardEntryRead]:
+        """Get a user's position on the global leaderboard."""
+        self._ensure_rank_index()
+        rank = global_rank_index.rank_of(user.id)
+        if rank is None:
+            return None
+
+        return LeaderboardEntryRead(
+            rank=rank,
+            user_id=user.id,
+            username=user.username,
+            avatar_url=user.avatar_url,
+            xp=user.xp,
+            level=user.level,
+            computed_at=datetime.utcnow(),
+        )
+
     def get_weekly_leaderboard(self, limit: int = 10) -> Tuple[List[LeaderboardEntryRead], str]:
         """Get weekly leaderboard by XP earned this week."""
-        now = datetime.utcnow()
-        week_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        # Go back to Monday
-        week_start = week_start.replace(day=week_start.day - week_start.weekday())
-        
-        period_key = now.strftime("%Y-W%W")
-        
-        # Sum XP from quest completions this week
-        weekly_xp = (
-            self.db.query(
-                QuestCompletion.user_id,
-                func.sum(QuestCompletion.xp_earned).label("weekly_xp"),
+        period_key = weekly_period_key(datetime.utcnow())
+        return self._get_period_leaderboard(LeaderboardType.WEEKLY, period_key, limit), period_key
+
+    def get_monthly_leaderboard(self, limit: int = 10) -> Tuple[List[LeaderboardEntryRead], str]:
+        """Get monthly leaderboard by XP earned this month."""
+        period_key = monthly_period_key(datetime.utcnow())
+        return self._get_period_leaderboard(LeaderboardType.MONTHLY, period_key, limit), period_key
+
+    def _get_period_leaderboard(
+        self,
+        period_type: LeaderboardType,
+        period_key: str,
+        limit: int,
+    ) -> List[LeaderboardEntryRead]:
+        """Read the top of a period board from the XP rollup table."""
+        period_xp = (
+            self.db.query(UserPeriodXP.user_id, UserPeriodXP.xp)
+            .filter(
+                UserPeriodXP.period_type == period_type,
+                UserPeriodXP.period_key == period_key,
+                UserPeriodXP.xp > 0,
             )
-            .filter(QuestCompletion.completed_at >= week_start)
-            .group_by(QuestCompletion.user_id)
-            .order_by(func.sum(QuestCompletion.xp_earned).desc())
+            .order_by(UserPeriodXP.xp.desc(), UserPeriodXP.user_id)
             .limit(limit)
             .all()
         )
         
-        result = []
-        for idx, (user_id, xp) in enumerate(weekly_xp):
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if user:
-                result.append(LeaderboardEntryRead(
-                    rank=idx + 1,
-                    user_id=user.id,
-                    username=user.username,
-                    avatar_url=user.avatar_url,
-                    xp=int(xp),
-                    level=user.level,
-                    computed_at=datetime.utcnow(),
-                ))
-        
-        return result, period_key
+        return self.hydrate_entries(
+            (idx + 1, user_id, xp) for idx, (user_id, xp) in enumerate(period_xp)
+        )
 
-    def get_monthly_leaderboard(self, limit: int = 10) -> Tuple[List[LeaderboardEntryRead], str]:
-        """Get monthly leaderboard by XP earned this month."""
+    def add_period_xp(self, user_id: int, xp: int, earned_at: datetime) -> None:
+        """
+        Add XP to the user's weekly and monthly rollups.
+
+        Both rollups are upserted in one statement. Does not commit, so
+        callers can keep it in the same transaction as the write that
+        earned the XP.
+        """
+        stmt = upsert_insert(self.db, UserPeriodXP.__table__).values([
+            {
+                "period_type": period_type,
+                "period_key": period_key,
+                "user_id": user_id,
+                "xp": xp,
+                "updated_at": earned_at,
+            }
+            for period_type, period_key in _period_keys(earned_at)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["period_type", "period_key", "user_id"],
+            set_={
+                "xp": UserPeriodXP.__table__.c.xp + stmt.excluded.xp,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        self.db.execute(stmt)
+
+    def rebuild_period_xp(self) -> int:
+        """
+        Rebuild the weekly/monthly XP rollups from quest completion history.
+
+        The rollups are deleted and re-summed with one `INSERT ... SELECT
+        ... GROUP BY` per period type, all in one transaction. On Postgres
+        the table is locked first, so completions committing meanwhile
+        either land in the re-sum or add their XP after it, never neither.
+        Returns the number of rollup rows written.
+        """
+        table = UserPeriodXP.__table__
+        if self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(text("LOCK TABLE user_period_xp IN EXCLUSIVE MODE"))
+        self.db.query(UserPeriodXP).delete()
+
+        written = 0
         now = datetime.utcnow()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        period_key = now.strftime("%Y-%m")
-        
-        # Sum XP from quest completions this month
-        monthly_xp = (
-            self.db.query(
-                QuestCompletion.user_id,
-                func.sum(QuestCompletion.xp_earned).label("monthly_xp"),
+        for period_type in (LeaderboardType.WEEKLY, LeaderboardType.MONTHLY):
+            period_key = self._period_key_sql(period_type, QuestCompletion.completed_at).label("period_key")
+            sums = (
+                select(
+                    literal(period_type, type_=table.c.period_type.type),
+                    period_key,
+                    QuestCompletion.user_id,
+                    func.sum(QuestCompletion.xp_earned),
+                    literal(now, type_=table.c.updated_at.type),
+                )
+                .group_by(period_key, QuestCompletion.user_id)
             )
-            .filter(QuestCompletion.completed_at >= month_start)
-            .group_by(QuestCompletion.user_id)
-            .order_by(func.sum(QuestCompletion.xp_earned).desc())
-            .limit(limit)
-            .all()
+            result = self.db.execute(
+                insert(UserPeriodXP).from_select(
+                    ["period_type", "period_key", "user_id", "xp", "updated_at"],
+                    sums,
+                )
+            )
+            written += result.rowcount
+        self.db.commit()
+        return written
+
+    def _period_key_sql(self, period_type: LeaderboardType, moment):
+        """SQL for the period key of `moment`, matching weekly_period_key and monthly_period_key."""
+        if self.db.get_bind().dialect.name != "postgresql":
+            fmt = "%Y-W%W" if period_type == LeaderboardType.WEEKLY else "%Y-%m"
+            return func.strftime(fmt, moment)
+        if period_type == LeaderboardType.MONTHLY:
+            return func.to_char(moment, "YYYY-MM")
+        # %W: weeks start on Monday; days before the year's first Monday are week 00
+        week = (func.extract("doy", moment) + 7 - func.extract("isodow", moment)) / 7
+        return func.concat(
+            func.to_char(moment, "YYYY"),
+            "-W",
+            func.lpad(cast(cast(func.floor(week), Integer), String), 2, "0"),
         )
-        
-        result = []
-        for idx, (user_id, xp) in enumerate(monthly_xp):
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if user:
-                result.append(LeaderboardEntryRead(
-                    rank=idx + 1,
-                    user_id=user.id,
-                    username=user.username,
-                    avatar_url=user.avatar_url,
-                    xp=int(xp),
-                    level=user.level,
-                    computed_at=datetime.utcnow(),
-                ))
-        
-        return result, period_key
 
     def get_team_leaderboard(self, team_id: int, limit: int = 10) -> List[LeaderboardEntryRead]:
         """Get leaderboard for a specific team."""
-        # Get team member user IDs
-        member_ids = [
-            m.user_id for m in
-            self.db.query(TeamMember).filter(TeamMember.team_id == team_id).all()
-        ]
-        
-        if not member_ids:
-            return []
-        
         users = (
             self.db.query(User)
-            .filter(User.id.in_(member_ids), User.is_active == True)
-            .order_by(User.xp.desc())
+            .join(TeamMember, TeamMember.user_id == User.id)
+            .filter(TeamMember.team_id == team_id, User.is_active == True)
+            .order_by(User.xp.desc(), User.id)
             .limit(limit)
             .all()
         )
@@ -150,76 +308,324 @@ class LeaderboardService:
 
     def get_project_leaderboard(self, project_id: int, limit: int = 10) -> List[LeaderboardEntryRead]:
         """Get leaderboard for a specific project based on quest completions."""
-        from app.models.quest import Quest
-        
-        # Get quest IDs for this project
-        quest_ids = [
-            q.id for q in
-            self.db.query(Quest).filter(Quest.project_id == project_id).all()
-        ]
-        
-        if not quest_ids:
-            return []
-        
         # Sum XP from completions of project quests
         project_xp = (
             self.db.query(
                 QuestCompletion.user_id,
                 func.sum(QuestCompletion.xp_earned).label("project_xp"),
             )
-            .filter(QuestCompletion.quest_id.in_(quest_ids))
+            .join(Quest, Quest.id == QuestCompletion.quest_id)
+            .filter(Quest.project_id == project_id)
             .group_by(QuestCompletion.user_id)
-            .order_by(func.sum(QuestCompletion.xp_earned).desc())
+            .order_by(func.sum(QuestCompletion.xp_earned).desc(), QuestCompletion.user_id)
             .limit(limit)
             .all()
         )
         
-        result = []
-        for idx, (user_id, xp) in enumerate(project_xp):
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if user:
-                result.append(LeaderboardEntryRead(
-                    rank=idx + 1,
-                    user_id=user.id,
-                    username=user.username,
-                    avatar_url=user.avatar_url,
-                    xp=int(xp),
-                    level=user.level,
-                    computed_at=datetime.utcnow(),
-                ))
-        
-        return result
+        return self.hydrate_entries(
+            (idx + 1, user_id, xp) for idx, (user_id, xp) in enumerate(project_xp)
+        )
 
-    def cache_leaderboard(
+    def precompute_scoped_leaderboards(
         self,
         leaderboard_type: LeaderboardType,
-        entries: List[LeaderboardEntryRead],
-        scope_id: Optional[int] = None,
-        period_key: Optional[str] = None,
-    ):
-        """Cache leaderboard entries in database."""
-        # Clear existing entries for this leaderboard
-        query = self.db.query(LeaderboardEntry).filter(
+        scope_ids: Optional[Iterable[int]] = None,
+    ) -> int:
+        """
+        Rebuild cached TEAM or PROJECT boards for many scopes at once.
+
+        Every scope is ranked by one window-function query partitioned by
+        scope, and the top LEADERBOARD_SNAPSHOT_SIZE rows of each are written
+        with a single INSERT ... SELECT. Pass `scope_ids` to limit the rebuild
+        to specific teams or projects; otherwise all scopes are rebuilt.
+
+        Returns the number of cached entries written.
+        """
+        scope_ids = None if scope_ids is None else list(scope_ids)
+        
+        if leaderboard_type == LeaderboardType.TEAM:
+            scope_col = TeamMember.team_id
+            xp_col = User.xp
+            ranked = (
+                select(
+                    scope_col.label("scope_id"),
+                    User.id.label("user_id"),
+                    xp_col.label("xp"),
+                    func.row_number().over(
+                        partition_by=scope_col,
+                        order_by=(xp_col.desc(), User.id),
+                    ).label("rank"),
+                )
+                .join(User, User.id == TeamMember.user_id)
+                .where(User.is_active == True)
+            )
+        elif leaderboard_type == LeaderboardType.PROJECT:
+            scope_col = Quest.project_id
+            xp_col = func.sum(QuestCompletion.xp_earned)
+            ranked = (
+                select(
+                    scope_col.label("scope_id"),
+                    QuestCompletion.user_id.label("user_id"),
+                    xp_col.label("xp"),
+                    func.row_number().over(
+                        partition_by=scope_col,
+                        order_by=(xp_col.desc(), QuestCompletion.user_id),
+                    ).label("rank"),
+                )
+                .join(Quest, Quest.id == QuestCompletion.quest_id)
+                .where(scope_col.isnot(None))
+                .group_by(scope_col, QuestCompletion.user_id)
+            )
+        else:
+            raise ValueError(f"Not a scoped leaderboard type: {leaderboard_type}")
+        
+        if scope_ids is not None:
+            if not scope_ids:
+                return 0
+            ranked = ranked.where(scope_col.in_(scope_ids))
+        ranked = ranked.subquery()
+        
+        type_col = LeaderboardEntry.__table__.c.leaderboard_type
+        rows = (
+            select(
+                literal(leaderboard_type, type_=type_col.type),
+                ranked.c.scope_id,
+                ranked.c.user_id,
+                ranked.c.rank,
+                ranked.c.xp,
+                User.level,
+                literal(datetime.utcnow(), type_=LeaderboardEntry.__table__.c.computed_at.type),
+            )
+            .join(User, User.id == ranked.c.user_id)
+            .where(ranked.c.rank <= settings.LEADERBOARD_SNAPSHOT_SIZE)
+        )
+        
+        self._lock_boards(leaderboard_type)
+        stale = self.db.query(LeaderboardEntry).filter(
             LeaderboardEntry.leaderboard_type == leaderboard_type
         )
-        if scope_id:
-            query = query.filter(LeaderboardEntry.scope_id == scope_id)
-        if period_key:
-            query = query.filter(LeaderboardEntry.period_key == period_key)
+        if scope_ids is not None:
+            stale = stale.filter(LeaderboardEntry.scope_id.in_(scope_ids))
+        stale.delete(synchronize_session=False)
         
-        query.delete()
+        result = self.db.execute(
+            insert(LeaderboardEntry).from_select(
+                ["leaderboard_type", "scope_id", "user_id", "rank", "xp", "level", "computed_at"],
+                rows,
+            )
+        )
         
-        # Insert new entries
-        for entry in entries:
-            db_entry = LeaderboardEntry(
-                leaderboard_type=leaderboard_type,
+        # Requested scopes without entries are cached as empty boards
+        if scope_ids is None:
+            scope_ids = [
+                scope_id for (scope_id,) in self.db.query(LeaderboardEntry.scope_id)
+                .filter(LeaderboardEntry.leaderboard_type == leaderboard_type)
+                .distinct()
+            ]
+        self._mark_snapshots(
+            [board_key(leaderboard_type, scope_id) for scope_id in scope_ids],
+            datetime.utcnow(),
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def get_cached_leaderboard(
+        self,
+        leaderboard_type: LeaderboardType,
+        limit: int = 10,
+        scope_id: Optional[int] = None,
+        period_key: Optional[str] = None,
+    ) -> BoardSnapshot:
+        """
+        Read a board from its cached snapshot, recomputing it if missing or stale.
+
+        Concurrent cold reads of the same board are coalesced: one caller
+        recomputes and caches the snapshot while the others wait and then
+        read it back.
+        """
+        snapshot = self.get_snapshot(leaderboard_type, limit, scope_id, period_key)
+        if snapshot is not None:
+            return snapshot
+
+        with _recompute_lock(leaderboard_type, scope_id, period_key):
+            # Another request may have refreshed the board while we waited
+            snapshot = self.get_snapshot(leaderboard_type, limit, scope_id, period_key)
+            if snapshot is not None:
+                return snapshot
+
+            entries = self.compute_leaderboard(
+                leaderboard_type,
+                limit=settings.LEADERBOARD_SNAPSHOT_SIZE,
                 scope_id=scope_id,
-                user_id=entry.user_id,
+                period_key=period_key,
+            )
+            computed_at = self.cache_leaderboard(leaderboard_type, entries, scope_id, period_key)
+            return BoardSnapshot(entries[:limit], computed_at)
+
+    def get_snapshot(
+        self,
+        leaderboard_type: LeaderboardType,
+        limit: int = 10,
+        scope_id: Optional[int] = None,
+        period_key: Optional[str] = None,
+    ) -> Optional[BoardSnapshot]:
+        """
+        Get a cached board, or None if there is no snapshot within the TTL.
+
+        A board cached while it had no entries is an empty snapshot, so
+        empty boards are served from the cache like any other.
+        """
+        snapshot = self.db.get(LeaderboardSnapshot, board_key(leaderboard_type, scope_id, period_key))
+        max_age = timedelta(seconds=settings.LEADERBOARD_CACHE_TTL_SECONDS)
+        if snapshot is None or snapshot.computed_at < datetime.utcnow() - max_age:
+            return None
+
+        rows = (
+            self._board_query(leaderboard_type, scope_id, period_key)
+            .join(User, User.id == LeaderboardEntry.user_id)
+            .with_entities(LeaderboardEntry, User.username, User.avatar_url)
+            .order_by(LeaderboardEntry.rank)
+            .limit(limit)
+            .all()
+        )
+        return BoardSnapshot([
+            LeaderboardEntryRead(
                 rank=entry.rank,
+                user_id=entry.user_id,
+                username=username,
+                avatar_url=avatar_url,
                 xp=entry.xp,
                 level=entry.level,
-                period_key=period_key,
+                computed_at=entry.computed_at,
             )
-            self.db.add(db_entry)
+            for entry, username, avatar_url in rows
+        ], snapshot.computed_at)
+
+    def compute_leaderboard(
+        self,
+        leaderboard_type: LeaderboardType,
+        limit: int = 10,
+        scope_id: Optional[int] = None,
+        period_key: Optional[str] = None,
+    ) -> List[LeaderboardEntryRead]:
+        """Compute a board live from source tables."""
+        if leaderboard_type == LeaderboardType.GLOBAL:
+            return self.get_global_leaderboard(limit=limit)
+        if leaderboard_type in (LeaderboardType.WEEKLY, LeaderboardType.MONTHLY):
+            return self._get_period_leaderboard(leaderboard_type, period_key, limit)
+        if leaderboard_type == LeaderboardType.TEAM:
+            return self.get_team_leaderboard(team_id=scope_id, limit=limit)
+        if leaderboard_type == LeaderboardType.PROJECT:
+            return self.get_project_leaderboard(project_id=scope_id, limit=limit)
+        raise ValueError(f"Unknown leaderboard type: {leaderboard_type}")
+
+    def boards_affected_by_xp(
+        self,
+        user_id: int,
+        quest: Optional[Quest] = None,
+    ) -> List[Tuple[LeaderboardType, Optional[int]]]:
+        """
+        List the boards whose ranking can change when a user gains XP.
+
+        Team boards rank by total XP, so every team the user is in is
+        affected. Period and project boards only count quest completions.
+        """
+        boards: List[Tuple[LeaderboardType, Optional[int]]] = [(LeaderboardType.GLOBAL, None)]
+        boards.extend(
+            (LeaderboardType.TEAM, team_id)
+            for (team_id,) in self.db.query(TeamMember.team_id).filter(TeamMember.user_id == user_id)
+        )
+        if quest is not None:
+            boards.append((LeaderboardType.WEEKLY, None))
+            boards.append((LeaderboardType.MONTHLY, None))
+            if quest.project_id is not None:
+                boards.append((LeaderboardType.PROJECT, quest.project_id))
+        return boards
+
+    def _board_query(
+        self,
+        leaderboard_type: LeaderboardType,
+        scope_id: Optional[int],
+        period_key: Optional[str],
+    ):
+        """Query the cached entries of exactly one board."""
+        return self.db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.leaderboard_type == leaderboard_type,
+            LeaderboardEntry.scope_id.is_(None) if scope_id is None
+            else LeaderboardEntry.scope_id == scope_id,
+            LeaderboardEntry.period_key.is_(None) if period_key is None
+            else LeaderboardEntry.period_key == period_key,
+        )
+
+    def cache_leaderboard(
+        self,
+        leaderboard_type: LeaderboardType,
+        entries: List[LeaderboardEntryRead],
+        scope_id: Optional[int] = None,
+        period_key: Optional[str] = None,
+    ) -> datetime:
+        """
+        Cache leaderboard entries in database. Returns the snapshot's computed_at.
+
+        The old snapshot is deleted and the new one written with a single
+        multi-row INSERT in the same transaction, so concurrent readers see
+        either the previous board or the new one, never an empty board.
+        """
+        computed_at = datetime.utcnow()
+        rows = [
+            {
+                "leaderboard_type": leaderboard_type,
+                "scope_id": scope_id,
+                "user_id": entry.user_id,
+                "rank": entry.rank,
+                "xp": entry.xp,
+                "level": entry.level,
+                "period_key": period_key,
+                "computed_at": computed_at,
+            }
+            for entry in entries
+        ]
+        
+        self._lock_boards(leaderboard_type, board_key(leaderboard_type, scope_id, period_key))
+        self._board_query(leaderboard_type, scope_id, period_key).delete(
+            synchronize_session=False
+        )
+        if rows:
+            self.db.execute(insert(LeaderboardEntry), rows)
+        self._mark_snapshots([board_key(leaderboard_type, scope_id, period_key)], computed_at)
         
         self.db.commit()
+        return computed_at
+
+    def _lock_boards(self, leaderboard_type: LeaderboardType, key: Optional[str] = None) -> None:
+        """
+        Serialize snapshot writers across processes until the transaction ends.
+
+        Every worker runs its own refresh scheduler, and two writers doing
+        delete-then-insert on one board would leave it with every entry
+        twice. On Postgres, a writer of one board takes a shared lock on its
+        type and an exclusive lock on the board; a writer of many boards of
+        a type takes the type exclusively. Other databases have one writer.
+        """
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        type_lock = func.hashtext(f"leaderboard:{leaderboard_type.value}")
+        if key is None:
+            self.db.execute(select(func.pg_advisory_xact_lock(type_lock)))
+            return
+        self.db.execute(select(func.pg_advisory_xact_lock_shared(type_lock)))
+        self.db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"leaderboard:{key}"))))
+
+    def _mark_snapshots(self, keys: List[str], computed_at: datetime) -> None:
+        """Record that the given boards were computed at `computed_at`, without committing."""
+        if not keys:
+            return
+        table = LeaderboardSnapshot.__table__
+        stmt = upsert_insert(self.db, table).values([
+            {"board_key": key, "computed_at": computed_at} for key in keys
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["board_key"],
+            set_={"computed_at": stmt.excluded.computed_at},
+        )
+        self.db.execute(stmt)
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app.models. project import Project, ProjectStatus
 from app.models.user import User
 from app.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.user_stats_service import UserStatsService
 
 
 class ProjectService:
@@ -49,15 +50,22 @@ class ProjectService:
             ai_model=project_in.ai_model,
         )
         self.db.add(project)
+        UserStatsService(self.db).increment("projects_created", [owner.id])
         self.db.commit()
         self.db.refresh(project)
         return project
 
     def update(self, project:  Project, project_in: ProjectUpdate) -> Project:
-        """Update a project."""
+        """Update a project, keeping the owner's published count in step with its status."""
+        was_published = project.status == ProjectStatus.PUBLISHED
         update_data = project_in.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(project, field, value)
+        is_published = project.status == ProjectStatus.PUBLISHED
+        if is_published != was_published:
+            UserStatsService(self.db).increment(
+                "projects_published", [project.owner_id], 1 if is_published else -1
+            )
         self.db.commit()
         self.db.refresh(project)
         return project
@@ -68,6 +76,7 @@ class ProjectService:
 
         project.status = ProjectStatus. PUBLISHED
         project.published_at = datetime.utcnow()
+        UserStatsService(self.db).increment("projects_published", [project.owner_id])
         self.db.commit()
         self.db.refresh(project)
         return project
\ No newline at end of file
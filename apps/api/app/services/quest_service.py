@@ -1,10 +1,28 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, NamedTuple, Optional
 
+from sqlalchemy import false, select
 from sqlalchemy.orm import Session
 
+from app.models.activity import ActivityEvent, ActivityType
 from app.models. quest import Quest, QuestCompletion
+from app.core.database import upsert_insert
 from app.models.user import User
-from app.schemas.quest import QuestCreate, QuestUpdate
+from app.models.xp_ledger import XPSource
+from app.schemas.quest import QuestCompletionRead, QuestCreate, QuestUpdate
+from app.services.activity_service import ActivityService
+from app.services.idempotency_service import IdempotencyKeyInUse, IdempotencyService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.user_service import UserService, XPChange
+from app.services.user_stats_service import UserStatsService
+
+
+class QuestCompletionResult(NamedTuple):
+    """Everything written by a quest completion."""
+    completion: QuestCompletion
+    xp_change: Optional[XPChange]  # None while XP awaits the ledger aggregator
+    events: List[ActivityEvent]
+    quest_count: int  # the user's completions including this one
 
 
 class QuestService:
@@ -53,30 +71,99 @@ class QuestService:
         self.db.refresh(quest)
         return quest
 
-    def complete_quest(self, quest: Quest, user: User) -> QuestCompletion:
-        """Complete a quest for a user."""
-        # Check if already completed (if not repeatable)
-        if not quest. is_repeatable:
-            existing = (
-                self.db.query(QuestCompletion)
-                .filter(
-                    QuestCompletion. quest_id == quest.id,
-                    QuestCompletion. user_id == user.id,
-                )
-                .first()
-            )
-            if existing: 
-                raise ValueError("Quest already completed")
+    def complete_quest(
+        self,
+        quest: Quest,
+        user: User,
+        idempotency_key: Optional[str] = None,
+    ) -> QuestCompletionResult:
+        """
+        Complete a quest for a user in a single transaction.
+        
+        The completion row, XP increment, period XP rollups and activity
+        events are written together and committed once. Rank updates,
+        notifications and feed publishing run after the commit.
+        
+        A second completion of a non-repeatable quest is rejected by the
+        `uq_quest_completions_once` index, so concurrent requests cannot both
+        succeed. With an `idempotency_key`, the key is claimed first and the
+        response is recorded in the same transaction; raises
+        IdempotencyKeyInUse if the key is already taken.
+        """
+        idempotency_service = IdempotencyService(self.db)
+        if idempotency_key and not idempotency_service.claim(
+            user.id, idempotency_key, self.completion_scope(quest.id)
+        ):
+            self.db.rollback()
+            raise IdempotencyKeyInUse(idempotency_key)
 
-        completion = QuestCompletion(
+        completed_at = datetime.utcnow()
+        stmt = upsert_insert(self.db, QuestCompletion.__table__).values(
             quest_id=quest.id,
             user_id=user.id,
             xp_earned=quest.xp_reward,
+            completed_at=completed_at,
+            is_repeatable=quest.is_repeatable,
+        )
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=["quest_id", "user_id"],
+            index_where=QuestCompletion.is_repeatable == false(),
+        )
+        completion = self.db.scalars(
+            select(QuestCompletion).from_statement(stmt.returning(*QuestCompletion.__table__.c))
+        ).first()
+        if completion is None:
+            self.db.rollback()
+            raise ValueError("Quest already completed")
+        LeaderboardService(self.db).add_period_xp(user.id, quest.xp_reward, completed_at)
+        quest_count = UserStatsService(self.db).record_completion(user.id, completed_at)
+
+        user_service = UserService(self.db)
+        xp_change = user_service.apply_xp(
+            user,
+            quest.xp_reward,
+            XPSource.QUEST_COMPLETION,
+            completion.id,
         )
-        self.db.add(completion)
+
+        event_rows = [{
+            "user_id": user.id,
+            "event_type": ActivityType.QUEST_COMPLETED,
+            "title": f"{user.username} completed quest: {quest.title}",
+            "description": f"Earned {quest.xp_reward} XP!",
+            "quest_id": quest.id,
+            "xp_amount": quest.xp_reward,
+            "created_at": completed_at,
+        }]
+        if xp_change is not None and xp_change.leveled_up:
+            event_rows.append({
+                "user_id": user.id,
+                "event_type": ActivityType.USER_LEVEL_UP,
+                "title": f"{user.username} reached level {xp_change.level}!",
+                "description": f"🎉 Congratulations on reaching level {xp_change.level}!",
+                "xp_amount": 0,
+                "created_at": completed_at,
+            })
+        activity_service = ActivityService(self.db)
+        events = activity_service.stage_events(event_rows)
+
+        if idempotency_key:
+            idempotency_service.record_response(
+                user.id,
+                idempotency_key,
+                200,
+                QuestCompletionRead.model_validate(completion).model_dump_json(),
+            )
         self.db.commit()
-        self.db.refresh(completion)
-        return completion
+
+        if xp_change is not None:
+            user_service.after_xp_commit(xp_change)
+        activity_service.after_commit(events)
+        return QuestCompletionResult(completion, xp_change, events, quest_count)
+
+    def completion_scope(self, quest_id: int) -> str:
+        """Idempotency scope of completing a quest."""
+        return f"quest:{quest_id}:complete"
 
     def get_user_completions(self, user_id:  int) -> List[QuestCompletion]:
         """Get quest completions for a user."""
@@ -0,0 +1,225 @@
+"""In-process order-statistic index for the global XP leaderboard."""
+
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Enough levels for ~16M entries at p=0.5
+_MAX_LEVELS = 24
+
+# Sort key: (-xp, user_id) so higher XP ranks first and ties break by user ID
+_Key = Tuple[int, int]
+
+_TAIL_KEY = (float("inf"), float("inf"))
+
+
+class _Node:
+    """Skip list node with per-level forward links and link widths."""
+
+    __slots__ = ("key", "forward", "width")
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class _IndexableSkipList:
+    """
+    Skip list that also tracks link widths, so positional lookups
+    (rank of a key, key at a position) are O(log n).
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._tail = _Node(_TAIL_KEY, 0)
+        self._head = _Node(None, _MAX_LEVELS)
+        self._head.forward = [self._tail] * _MAX_LEVELS
+
+    def insert(self, key: _Key) -> None:
+        """Insert a key."""
+        chain: List[_Node] = [self._head] * _MAX_LEVELS
+        steps_at_level = [0] * _MAX_LEVELS
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.forward[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.forward[level]
+            chain[level] = node
+
+        levels = self._random_levels()
+        new_node = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new_node.forward[level] = prev.forward[level]
+            prev.forward[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, _MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key: _Key) -> None:
+        """Remove a key, raising KeyError if it is not present."""
+        chain: List[_Node] = [self._head] * _MAX_LEVELS
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.forward[level].key < key:
+                node = node.forward[level]
+            chain[level] = node
+
+        target = chain[0].forward[0]
+        if target.key != key:
+            raise KeyError(key)
+
+        levels = len(target.forward)
+        for level in range(levels):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.forward[level] = target.forward[level]
+        for level in range(levels, _MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def index_of(self, key: _Key) -> Optional[int]:
+        """Return the 0-based position of a key, or None if absent."""
+        position = 0
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.forward[level].key < key:
+                position += node.width[level]
+                node = node.forward[level]
+        if node.forward[0].key != key:
+            return None
+        return position
+
+    def slice(self, start: int, stop: int) -> List[_Key]:
+        """Return keys in positions [start, stop)."""
+        start = max(start, 0)
+        stop = min(stop, self.size)
+        if start >= stop:
+            return []
+
+        # Descend to the node just before `start`, then walk the bottom level
+        node = self._head
+        remaining = start
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.forward[level]
+
+        keys = []
+        node = node.forward[0]
+        for _ in range(stop - start):
+            keys.append(node.key)
+            node = node.forward[0]
+        return keys
+
+    def _random_levels(self) -> int:
+        levels = 1
+        while levels < _MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+        return levels
+
+
+class RankIndex:
+    """
+    Order-statistic index of active users by XP (highest first).
+
+    Serves top-N and rank-of-user in O(log n) without touching the database.
+    The index is per process; it is loaded from `users.xp` at startup and
+    kept current by `UserService` as XP changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skiplist = _IndexableSkipList()
+        self._scores: Dict[int, int] = {}
+        self.is_loaded = False
+
+    def __len__(self) -> int:
+        return self._skiplist.size
+
+    def load(self, rows: Iterable[Tuple[int, int]]) -> None:
+        """Replace the index contents with (user_id, xp) rows."""
+        skiplist = _IndexableSkipList()
+        scores: Dict[int, int] = {}
+        for user_id, xp in rows:
+            scores[user_id] = xp
+            skiplist.insert((-xp, user_id))
+
+        with self._lock:
+            self._skiplist = skiplist
+            self._scores = scores
+            self.is_loaded = True
+
+    def clear(self) -> None:
+        """Drop all entries and mark the index as not loaded."""
+        with self._lock:
+            self._skiplist = _IndexableSkipList()
+            self._scores = {}
+            self.is_loaded = False
+
+    def update(self, user_id: int, xp: int) -> None:
+        """Insert a user or move them to their new XP position."""
+        with self._lock:
+            old_xp = self._scores.get(user_id)
+            if old_xp == xp:
+                return
+            if old_xp is not None:
+                self._skiplist.remove((-old_xp, user_id))
+            self._skiplist.insert((-xp, user_id))
+            self._scores[user_id] = xp
+
+    def remove(self, user_id: int) -> None:
+        """Remove a user from the index, if present."""
+        with self._lock:
+            old_xp = self._scores.pop(user_id, None)
+            if old_xp is not None:
+                self._skiplist.remove((-old_xp, user_id))
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """Get a user's 1-based rank, or None if they are not ranked."""
+        with self._lock:
+            xp = self._scores.get(user_id)
+            if xp is None:
+                return None
+            return self._skiplist.index_of((-xp, user_id)) + 1
+
+    def top(self, limit: int) -> List[Tuple[int, int, int]]:
+        """Get the top `limit` users as (rank, user_id, xp) tuples."""
+        with self._lock:
+            keys = self._skiplist.slice(0, limit)
+        return [(idx + 1, user_id, -neg_xp) for idx, (neg_xp, user_id) in enumerate(keys)]
+
+    def between(self, first_rank: int, last_rank: int) -> List[Tuple[int, int, int]]:
+        """Get users ranked first_rank..last_rank (inclusive) as (rank, user_id, xp) tuples."""
+        with self._lock:
+            keys = self._skiplist.slice(first_rank - 1, last_rank)
+        start = max(first_rank, 1)
+        return [(start + idx, user_id, -neg_xp) for idx, (neg_xp, user_id) in enumerate(keys)]
+
+    def around(self, user_id: int, radius: int) -> List[Tuple[int, int, int]]:
+        """
+        Get the window of users ranked within `radius` places of a user.
+
+        Returns (rank, user_id, xp) tuples, or an empty list if the user
+        is not ranked.
+        """
+        with self._lock:
+            xp = self._scores.get(user_id)
+            if xp is None:
+                return []
+            position = self._skiplist.index_of((-xp, user_id))
+            start = max(position - radius, 0)
+            keys = self._skiplist.slice(start, position + radius + 1)
+        return [
+            (start + idx + 1, ranked_id, -neg_xp)
+            for idx, (neg_xp, ranked_id) in enumerate(keys)
+        ]
+
+
+# Process-wide index for the global leaderboard
+global_rank_index = RankIndex()
@@ -0,0 +1,128 @@
+"""Timeline service for fan-out-on-write home feeds."""
+
+import random
+from typing import List, Set
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.models.activity import ActivityEvent, TimelineEntry
+from app.models.project import Project
+from app.models.team import TeamMember
+
+
+class TimelineService:
+    """
+    Service for per-user home timelines.
+
+    New team and project events are pushed into the timelines of everyone
+    involved (fan-out on write). Timelines are trimmed back to the newest
+    `TIMELINE_MAX_ENTRIES` events on a random `TIMELINE_TRIM_PROBABILITY`
+    share of writes, so the cap is soft but the trim's window query is not
+    paid on every event. Teams larger than
+    `TIMELINE_FANOUT_MAX_TEAM_SIZE` are skipped on write; their events are
+    merged into members' home feeds at read time instead.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def fan_out(self, event: ActivityEvent) -> int:
+        """
+        Push an event into its recipients' timelines.
+
+        The event must already be flushed. Does not commit. Returns the
+        number of recipients.
+        """
+        recipients = self.get_recipients(event)
+        if not recipients:
+            return 0
+
+        insert_stmt = upsert_insert(self.db, TimelineEntry.__table__).values([
+            {"user_id": user_id, "event_id": event.id, "created_at": event.created_at}
+            for user_id in recipients
+        ])
+        self.db.execute(insert_stmt.on_conflict_do_nothing(index_elements=["user_id", "event_id"]))
+        if random.random() < settings.TIMELINE_TRIM_PROBABILITY:
+            self.trim(recipients)
+        return len(recipients)
+
+    def get_recipients(self, event: ActivityEvent) -> Set[int]:
+        """Get users whose timelines receive an event: team members and project collaborators."""
+        recipients: Set[int] = set()
+        team_ids: Set[int] = set()
+
+        if event.team_id:
+            team_ids.add(event.team_id)
+        if event.project_id:
+            project = self.db.query(Project.owner_id, Project.team_id).filter(
+                Project.id == event.project_id
+            ).first()
+            if project:
+                recipients.add(project.owner_id)
+                if project.team_id:
+                    team_ids.add(project.team_id)
+
+        team_ids -= set(self._large_team_ids(team_ids))
+        if team_ids:
+            members = self.db.query(TeamMember.user_id).filter(TeamMember.team_id.in_(team_ids))
+            recipients.update(user_id for user_id, in members)
+        return recipients
+
+    def trim(self, user_ids: Set[int]) -> None:
+        """Delete timeline entries beyond the newest TIMELINE_MAX_ENTRIES per user."""
+        position = func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.created_at.desc(), TimelineEntry.event_id.desc()),
+        )
+        ranked = (
+            select(TimelineEntry.id, position.label("position"))
+            .where(TimelineEntry.user_id.in_(user_ids))
+            .subquery()
+        )
+        overflow = select(ranked.c.id).where(ranked.c.position > settings.TIMELINE_MAX_ENTRIES)
+        self.db.query(TimelineEntry).filter(TimelineEntry.id.in_(overflow)).delete(
+            synchronize_session=False
+        )
+
+    def home_filter(self, user_id: int):
+        """
+        Build a filter on ActivityEvent matching a user's home feed.
+
+        Combines the user's stored timeline with events from any large teams
+        they belong to, which are not fanned out. Like the team and project
+        feeds, only public events are included.
+        """
+        conditions = [
+            ActivityEvent.id.in_(
+                select(TimelineEntry.event_id).where(TimelineEntry.user_id == user_id)
+            )
+        ]
+
+        team_ids = [
+            team_id
+            for team_id, in self.db.query(TeamMember.team_id).filter(TeamMember.user_id == user_id)
+        ]
+        large_team_ids = self._large_team_ids(team_ids)
+        if large_team_ids:
+            conditions.append(ActivityEvent.team_id.in_(large_team_ids))
+            conditions.append(ActivityEvent.project_id.in_(
+                select(Project.id).where(Project.team_id.in_(large_team_ids))
+            ))
+        return and_(ActivityEvent.is_public == True, or_(*conditions))
+
+    def _large_team_ids(self, team_ids) -> List[int]:
+        """Get the teams, among `team_ids`, too large to fan out to."""
+        team_ids = list(team_ids)
+        if not team_ids:
+            return []
+
+        rows = (
+            self.db.query(TeamMember.team_id)
+            .filter(TeamMember.team_id.in_(team_ids))
+            .group_by(TeamMember.team_id)
+            .having(func.count(TeamMember.id) > settings.TIMELINE_FANOUT_MAX_TEAM_SIZE)
+        )
+        return [team_id for team_id, in rows]
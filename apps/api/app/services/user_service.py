@@ -1,10 +1,37 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app. models.user import User
+from app.models.xp_ledger import XPLedgerEntry, XPSource
+from app.realtime import NotificationTopic, notify
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.rank_index import global_rank_index
+
+# Users passed on the global board are told about their rank drop, up to this many
+MAX_OVERTAKEN_NOTIFICATIONS = 20
+
+_users = User.__table__
+_ledger = XPLedgerEntry.__table__
+
+
+class XPChange(NamedTuple):
+    """Result of an XP award, as written to the users row."""
+    user_id: int
+    xp: int
+    total_xp: int
+    level: int
+    previous_level: int
+    is_active: bool
+
+    @property
+    def leveled_up(self) -> bool:
+        return self.level > self.previous_level
 
 
 class UserService:
@@ -17,6 +44,31 @@ class UserService:
         """Get user by ID."""
         return self.db.query(User).filter(User.id == user_id).first()
 
+    def get_many_by_ids(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        """
+        Get display fields for many users in one query, keyed by user ID.
+
+        Only the columns needed to render a user next to ranked or listed
+        rows are loaded (username, full name, avatar, XP, level).
+        """
+        ids = set(user_ids)
+        if not ids:
+            return {}
+        users = (
+            self.db.query(User)
+            .options(load_only(
+                User.id,
+                User.username,
+                User.full_name,
+                User.avatar_url,
+                User.xp,
+                User.level,
+            ))
+            .filter(User.id.in_(ids))
+            .all()
+        )
+        return {user.id: user for user in users}
+
     def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email."""
         return self.db.query(User).filter(User.email == email).first()
@@ -36,6 +88,8 @@ class UserService:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
+        if global_rank_index.is_loaded:
+            global_rank_index.update(user.id, user.xp)
         return user
 
     def update(self, user:  User, user_in: UserUpdate) -> User:
@@ -56,16 +110,193 @@ class UserService:
             return None
         return user
 
-    def add_xp(self, user: User, xp: int) -> tuple[User, bool]:
+    def add_xp(
+        self,
+        user: User,
+        xp: int,
+        source_type: XPSource = XPSource.ADJUSTMENT,
+        source_id: Optional[int] = None,
+    ) -> tuple[User, bool]:
         """Add XP to user, returns (user, leveled_up)."""
-        user.xp += xp
-        old_level = user.level
-        user. level = self._calculate_level(user.xp)
+        change = self.apply_xp(user, xp, source_type, source_id)
         self.db.commit()
-        self.db.refresh(user)
-        return user, user.level > old_level
+        if change is None:
+            return user, False
+        self.after_xp_commit(change)
+        return user, change.leveled_up
+
+    def apply_xp(
+        self,
+        user: User,
+        xp: int,
+        source_type: XPSource = XPSource.ADJUSTMENT,
+        source_id: Optional[int] = None,
+    ) -> Optional[XPChange]:
+        """
+        Record XP in the ledger and add it to the user's balance, without committing.
+        
+        With XP_LEDGER_ASYNC the entry is only appended and None is
+        returned; the XP aggregator adds it to `users.xp` later, so bursts
+        of awards do not queue on the users row. Otherwise the balance is
+        updated in the same transaction and `user` is refreshed in place.
+        Call `after_xp_commit` with the change once the transaction has
+        committed.
+        """
+        self.db.execute(
+            insert(_ledger).values(
+                user_id=user.id,
+                delta=xp,
+                source_type=source_type,
+                source_id=source_id,
+                created_at=datetime.utcnow(),
+                applied_at=None if settings.XP_LEDGER_ASYNC else datetime.utcnow(),
+            )
+        )
+        if settings.XP_LEDGER_ASYNC:
+            return None
+        
+        change = self.increment_xp(user.id, xp)
+        set_committed_value(user, "xp", change.total_xp)
+        set_committed_value(user, "level", change.level)
+        return change
+
+    def apply_xp_to_many(
+        self,
+        user_ids: List[int],
+        xp: int,
+        source_type: XPSource,
+        source_id: Optional[int] = None,
+    ) -> List[XPChange]:
+        """
+        Give the same XP to many users with set-based statements, without committing.
+        
+        Ledger entries go in with one multi-row insert and balances with one
+        `UPDATE ... WHERE id IN (...) RETURNING`; only users who level up
+        get a further update. Returns the changes, or nothing under
+        XP_LEDGER_ASYNC, where the aggregator applies them.
+        """
+        if not user_ids:
+            return []
+        
+        now = datetime.utcnow()
+        self.db.execute(insert(_ledger), [
+            {
+                "user_id": user_id,
+                "delta": xp,
+                "source_type": source_type,
+                "source_id": source_id,
+                "created_at": now,
+                "applied_at": None if settings.XP_LEDGER_ASYNC else now,
+            }
+            for user_id in user_ids
+        ])
+        if settings.XP_LEDGER_ASYNC:
+            return []
+        
+        rows = self.db.execute(
+            update(_users)
+            .where(_users.c.id.in_(user_ids))
+            .values(xp=_users.c.xp + xp)
+            .returning(_users.c.id, _users.c.xp, _users.c.level, _users.c.is_active)
+        ).all()
+        changes = [
+            XPChange(
+                user_id,
+                xp,
+                total_xp,
+                max(self.calculate_level(total_xp), previous_level),
+                previous_level,
+                is_active,
+            )
+            for user_id, total_xp, previous_level, is_active in rows
+        ]
+        
+        level_ups = [
+            {"target_id": change.user_id, "new_level": change.level}
+            for change in changes
+            if change.leveled_up
+        ]
+        if level_ups:
+            self.db.execute(
+                update(_users)
+                .where(_users.c.id == bindparam("target_id"), _users.c.level < bindparam("new_level"))
+                .values(level=bindparam("new_level")),
+                level_ups,
+            )
+        return changes
+
+    def increment_xp(self, user_id: int, xp: int) -> XPChange:
+        """
+        Add XP to a users row without committing or writing the ledger.
+        
+        The increment is a single `UPDATE ... SET xp = xp + :n RETURNING`, so
+        concurrent awards cannot overwrite each other, and the level only
+        ever moves up.
+        """
+        total_xp, previous_level, is_active = self.db.execute(
+            update(_users)
+            .where(_users.c.id == user_id)
+            .values(xp=_users.c.xp + xp)
+            .returning(_users.c.xp, _users.c.level, _users.c.is_active)
+        ).one()
+        
+        level = max(self.calculate_level(total_xp), previous_level)
+        if level > previous_level:
+            self.db.execute(
+                update(_users)
+                .where(_users.c.id == user_id, _users.c.level < level)
+                .values(level=level)
+            )
+        return XPChange(user_id, xp, total_xp, level, previous_level, is_active)
+
+    def after_xp_commit(self, change: XPChange) -> None:
+        """Update the rank index and push notifications for a committed XP change."""
+        old_rank = new_rank = None
+        if global_rank_index.is_loaded and change.is_active:
+            old_rank = global_rank_index.rank_of(change.user_id)
+            global_rank_index.update(change.user_id, change.total_xp)
+            new_rank = global_rank_index.rank_of(change.user_id)
+        
+        self._notify_xp_change(change, old_rank, new_rank)
+
+    def _notify_xp_change(
+        self,
+        change: XPChange,
+        old_rank: Optional[int],
+        new_rank: Optional[int],
+    ) -> None:
+        """Push XP, level-up and rank-change notifications after a committed XP change."""
+        notify(
+            change.user_id,
+            NotificationTopic.XP_GAINED,
+            xp=change.xp,
+            total_xp=change.total_xp,
+            level=change.level,
+        )
+        if change.leveled_up:
+            notify(
+                change.user_id,
+                NotificationTopic.LEVEL_UP,
+                level=change.level,
+                previous_level=change.previous_level,
+            )
+        
+        if old_rank is None or new_rank is None or new_rank == old_rank:
+            return
+        notify(change.user_id, NotificationTopic.RANK_CHANGE, rank=new_rank, previous_rank=old_rank)
+        
+        # Everyone between the new and old rank moved down one place
+        last_rank = min(old_rank, new_rank + MAX_OVERTAKEN_NOTIFICATIONS)
+        for rank, overtaken_id, _ in global_rank_index.between(new_rank + 1, last_rank):
+            notify(
+                overtaken_id,
+                NotificationTopic.RANK_CHANGE,
+                rank=rank,
+                previous_rank=rank - 1,
+                overtaken_by=change.user_id,
+            )
 
-    def _calculate_level(self, xp: int) -> int:
+    def calculate_level(self, xp: int) -> int:
         """Calculate level from XP.  Simple formula: level = 1 + floor(sqrt(xp / 100))"""
         import math
-        return 1 + int(math.sqrt(xp / 100))
\ No newline at end of file
+        return 1 + int(math.sqrt(max(xp, 0) / 100))
\ No newline at end of file
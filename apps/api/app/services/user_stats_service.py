@@ -0,0 +1,192 @@
+"""Service for materialized per-user stat counters."""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.core.database import upsert_insert
+from app.models.gamification import UserAchievement, UserBadge
+from app.models.project import Project, ProjectStatus
+from app.models.quest import QuestCompletion
+from app.models.user import User
+from app.models.user_stats import UserStatCounters
+
+_stats = UserStatCounters.__table__
+
+# Counters maintained with plain increments
+COUNTERS = ("quest_completions", "projects_created", "projects_published", "badges", "achievements")
+
+# Every stored column repair compares, in table order
+_STAT_COLUMNS = COUNTERS + ("current_streak", "longest_streak", "last_active_on")
+
+
+def _streaks(days: List[date]) -> Tuple[int, int, Optional[date]]:
+    """(current, longest, last day) of runs of consecutive days in sorted distinct `days`."""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+class UserStatsService:
+    """Service for reading, maintaining and repairing the user_stats table."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, user_id: int) -> Optional[UserStatCounters]:
+        """Get a user's counters by primary key; None means all zero or no such user."""
+        return self.db.get(UserStatCounters, user_id)
+
+    def increment(self, counter: str, user_ids: Iterable[int], amount: int = 1) -> None:
+        """
+        Add `amount` to one counter for each listed user, without committing.
+
+        A user listed twice gets it twice. All users are updated by one
+        multi-row `INSERT ... ON CONFLICT DO UPDATE SET n = n + excluded.n`,
+        which creates missing rows and is safe under concurrent writers.
+        """
+        if counter not in COUNTERS:
+            raise ValueError(f"Unknown user stat counter: {counter}")
+        counts = Counter(user_ids)
+        if not counts:
+            return
+
+        now = datetime.utcnow()
+        stmt = upsert_insert(self.db, _stats).values([
+            {"user_id": user_id, counter: amount * times, "updated_at": now}
+            for user_id, times in counts.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={counter: _stats.c[counter] + stmt.excluded[counter], "updated_at": stmt.excluded.updated_at},
+        )
+        self.db.execute(stmt)
+
+    def record_completion(self, user_id: int, completed_at: datetime) -> int:
+        """
+        Count a quest completion and extend the user's daily streak, without committing.
+
+        The streak grows when the previous active day was the day before,
+        stays put on a second completion the same day and restarts at 1
+        after a gap, all in one upsert. Returns the user's completion count
+        including this one, as written.
+        """
+        day = completed_at.date()
+        stmt = upsert_insert(self.db, _stats).values(
+            user_id=user_id,
+            quest_completions=1,
+            current_streak=1,
+            longest_streak=1,
+            last_active_on=day,
+            updated_at=completed_at,
+        )
+        streak = case(
+            (_stats.c.last_active_on >= day, _stats.c.current_streak),
+            (_stats.c.last_active_on == day - timedelta(days=1), _stats.c.current_streak + 1),
+            else_=1,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "quest_completions": _stats.c.quest_completions + 1,
+                "current_streak": streak,
+                "longest_streak": case((streak > _stats.c.longest_streak, streak), else_=_stats.c.longest_streak),
+                "last_active_on": case((_stats.c.last_active_on >= day, _stats.c.last_active_on), else_=day),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        return self.db.execute(stmt.returning(_stats.c.quest_completions)).scalar_one()
+
+    def compute(self, user_ids: List[int]) -> Dict[int, tuple]:
+        """Recount the given users' stats from the source tables, as tuples in `_STAT_COLUMNS` order."""
+        counts: Dict[str, Dict[int, int]] = {}
+        for counter, query in (
+            ("quest_completions", self.db.query(QuestCompletion.user_id, func.count(QuestCompletion.id))
+                .filter(QuestCompletion.user_id.in_(user_ids))
+                .group_by(QuestCompletion.user_id)),
+            ("projects_created", self.db.query(Project.owner_id, func.count(Project.id))
+                .filter(Project.owner_id.in_(user_ids))
+                .group_by(Project.owner_id)),
+            ("projects_published", self.db.query(Project.owner_id, func.count(Project.id))
+                .filter(Project.owner_id.in_(user_ids), Project.status == ProjectStatus.PUBLISHED)
+                .group_by(Project.owner_id)),
+            ("badges", self.db.query(UserBadge.user_id, func.count(UserBadge.id))
+                .filter(UserBadge.user_id.in_(user_ids))
+                .group_by(UserBadge.user_id)),
+            ("achievements", self.db.query(UserAchievement.user_id, func.count(UserAchievement.id))
+                .filter(UserAchievement.user_id.in_(user_ids), UserAchievement.is_completed == True)
+                .group_by(UserAchievement.user_id)),
+        ):
+            counts[counter] = dict(query.all())
+
+        active_days: Dict[int, List[date]] = {user_id: [] for user_id in user_ids}
+        completions = (
+            self.db.query(QuestCompletion.user_id, QuestCompletion.completed_at)
+            .filter(QuestCompletion.user_id.in_(user_ids))
+            .order_by(QuestCompletion.user_id, QuestCompletion.completed_at)
+        )
+        for user_id, completed_at in completions:
+            days = active_days[user_id]
+            if not days or days[-1] != completed_at.date():
+                days.append(completed_at.date())
+
+        return {
+            user_id: tuple(counts[counter].get(user_id, 0) for counter in COUNTERS) + _streaks(active_days[user_id])
+            for user_id in user_ids
+        }
+
+    def repair(self, batch_size: int = 1000) -> List[int]:
+        """
+        Rebuild user_stats from the source tables. Returns the ids of users whose row was wrong.
+
+        Users are processed in id order, `batch_size` per transaction. Only
+        rows that differ from a fresh recount are rewritten; a missing row
+        counts as all zeros.
+        """
+        repaired = []
+        last_id = 0
+        while True:
+            user_ids = [
+                user_id for (user_id,) in self.db.query(User.id)
+                .filter(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ]
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            stored = {
+                row[0]: tuple(row[1:])
+                for row in self.db.execute(
+                    select(_stats.c.user_id, *(_stats.c[column] for column in _STAT_COLUMNS))
+                    .where(_stats.c.user_id.in_(user_ids))
+                )
+            }
+            empty = (0,) * len(COUNTERS) + (0, 0, None)
+            fresh = self.compute(user_ids)
+            drifted = [
+                user_id for user_id in user_ids
+                if stored.get(user_id, empty) != fresh[user_id]
+            ]
+            if drifted:
+                now = datetime.utcnow()
+                stmt = upsert_insert(self.db, _stats).values([
+                    dict(zip(_STAT_COLUMNS, fresh[user_id], strict=True), user_id=user_id, updated_at=now)
+                    for user_id in drifted
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["user_id"],
+                    set_={column: stmt.excluded[column] for column in _STAT_COLUMNS + ("updated_at",)},
+                )
+                self.db.execute(stmt)
+            self.db.commit()
+            repaired.extend(drifted)
+        return repaired
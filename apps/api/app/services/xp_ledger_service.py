@@ -0,0 +1,154 @@
+"""Service for XP ledger materialization and consistency checks."""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.activity import ActivityType
+from app.models.user import User
+from app.models.xp_ledger import XPLedgerEntry
+from app.services.activity_service import ActivityService
+from app.services.rank_index import global_rank_index
+from app.services.user_service import UserService, XPChange
+
+_ledger = XPLedgerEntry.__table__
+_users = User.__table__
+
+
+class BalanceMismatch(NamedTuple):
+    """A user whose stored XP differs from their applied ledger entries."""
+    user_id: int
+    stored_xp: int
+    ledger_xp: int
+
+
+class XPLedgerService:
+    """Service for turning XP ledger entries into user balances."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def pending_count(self) -> int:
+        """Number of ledger entries not yet added to balances."""
+        return self.db.query(func.count(XPLedgerEntry.id)).filter(XPLedgerEntry.applied_at.is_(None)).scalar()
+
+    def materialize_pending(self, batch_size: int = 1000) -> List[XPChange]:
+        """
+        Add unapplied ledger entries to users.xp, one batch per transaction.
+
+        Each user's entries in a batch are summed, so their row is updated
+        once however many awards arrived. On Postgres, entries locked by a
+        concurrent run are skipped. Level-ups get an activity event, and
+        notifications go out after each commit. Returns the changes made.
+        """
+        changes: List[XPChange] = []
+        while True:
+            batch = self._materialize_batch(batch_size)
+            if batch is None:
+                return changes
+            changes.extend(batch)
+
+    def _materialize_batch(self, batch_size: int) -> Optional[List[XPChange]]:
+        entries = self.db.execute(
+            select(_ledger.c.id, _ledger.c.user_id, _ledger.c.delta)
+            .where(_ledger.c.applied_at.is_(None))
+            .order_by(_ledger.c.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not entries:
+            self.db.rollback()
+            return None
+
+        totals: Dict[int, int] = defaultdict(int)
+        for _, user_id, delta in entries:
+            totals[user_id] += delta
+
+        # Users are updated in id order so concurrent runs cannot deadlock
+        user_service = UserService(self.db)
+        changes = [user_service.increment_xp(user_id, totals[user_id]) for user_id in sorted(totals)]
+        self.db.execute(
+            update(_ledger)
+            .where(_ledger.c.id.in_([entry.id for entry in entries]))
+            .values(applied_at=datetime.utcnow())
+        )
+
+        level_ups = [change for change in changes if change.leveled_up]
+        users = user_service.get_many_by_ids(change.user_id for change in level_ups)
+        activity_service = ActivityService(self.db)
+        events = activity_service.stage_events([
+            {
+                "user_id": change.user_id,
+                "event_type": ActivityType.USER_LEVEL_UP,
+                "title": f"{users[change.user_id].username} reached level {change.level}!",
+                "description": f"🎉 Congratulations on reaching level {change.level}!",
+                "xp_amount": 0,
+            }
+            for change in level_ups
+        ]) if level_ups else []
+        self.db.commit()
+
+        for change in changes:
+            user_service.after_xp_commit(change)
+        activity_service.after_commit(events)
+        return changes
+
+    def find_mismatches(self, user_ids: Optional[Iterable[int]] = None) -> List[BalanceMismatch]:
+        """List users whose users.xp is not the sum of their applied ledger entries."""
+        ledger_totals = (
+            select(_ledger.c.user_id, func.sum(_ledger.c.delta).label("ledger_xp"))
+            .where(_ledger.c.applied_at.isnot(None))
+            .group_by(_ledger.c.user_id)
+            .subquery()
+        )
+        ledger_xp = func.coalesce(ledger_totals.c.ledger_xp, 0)
+        query = (
+            select(_users.c.id, _users.c.xp, ledger_xp)
+            .select_from(_users.outerjoin(ledger_totals, ledger_totals.c.user_id == _users.c.id))
+            .where(_users.c.xp != ledger_xp)
+            .order_by(_users.c.id)
+        )
+        if user_ids is not None:
+            query = query.where(_users.c.id.in_(list(user_ids)))
+        return [BalanceMismatch(*row) for row in self.db.execute(query)]
+
+    def repair_balances(self, user_ids: Optional[Iterable[int]] = None) -> List[BalanceMismatch]:
+        """
+        Rebuild users.xp and level from the ledger for every mismatched user.
+
+        The level is recomputed from the rebuilt XP, so it can go down.
+        Returns the mismatches that were repaired.
+        """
+        mismatches = self.find_mismatches(user_ids)
+        user_service = UserService(self.db)
+        for mismatch in mismatches:
+            ledger_xp = (
+                select(func.coalesce(func.sum(_ledger.c.delta), 0))
+                .where(_ledger.c.user_id == _users.c.id, _ledger.c.applied_at.isnot(None))
+                .scalar_subquery()
+            )
+            xp = self.db.execute(
+                update(_users)
+                .where(_users.c.id == mismatch.user_id)
+                .values(xp=ledger_xp)
+                .returning(_users.c.xp)
+            ).scalar_one()
+            self.db.execute(
+                update(_users)
+                .where(_users.c.id == mismatch.user_id)
+                .values(level=user_service.calculate_level(xp))
+            )
+        self.db.commit()
+        
+        if global_rank_index.is_loaded:
+            for user_id, xp in self.db.execute(
+                select(_users.c.id, _users.c.xp).where(
+                    _users.c.id.in_([mismatch.user_id for mismatch in mismatches]),
+                    _users.c.is_active == True,
+                )
+            ):
+                global_rank_index.update(user_id, xp)
+        return mismatches
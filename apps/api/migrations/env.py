@@ -28,7 +28,14 @@ from app.models import (
     Achievement,
     UserAchievement,
     ActivityEvent,
+    TimelineEntry,
     LeaderboardEntry,
+    LeaderboardSnapshot,
+    UserPeriodXP,
+    IdempotencyKey,
+    XPLedgerEntry,
+    JobCheckpoint,
+    UserStatCounters,
 )
 
 # this is the Alembic Config object, which provides
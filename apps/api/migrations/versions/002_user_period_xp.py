@@ -0,0 +1,50 @@
+"""Add user_period_xp rollup table for weekly/monthly leaderboards
+
+Revision ID: 002_user_period_xp
+Revises: 001_initial
+Create Date: 2026-10-17
+
+Existing history is not copied here because period keys use Python's
+strftime week numbering; run `make backfill-period-xp` after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_user_period_xp'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_period_xp',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period_type', postgresql.ENUM(
+            'global', 'team', 'project', 'weekly', 'monthly',
+            name='leaderboardtype', create_type=False,
+        ), nullable=False),
+        sa.Column('period_key', sa.String(20), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('xp', sa.Integer(), nullable=False, default=0),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period_type', 'period_key', 'user_id', name='uq_user_period_xp_user'),
+    )
+    op.create_index('ix_user_period_xp_id', 'user_period_xp', ['id'], unique=False)
+    op.create_index(
+        'ix_user_period_xp_board',
+        'user_period_xp',
+        ['period_type', 'period_key', 'xp'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_period_xp_board', table_name='user_period_xp')
+    op.drop_index('ix_user_period_xp_id', table_name='user_period_xp')
+    op.drop_table('user_period_xp')
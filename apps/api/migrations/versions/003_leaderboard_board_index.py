@@ -0,0 +1,27 @@
+"""Add composite board index to leaderboard_entries
+
+Revision ID: 003_leaderboard_board_index
+Revises: 002_user_period_xp
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_leaderboard_board_index'
+down_revision = '002_user_period_xp'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_leaderboard_entries_board',
+        'leaderboard_entries',
+        ['leaderboard_type', 'scope_id', 'period_key', 'rank'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_leaderboard_entries_board', table_name='leaderboard_entries')
@@ -0,0 +1,31 @@
+"""Add composite (filter, created_at, id) indexes for keyset feed pagination
+
+Revision ID: 004_activity_feed_indexes
+Revises: 003_leaderboard_board_index
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_activity_feed_indexes'
+down_revision = '003_leaderboard_board_index'
+branch_labels = None
+depends_on = None
+
+FEED_INDEXES = [
+    ('ix_activity_events_public_feed', ['is_public', 'created_at', 'id']),
+    ('ix_activity_events_user_feed', ['user_id', 'created_at', 'id']),
+    ('ix_activity_events_team_feed', ['team_id', 'created_at', 'id']),
+    ('ix_activity_events_project_feed', ['project_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, columns in FEED_INDEXES:
+        op.create_index(name, 'activity_events', columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(FEED_INDEXES):
+        op.drop_index(name, table_name='activity_events')
@@ -0,0 +1,41 @@
+"""Add timeline_entries for fan-out-on-write home feeds
+
+Revision ID: 005_timeline_entries
+Revises: 004_activity_feed_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_timeline_entries'
+down_revision = '004_activity_feed_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'timeline_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'event_id', name='uq_timeline_entries_user_event'),
+    )
+    op.create_index('ix_timeline_entries_id', 'timeline_entries', ['id'], unique=False)
+    op.create_index(
+        'ix_timeline_entries_user_recent',
+        'timeline_entries',
+        ['user_id', 'created_at', 'event_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timeline_entries_user_recent', table_name='timeline_entries')
+    op.drop_index('ix_timeline_entries_id', table_name='timeline_entries')
+    op.drop_table('timeline_entries')
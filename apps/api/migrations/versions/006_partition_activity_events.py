@@ -0,0 +1,115 @@
+"""Partition activity_events by month on created_at
+
+Revision ID: 006_partition_activity_events
+Revises: 005_timeline_entries
+Create Date: 2026-10-17
+
+Postgres only. The table is rebuilt as a RANGE-partitioned parent with one
+partition per month from the oldest event through PARTITIONS_AHEAD months
+from now, plus a DEFAULT partition so inserts never fail if maintenance
+falls behind. Existing rows are copied across in one statement, so run
+this in a maintenance window on large tables. Later partitions are created
+by `ensure_activity_partitions` (startup and `make activity-partitions`).
+
+The primary key becomes (id, created_at): Postgres requires the partition
+key in every unique constraint. Ids still come from the same sequence.
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_partition_activity_events'
+down_revision = '005_timeline_entries'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('activity_events_id_seq'),
+    event_type activitytype NOT NULL,
+    user_id integer NOT NULL REFERENCES users (id),
+    project_id integer REFERENCES projects (id),
+    team_id integer REFERENCES teams (id),
+    quest_id integer REFERENCES quests (id),
+    badge_id integer REFERENCES badges (id),
+    achievement_id integer REFERENCES achievements (id),
+    title varchar(200) NOT NULL,
+    description text,
+    extra_data text,
+    xp_amount integer NOT NULL,
+    is_public integer NOT NULL,
+    created_at timestamp without time zone NOT NULL
+"""
+
+INDEXES = [
+    ('ix_activity_events_id', ['id']),
+    ('ix_activity_events_event_type', ['event_type']),
+    ('ix_activity_events_created_at', ['created_at']),
+    ('ix_activity_events_public_feed', ['is_public', 'created_at', 'id']),
+    ('ix_activity_events_user_feed', ['user_id', 'created_at', 'id']),
+    ('ix_activity_events_team_feed', ['team_id', 'created_at', 'id']),
+    ('ix_activity_events_project_feed', ['project_id', 'created_at', 'id']),
+]
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _swap_out_current_table(suffix: str) -> str:
+    """Rename activity_events and its indexes out of the way; returns the new name."""
+    old_name = f'activity_events_{suffix}'
+    op.execute(f'ALTER TABLE activity_events RENAME TO {old_name}')
+    op.execute(f'ALTER TABLE {old_name} RENAME CONSTRAINT activity_events_pkey TO {old_name}_pkey')
+    for name, _ in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_{suffix}')
+    return old_name
+
+
+def _create_indexes() -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, 'activity_events', columns, unique=False)
+
+
+def upgrade() -> None:
+    old_name = _swap_out_current_table('unpartitioned')
+
+    op.execute(f"""
+        CREATE TABLE activity_events ({COLUMNS},
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    oldest = op.get_bind().execute(sa.text(f'SELECT min(created_at) FROM {old_name}')).scalar()
+    now = datetime.utcnow()
+    month = _add_months(oldest or now, 0)
+    last = _add_months(now, PARTITIONS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE activity_events_y{month:%Y}m{month:%m} PARTITION OF activity_events "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        )
+        month = following
+    op.execute('CREATE TABLE activity_events_default PARTITION OF activity_events DEFAULT')
+
+    op.execute(f'INSERT INTO activity_events SELECT * FROM {old_name}')
+    op.execute('ALTER SEQUENCE activity_events_id_seq OWNED BY activity_events.id')
+    op.execute(f'DROP TABLE {old_name}')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    old_name = _swap_out_current_table('partitioned')
+
+    op.execute(f'CREATE TABLE activity_events ({COLUMNS}, PRIMARY KEY (id))')
+    op.execute(f'INSERT INTO activity_events SELECT * FROM {old_name}')
+    op.execute('ALTER SEQUENCE activity_events_id_seq OWNED BY activity_events.id')
+    # Detached partitions are standalone tables and are not copied back
+    op.execute(f'DROP TABLE {old_name}')
+    _create_indexes()
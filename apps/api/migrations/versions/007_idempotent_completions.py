@@ -0,0 +1,77 @@
+"""Unique one-off quest completions and idempotency keys
+
+Revision ID: 007_idempotent_completions
+Revises: 006_partition_activity_events
+Create Date: 2026-10-17
+
+quest_completions gains is_repeatable, copied from the quest, and a
+partial unique index on (quest_id, user_id) for one-off completions.
+Duplicates already recorded for non-repeatable quests are kept as
+history: all but the earliest are flagged is_repeatable so the index can
+be built without deleting rows.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_idempotent_completions'
+down_revision = '006_partition_activity_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'quest_completions',
+        sa.Column('is_repeatable', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.execute("""
+        UPDATE quest_completions qc
+        SET is_repeatable = q.is_repeatable
+        FROM quests q
+        WHERE q.id = qc.quest_id AND q.is_repeatable
+    """)
+    op.execute("""
+        UPDATE quest_completions qc
+        SET is_repeatable = true
+        WHERE NOT qc.is_repeatable AND EXISTS (
+            SELECT 1 FROM quest_completions earlier
+            WHERE earlier.quest_id = qc.quest_id
+            AND earlier.user_id = qc.user_id
+            AND NOT earlier.is_repeatable
+            AND earlier.id < qc.id
+        )
+    """)
+    op.create_index(
+        'uq_quest_completions_once',
+        'quest_completions',
+        ['quest_id', 'user_id'],
+        unique=True,
+        postgresql_where=sa.text('NOT is_repeatable'),
+    )
+
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('scope', sa.String(length=100), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    op.create_index('ix_idempotency_keys_id', 'idempotency_keys', ['id'], unique=False)
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_index('ix_idempotency_keys_id', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
+    op.drop_index('uq_quest_completions_once', table_name='quest_completions')
+    op.drop_column('quest_completions', 'is_repeatable')
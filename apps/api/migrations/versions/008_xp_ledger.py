@@ -0,0 +1,67 @@
+"""Add the append-only xp_ledger
+
+Revision ID: 008_xp_ledger
+Revises: 007_idempotent_completions
+Create Date: 2026-10-17
+
+Every user with XP gets an applied opening_balance entry for their
+current users.xp, so balances equal the ledger sum from the start.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_xp_ledger'
+down_revision = '007_idempotent_completions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'xp_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column(
+            'source_type',
+            sa.Enum(
+                'quest_completion',
+                'badge',
+                'project_publish',
+                'opening_balance',
+                'adjustment',
+                name='xpsource',
+            ),
+            nullable=False,
+        ),
+        sa.Column('source_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_xp_ledger_user', 'xp_ledger', ['user_id', 'id'], unique=False)
+    op.create_index(
+        'ix_xp_ledger_pending',
+        'xp_ledger',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('applied_at IS NULL'),
+    )
+
+    op.execute("""
+        INSERT INTO xp_ledger (user_id, delta, source_type, created_at, applied_at)
+        SELECT id, xp, 'opening_balance', now(), now()
+        FROM users
+        WHERE xp <> 0
+        ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xp_ledger_pending', table_name='xp_ledger')
+    op.drop_index('ix_xp_ledger_user', table_name='xp_ledger')
+    op.drop_table('xp_ledger')
+    op.execute('DROP TYPE IF EXISTS xpsource')
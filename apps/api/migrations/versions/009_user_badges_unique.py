@@ -0,0 +1,33 @@
+"""Make user_badges unique per user and badge
+
+Revision ID: 009_user_badges_unique
+Revises: 008_xp_ledger
+Create Date: 2026-10-17
+
+Badges are awarded with a multi-row INSERT ... ON CONFLICT DO NOTHING,
+which needs the constraint. Duplicate awards left by the old
+check-then-insert path are removed first, keeping the earliest.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009_user_badges_unique'
+down_revision = '008_xp_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM user_badges ub
+        USING user_badges earlier
+        WHERE earlier.user_id = ub.user_id
+        AND earlier.badge_id = ub.badge_id
+        AND earlier.id < ub.id
+    """)
+    op.create_unique_constraint('uq_user_badges_user_badge', 'user_badges', ['user_id', 'badge_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_user_badges_user_badge', 'user_badges', type_='unique')
@@ -0,0 +1,35 @@
+"""Checkpoints for resumable batch jobs
+
+Revision ID: 010_job_checkpoints
+Revises: 009_user_badges_unique
+Create Date: 2026-10-17
+
+One row per running job, named e.g. "badge_backfill:12", holding the last
+key it committed. A row left behind means the job was interrupted and
+will resume from there.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_job_checkpoints'
+down_revision = '009_user_badges_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_checkpoints',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('affected', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
@@ -0,0 +1,54 @@
+"""Event-driven achievement progress
+
+Revision ID: 011_achievement_progress
+Revises: 010_job_checkpoints
+Create Date: 2026-10-17
+
+achievements gain trigger_event and target. A tracked achievement unlocks
+after `target` occurrences of its trigger. user_achievements becomes
+unique per user and achievement, because progress is advanced with
+INSERT ... ON CONFLICT DO UPDATE. Duplicate rows are removed first. A
+completed row is kept over an incomplete one, otherwise the earliest.
+xpsource gains the achievement and daily_bonus ledger sources.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_achievement_progress'
+down_revision = '010_job_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('achievements', sa.Column('trigger_event', sa.String(length=50), nullable=True))
+    op.add_column('achievements', sa.Column('target', sa.Integer(), server_default='1', nullable=False))
+    op.create_index('ix_achievements_trigger_event', 'achievements', ['trigger_event'], unique=False)
+
+    op.execute("""
+        DELETE FROM user_achievements ua
+        USING user_achievements kept
+        WHERE kept.user_id = ua.user_id
+        AND kept.achievement_id = ua.achievement_id
+        AND kept.id <> ua.id
+        AND (kept.is_completed, -kept.id) > (ua.is_completed, -ua.id)
+    """)
+    op.create_unique_constraint(
+        'uq_user_achievements_user_achievement',
+        'user_achievements',
+        ['user_id', 'achievement_id'],
+    )
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE xpsource ADD VALUE IF NOT EXISTS 'achievement'")
+        op.execute("ALTER TYPE xpsource ADD VALUE IF NOT EXISTS 'daily_bonus'")
+
+
+def downgrade() -> None:
+    # Postgres cannot drop enum values; the xpsource additions stay
+    op.drop_constraint('uq_user_achievements_user_achievement', 'user_achievements', type_='unique')
+    op.drop_index('ix_achievements_trigger_event', table_name='achievements')
+    op.drop_column('achievements', 'target')
+    op.drop_column('achievements', 'trigger_event')
@@ -0,0 +1,85 @@
+"""Materialized per-user stat counters
+
+Revision ID: 012_user_stats
+Revises: 011_achievement_progress
+Create Date: 2026-10-17
+
+user_stats holds one row per user with counts of quest completions,
+projects created and published, badges and completed achievements, plus
+the daily quest streak. The application keeps it in step on every write.
+It is filled here from the source tables. Streaks come from runs of
+consecutive completion days: day minus row number is constant within a
+run. `make user-stats-repair` rebuilds it later if it drifts.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_user_stats'
+down_revision = '011_achievement_progress'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('quest_completions', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('projects_created', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('projects_published', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('badges', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('achievements', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('longest_streak', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_active_on', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+    op.execute("""
+        WITH days AS (
+            SELECT DISTINCT user_id, completed_at::date AS day
+            FROM quest_completions
+        ),
+        runs AS (
+            SELECT user_id, day,
+                   day - (row_number() OVER (PARTITION BY user_id ORDER BY day))::integer AS run
+            FROM days
+        ),
+        run_lengths AS (
+            SELECT user_id, count(*) AS length, max(day) AS last_day
+            FROM runs
+            GROUP BY user_id, run
+        ),
+        streaks AS (
+            SELECT user_id,
+                   (array_agg(length ORDER BY last_day DESC))[1] AS current_streak,
+                   max(length) AS longest_streak,
+                   max(last_day) AS last_active_on
+            FROM run_lengths
+            GROUP BY user_id
+        )
+        INSERT INTO user_stats (
+            user_id, quest_completions, projects_created, projects_published,
+            badges, achievements, current_streak, longest_streak, last_active_on
+        )
+        SELECT
+            u.id,
+            (SELECT count(*) FROM quest_completions qc WHERE qc.user_id = u.id),
+            (SELECT count(*) FROM projects p WHERE p.owner_id = u.id),
+            (SELECT count(*) FROM projects p WHERE p.owner_id = u.id AND p.status = 'published'),
+            (SELECT count(*) FROM user_badges ub WHERE ub.user_id = u.id),
+            (SELECT count(*) FROM user_achievements ua WHERE ua.user_id = u.id AND ua.is_completed),
+            coalesce(s.current_streak, 0),
+            coalesce(s.longest_streak, 0),
+            s.last_active_on
+        FROM users u
+        LEFT JOIN streaks s ON s.user_id = u.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
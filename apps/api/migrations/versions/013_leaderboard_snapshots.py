@@ -0,0 +1,32 @@
+"""Record when each cached leaderboard was computed
+
+Revision ID: 013_leaderboard_snapshots
+Revises: 012_user_stats
+Create Date: 2026-10-17
+
+Snapshot freshness used to come from the computed_at of a board's first
+entry. That made an empty board look uncached, so every read of one
+recomputed it. Boards get a snapshot row the next time they are cached.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_leaderboard_snapshots'
+down_revision = '012_user_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'leaderboard_snapshots',
+        sa.Column('board_key', sa.String(length=80), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('board_key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leaderboard_snapshots')
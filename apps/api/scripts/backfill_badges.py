@@ -0,0 +1,56 @@
+"""Award badges to existing users who already meet their requirements.
+
+Run after adding a badge or lowering a requirement. Users are processed
+in committed chunks, so an interrupted run resumes where it stopped.
+
+Usage: python -m scripts.backfill_badges [--badge-id ID ...] [--chunk-size N] [--restart]
+"""
+
+import argparse
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.jobs.badge_jobs import BackfillProgress, backfill_badges
+
+
+def _print_progress(progress: BackfillProgress):
+    print(
+        f"  badge {progress.badge_id}: {progress.scanned}/{progress.total_users} users scanned, "
+        f"{progress.awarded} awarded"
+    )
+
+
+def run_backfill(badge_ids=None, chunk_size=None, restart=False):
+    """Backfill the given badges, or all active badges."""
+    db = SessionLocal()
+    
+    try:
+        print("🏅 Backfilling badges...")
+        results = backfill_badges(
+            db,
+            badge_ids=badge_ids,
+            chunk_size=chunk_size,
+            restart=restart,
+            progress=_print_progress,
+        )
+        awarded = sum(result.awarded for result in results)
+        print(f"✅ Awarded {awarded} badges across {len(results)} badge definitions")
+    except Exception as e:
+        print(f"\n❌ Error backfilling badges: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--badge-id", type=int, action="append", dest="badge_ids")
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--restart", action="store_true", help="ignore saved checkpoints")
+    args = parser.parse_args()
+    run_backfill(args.badge_ids, args.chunk_size, args.restart)
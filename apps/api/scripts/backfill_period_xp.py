@@ -0,0 +1,30 @@
+"""Rebuild weekly/monthly XP rollups from quest completion history."""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.leaderboard_service import LeaderboardService
+
+
+def backfill_period_xp():
+    """Recompute every user_period_xp row from quest_completions."""
+    db = SessionLocal()
+    
+    try:
+        print("📊 Rebuilding period XP rollups...")
+        count = LeaderboardService(db).rebuild_period_xp()
+        print(f"✅ Wrote {count} rollup rows")
+    except Exception as e:
+        print(f"\n❌ Error rebuilding rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_period_xp()
@@ -0,0 +1,124 @@
+"""Measure activity feed latency and query count.
+
+Usage:
+    python -m scripts.bench_feed --database-url sqlite:////tmp/feed.db --seed 1000000
+
+`--seed` inserts synthetic users and events first, so point it at a scratch
+database, never at a real one.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+import app.models  # noqa: F401 - register every table for create_all
+from app.models.activity import ActivityEvent, ActivityType
+from app.models.user import User
+from app.services.activity_service import ActivityService
+
+BATCH_SIZE = 10000
+
+
+def seed(engine, events: int, users: int) -> None:
+    """Create tables and insert synthetic users and public events."""
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "email": f"bench{i}@example.com",
+                "username": f"bench{i}",
+                "hashed_password": "x",
+                "avatar_url": f"https://example.com/{i}.png",
+                "xp": 0,
+                "level": 1,
+                "is_active": True,
+                "is_superuser": False,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(users)
+        ])
+        first_user_id = conn.execute(User.__table__.select().order_by(User.id).limit(1)).first().id
+
+        for start in range(0, events, BATCH_SIZE):
+            conn.execute(insert(ActivityEvent), [
+                {
+                    "user_id": first_user_id + (i % users),
+                    "event_type": ActivityType.QUEST_COMPLETED,
+                    "title": f"Completed quest {i}",
+                    "xp_amount": 10,
+                    "is_public": 1,
+                    "created_at": now - timedelta(seconds=i),
+                }
+                for i in range(start, min(start + BATCH_SIZE, events))
+            ])
+
+
+def measure(session_factory, engine, per_page: int, pages: int, iterations: int) -> None:
+    """Time the first page and a cursor walk through the public feed."""
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(1))
+
+    first_page, walk_pages = [], []
+    for _ in range(iterations):
+        db = session_factory()
+        try:
+            service = ActivityService(db)
+            queries.clear()
+            started = time.perf_counter()
+            page = service.get_feed(per_page=per_page)
+            first_page.append((time.perf_counter() - started) * 1000)
+            first_page_queries = len(queries)
+
+            for _ in range(pages):
+                if not page.next_cursor:
+                    break
+                started = time.perf_counter()
+                page = service.get_feed(per_page=per_page, cursor=page.next_cursor)
+                walk_pages.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+    def report(label, samples):
+        samples = sorted(samples)
+        p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+        print(f"{label:<14} p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+    print(f"per_page={per_page}  queries per page={first_page_queries}")
+    report("first page", first_page)
+    report("cursor pages", walk_pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic events to insert first")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.seed:
+        print(f"🌱 Seeding {args.seed} events for {args.users} users...")
+        seed(engine, args.seed, args.users)
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    measure(session_factory, engine, args.per_page, args.pages, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
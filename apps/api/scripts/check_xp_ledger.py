@@ -0,0 +1,44 @@
+"""Check users.xp against the XP ledger and optionally repair it.
+
+Usage: python -m scripts.check_xp_ledger [--repair]
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.xp_ledger_service import XPLedgerService
+
+
+def check_xp_ledger(repair: bool = False):
+    """Report users whose balance differs from the ledger, rebuilding them if asked."""
+    db = SessionLocal()
+    
+    try:
+        service = XPLedgerService(db)
+        print(f"⏳ {service.pending_count()} ledger entries waiting to be applied")
+        
+        print("🔍 Comparing balances with the XP ledger...")
+        mismatches = service.repair_balances() if repair else service.find_mismatches()
+        for mismatch in mismatches:
+            print(f"  user {mismatch.user_id}: users.xp={mismatch.stored_xp} ledger={mismatch.ledger_xp}")
+        
+        if not mismatches:
+            print("✅ All balances match the ledger")
+        elif repair:
+            print(f"✅ Rebuilt {len(mismatches)} balances from the ledger")
+        else:
+            print(f"⚠️  {len(mismatches)} balances differ; rerun with --repair to rebuild them")
+    except Exception as e:
+        print(f"\n❌ Error checking XP ledger: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    check_xp_ledger(repair="--repair" in sys.argv[1:])
@@ -0,0 +1,38 @@
+"""Create upcoming activity_events partitions and archive expired ones.
+
+Run daily (e.g. from cron) on Postgres deployments.
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.jobs.activity_jobs import archive_activity_partitions, ensure_activity_partitions
+
+
+def maintain_activity_partitions():
+    """Run partition creation, then retention."""
+    db = SessionLocal()
+    
+    try:
+        print("🗂️  Ensuring upcoming activity partitions...")
+        created = ensure_activity_partitions(db)
+        print(f"✅ Created {len(created)} partitions {created if created else ''}")
+        
+        print(f"📦 Archiving partitions older than {settings.ACTIVITY_RETENTION_MONTHS} months...")
+        archived = archive_activity_partitions(db)
+        print(f"✅ Archived {len(archived)} partitions to {settings.ACTIVITY_ARCHIVE_DIR}")
+    except Exception as e:
+        print(f"\n❌ Error maintaining partitions: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    maintain_activity_partitions()
@@ -0,0 +1,34 @@
+"""Delete expired Idempotency-Key records.
+
+Run daily (e.g. from cron). Expired keys are also replaced when reused,
+so this only keeps the table from growing.
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.idempotency_service import IdempotencyService
+
+
+def purge_idempotency_keys():
+    """Delete idempotency keys past their TTL."""
+    db = SessionLocal()
+    
+    try:
+        print("🧹 Purging expired idempotency keys...")
+        removed = IdempotencyService(db).purge_expired()
+        print(f"✅ Removed {removed} keys")
+    except Exception as e:
+        print(f"\n❌ Error purging idempotency keys: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    purge_idempotency_keys()
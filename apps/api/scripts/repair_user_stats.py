@@ -0,0 +1,40 @@
+"""Rebuild the user_stats counters from their source tables.
+
+Counters are kept in step on every write; run this after bulk edits that
+bypass the services, or to check for drift.
+
+Usage: python -m scripts.repair_user_stats
+"""
+
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.user_stats_service import UserStatsService
+
+
+def repair_user_stats():
+    """Recount every user's stats and rewrite the rows that drifted."""
+    db = SessionLocal()
+    
+    try:
+        print("🔢 Recounting user stats...")
+        repaired = UserStatsService(db).repair()
+        if repaired:
+            print(f"✅ Rebuilt stats for {len(repaired)} users: {', '.join(map(str, repaired[:20]))}"
+                  f"{' ...' if len(repaired) > 20 else ''}")
+        else:
+            print("✅ All user stats match their source tables")
+    except Exception as e:
+        print(f"\n❌ Error repairing user stats: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    repair_user_stats()
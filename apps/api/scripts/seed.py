@@ -15,8 +15,21 @@ from app.models.user import User
 from app.models.team import Team, TeamMember, TeamRole
 from app.models.project import Project, ProjectStatus
 from app.models.quest import Quest, QuestCompletion, QuestDifficulty, QuestCategory
-from app.models.gamification import Badge, Achievement, BadgeCategory, AchievementCategory
+from app.models.gamification import (
+    Badge,
+    Achievement,
+    UserAchievement,
+    BadgeCategory,
+    AchievementCategory,
+    AchievementTrigger,
+)
 from app.models.activity import ActivityEvent, ActivityType
+from app.models.leaderboard import UserPeriodXP
+from app.models.xp_ledger import XPLedgerEntry, XPSource
+from app.models.idempotency import IdempotencyKey
+from app.models.user_stats import UserStatCounters
+from app.services.leaderboard_service import LeaderboardService
+from app.services.user_stats_service import UserStatsService
 
 
 def seed_database():
@@ -29,11 +42,16 @@ def seed_database():
         # Clear existing data (optional, comment out for append mode)
         print("  Clearing existing data...")
         db.query(ActivityEvent).delete()
+        db.query(UserPeriodXP).delete()
+        db.query(UserStatCounters).delete()
+        db.query(XPLedgerEntry).delete()
+        db.query(IdempotencyKey).delete()
         db.query(QuestCompletion).delete()
         db.query(Quest).delete()
         db.query(Project).delete()
         db.query(TeamMember).delete()
         db.query(Team).delete()
+        db.query(UserAchievement).delete()
         db.query(Achievement).delete()
         db.query(Badge).delete()
         db.query(User).delete()
@@ -71,6 +89,18 @@ def seed_database():
         for user in users:
             db.refresh(user)
         
+        # Seeded XP enters the ledger as opening balances
+        db.add_all([
+            XPLedgerEntry(
+                user_id=user.id,
+                delta=user.xp,
+                source_type=XPSource.OPENING_BALANCE,
+                applied_at=datetime.utcnow(),
+            )
+            for user in users
+        ])
+        db.commit()
+        
         # Create teams
         print("  Creating teams...")
         teams = []
@@ -227,7 +257,15 @@ def seed_database():
             ("Completionist", "Earn all badges", "🏅", AchievementCategory.LEGENDARY, 500, 1000, 1, True),
         ]
         
+        # Achievements unlocked by counting events: name -> (trigger, target)
+        tracked = {
+            "First Blood": (AchievementTrigger.QUEST_COMPLETED, 1),
+            "Team Player": (AchievementTrigger.TEAM_JOINED, 1),
+            "Publisher": (AchievementTrigger.PROJECT_PUBLISHED, 1),
+        }
+        
         for name, description, icon, category, points, xp_reward, rarity, is_secret in achievement_data:
+            trigger_event, target = tracked.get(name, (None, 1))
             achievement = Achievement(
                 name=name,
                 description=description,
@@ -238,6 +276,8 @@ def seed_database():
                 rarity_score=rarity,
                 is_secret=is_secret,
                 is_active=True,
+                trigger_event=trigger_event.value if trigger_event else None,
+                target=target,
                 created_at=datetime.utcnow() - timedelta(days=90),
             )
             db.add(achievement)
@@ -275,6 +315,7 @@ def seed_database():
                 quest_id=quest.id,
                 xp_earned=quest.xp_reward,
                 completed_at=datetime.utcnow() - timedelta(days=days_ago),
+                is_repeatable=quest.is_repeatable,
             )
             db.add(completion)
         
@@ -305,6 +346,14 @@ def seed_database():
         
         db.commit()
         
+        # Build weekly/monthly XP rollups from the seeded completions
+        print("  Building period XP rollups...")
+        LeaderboardService(db).rebuild_period_xp()
+        
+        # Seed rows bypass the services, so count them once at the end
+        print("  Building user stat counters...")
+        UserStatsService(db).repair()
+        
         print("\n✅ Database seeding completed!")
         print(f"   Created {len(users)} users")
         print(f"   Created {len(teams)} teams")
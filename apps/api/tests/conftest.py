@@ -8,6 +8,16 @@ from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.core.database import Base, get_db
+from app.jobs.gamification_jobs import (
+    achievement_progress_scheduler,
+    leaderboard_refresh_scheduler,
+    xp_balance_scheduler,
+)
+from app.realtime import get_broker
+from app.services.achievement_catalog import achievement_catalog
+from app.services.badge_catalog import badge_catalog
+from app.services.feed_cache import get_feed_cache
+from app.services.rank_index import global_rank_index
 
 
 # Use in-memory SQLite for tests
@@ -20,11 +30,27 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Scheduled jobs only run when a test flushes them explicitly
+leaderboard_refresh_scheduler.session_factory = TestingSessionLocal
+leaderboard_refresh_scheduler.debounce_seconds = 3600
+leaderboard_refresh_scheduler.max_delay_seconds = 3600
+xp_balance_scheduler.session_factory = TestingSessionLocal
+xp_balance_scheduler.debounce_seconds = 3600
+xp_balance_scheduler.max_delay_seconds = 3600
+achievement_progress_scheduler.session_factory = TestingSessionLocal
+achievement_progress_scheduler.debounce_seconds = 3600
+achievement_progress_scheduler.max_delay_seconds = 3600
+
 
 @pytest.fixture(scope="function")
 def db():
     """Create a fresh database for each test."""
     Base.metadata.create_all(bind=engine)
+    global_rank_index.clear()
+    get_broker().clear()
+    get_feed_cache().clear()
+    badge_catalog.invalidate()
+    achievement_catalog.invalidate()
     db = TestingSessionLocal()
     try:
         yield db
@@ -44,7 +70,11 @@ def client(db):
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
+        # Startup warm-up reads the real database; rebuild from the test one
+        global_rank_index.clear()
         yield test_client
+        leaderboard_refresh_scheduler.cancel()
+        achievement_progress_scheduler.cancel()
     app.dependency_overrides.clear()
 
 
@@ -0,0 +1,112 @@
+"""Tests for event-driven achievement progress."""
+
+import pytest
+from fastapi import status
+
+
+class TestAchievementProgress:
+    """Test achievement progress counters and unlocks."""
+
+    @pytest.fixture
+    def achievements(self, db):
+        """Create a one-quest and a three-quest achievement plus an untracked one."""
+        from app.models.gamification import Achievement, AchievementTrigger
+
+        achievements = [
+            Achievement(name="First Steps", description="Complete a quest", icon="boot",
+                        trigger_event=AchievementTrigger.QUEST_COMPLETED.value, target=1, xp_reward=20),
+            Achievement(name="Hat Trick", description="Complete three quests", icon="hat",
+                        trigger_event=AchievementTrigger.QUEST_COMPLETED.value, target=3, xp_reward=0),
+            Achievement(name="Untracked", description="Awarded by hand", icon="hand"),
+        ]
+        db.add_all(achievements)
+        db.commit()
+        return achievements
+
+    def test_counts_until_target_then_unlocks_once(self, db, test_user, achievements):
+        """Test counters advance per flush and each achievement unlocks exactly once."""
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.models.gamification import UserAchievement
+        from app.services.gamification_service import GamificationService
+
+        service = GamificationService(db)
+        key = (test_user.id, "quest_completed")
+
+        unlocks = service.advance_achievements({key: 1})
+        assert [unlock.achievement.name for unlock in unlocks] == ["First Steps"]
+        assert unlocks[0].xp_change.total_xp == 20
+
+        assert service.advance_achievements({key: 1}) == []
+        unlocks = service.advance_achievements({key: 2})
+        assert [unlock.achievement.name for unlock in unlocks] == ["Hat Trick"]
+        assert service.advance_achievements({key: 1}) == []
+
+        progress = {
+            row.achievement.name: (row.progress, row.is_completed)
+            for row in db.query(UserAchievement).filter(UserAchievement.user_id == test_user.id)
+        }
+        assert progress == {"First Steps": (1, True), "Hat Trick": (4, True)}
+        db.refresh(test_user)
+        assert test_user.xp == 20
+        events = db.query(ActivityEvent).filter(ActivityEvent.event_type == ActivityType.ACHIEVEMENT_UNLOCKED)
+        assert events.count() == 2
+
+    def test_unknown_trigger_writes_nothing(self, db, test_user, achievements):
+        """Test events no achievement listens to are ignored."""
+        from app.models.gamification import UserAchievement
+        from app.services.gamification_service import GamificationService
+
+        assert GamificationService(db).advance_achievements({(test_user.id, "team_joined"): 1}) == []
+        assert db.query(UserAchievement).count() == 0
+
+    def test_quest_completions_coalesce_into_one_flush(self, client, auth_headers, db, test_user, achievements):
+        """Test completing quests counts towards achievements on the next scheduler run."""
+        from app.jobs.gamification_jobs import achievement_progress_scheduler
+        from app.models.gamification import UserAchievement
+        from app.models.quest import Quest
+
+        quests = [Quest(title=f"Quest {index}", description="Do it", xp_reward=5, is_repeatable=True)
+                  for index in range(3)]
+        db.add_all(quests)
+        db.commit()
+
+        for quest in quests:
+            response = client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+        assert achievement_progress_scheduler.pending == {(test_user.id, "quest_completed"): 3}
+
+        achievement_progress_scheduler.flush()
+        completed = db.query(UserAchievement).filter(UserAchievement.is_completed == True)
+        assert {row.achievement.name for row in completed} == {"First Steps", "Hat Trick"}
+
+    def test_failed_flush_keeps_its_counts(self, db, test_user, achievements, monkeypatch):
+        """Test a batch whose flush fails is marked again instead of dropped."""
+        from app.jobs.gamification_jobs import achievement_progress_scheduler
+        from app.services.gamification_service import GamificationService
+
+        def fail(self, increments):
+            raise RuntimeError("database went away")
+
+        key = (test_user.id, "quest_completed")
+        achievement_progress_scheduler.mark(key, 2)
+        with monkeypatch.context() as patch:
+            patch.setattr(GamificationService, "advance_achievements", fail)
+            achievement_progress_scheduler.flush()
+        assert achievement_progress_scheduler.pending == {key: 2}
+        achievement_progress_scheduler.cancel()
+
+
+class TestDailyBonus:
+    """Test the daily login bonus job."""
+
+    def test_awards_once_per_day(self, db, test_user):
+        """Test the bonus is paid on the first call of the day only."""
+        from app.core.config import settings
+        from app.jobs.gamification_jobs import achievement_progress_scheduler, award_daily_bonus
+
+        assert award_daily_bonus(db, test_user.id) is True
+        assert award_daily_bonus(db, test_user.id) is False
+        db.refresh(test_user)
+        assert test_user.xp == settings.DAILY_BONUS_XP
+        assert achievement_progress_scheduler.pending == {(test_user.id, "daily_login"): 1}
+        achievement_progress_scheduler.cancel()
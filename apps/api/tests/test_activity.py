@@ -0,0 +1,478 @@
+"""Tests for activity feed endpoints."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+
+
+class TestActivityEndpoints:
+    """Test activity feed endpoints."""
+
+    @pytest.fixture
+    def events(self, db, test_user):
+        """Create a run of public events, several sharing a timestamp."""
+        from app.models.activity import ActivityEvent, ActivityType
+
+        base = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+        events = []
+        for i in range(7):
+            event = ActivityEvent(
+                user_id=test_user.id,
+                event_type=ActivityType.QUEST_COMPLETED,
+                title=f"Event {i}",
+                is_public=True,
+                # Pairs of events share a created_at to exercise the id tiebreak
+                created_at=base + timedelta(minutes=i // 2),
+            )
+            db.add(event)
+            events.append(event)
+        db.commit()
+        return events
+
+    def test_cursor_walks_feed_without_gaps(self, client, events):
+        """Test following next_cursor visits every event exactly once, newest first."""
+        seen = []
+        cursor = None
+        while True:
+            params = {"per_page": 3}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/v1/activity/", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            seen.extend(item["id"] for item in data["items"])
+            assert data["has_more"] == (data["next_cursor"] is not None)
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        expected = sorted(events, key=lambda e: (e.created_at, e.id), reverse=True)
+        assert seen == [e.id for e in expected]
+
+    def test_offset_pages_still_supported(self, client, events):
+        """Test page-number pagination matches the cursor walk."""
+        response = client.get("/api/v1/activity/", params={"page": 2, "per_page": 3})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] is None
+        assert [item["title"] for item in data["items"]] == ["Event 3", "Event 2", "Event 1"]
+        assert data["has_more"] is True
+
+    def test_total_is_opt_in(self, client, events):
+        """Test total is only computed when requested."""
+        response = client.get("/api/v1/activity/", params={"include_total": True})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 7
+
+    def test_invalid_cursor(self, client, events):
+        """Test a malformed cursor is rejected."""
+        response = client.get("/api/v1/activity/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_first_page_is_cached_until_an_event_lands(self, client, db, events, test_user):
+        """Test repeat first-page reads hit the cache and new events invalidate it."""
+        from app.models.activity import ActivityType
+        from app.services.activity_service import ActivityService
+
+        first = client.get("/api/v1/activity/", params={"per_page": 3})
+        second = client.get("/api/v1/activity/", params={"per_page": 3})
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+
+        # Other page sizes, later pages and cursors are separate or uncached
+        assert client.get("/api/v1/activity/", params={"per_page": 4}).headers["X-Cache"] == "MISS"
+        assert client.get("/api/v1/activity/", params={"page": 2}).headers["X-Cache"] == "MISS"
+
+        event = ActivityService(db).create_event(
+            user_id=test_user.id,
+            event_type=ActivityType.QUEST_COMPLETED,
+            title="Fresh",
+        )
+        third = client.get("/api/v1/activity/", params={"per_page": 3})
+        assert third.headers["X-Cache"] == "MISS"
+        assert third.json()["items"][0]["id"] == event.id
+
+        stats = client.get("/metrics").json()["feed_cache"]
+        assert stats["hits"] == 1
+        assert stats["invalidations"] >= 2
+
+
+class TestHomeTimeline:
+    """Test fan-out-on-write home timelines."""
+
+    @pytest.fixture
+    def team(self, db, test_user):
+        """Create a team with the test user and one other member."""
+        from app.models.team import Team, TeamMember, TeamRole
+        from app.models.user import User
+
+        other = User(email="other@example.com", username="other", hashed_password="x")
+        team = Team(name="Builders", slug="builders")
+        db.add_all([other, team])
+        db.flush()
+        db.add_all([
+            TeamMember(team_id=team.id, user_id=test_user.id, role=TeamRole.OWNER),
+            TeamMember(team_id=team.id, user_id=other.id),
+        ])
+        db.commit()
+        return team
+
+    def _post_team_events(self, db, team, count):
+        from app.models.activity import ActivityType
+        from app.models.team import TeamMember
+        from app.services.activity_service import ActivityService
+
+        author = db.query(TeamMember).filter(TeamMember.team_id == team.id).first()
+        return [
+            ActivityService(db).create_event(
+                user_id=author.user_id,
+                event_type=ActivityType.TEAM_JOINED,
+                title=f"Team event {i}",
+                team_id=team.id,
+            )
+            for i in range(count)
+        ]
+
+    def test_team_event_reaches_member_timelines(self, client, db, auth_headers, team):
+        """Test team events are fanned out and served from the home feed."""
+        from app.models.activity import TimelineEntry
+
+        events = self._post_team_events(db, team, 2)
+        assert db.query(TimelineEntry).count() == 4
+
+        response = client.get("/api/v1/activity/home", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.json()["items"]] == [e.id for e in reversed(events)]
+
+    def test_timeline_is_capped(self, client, db, auth_headers, team, test_user, monkeypatch):
+        """Test timelines keep only the newest entries."""
+        from app.core.config import settings
+        from app.models.activity import TimelineEntry
+
+        monkeypatch.setattr(settings, "TIMELINE_MAX_ENTRIES", 3)
+        monkeypatch.setattr(settings, "TIMELINE_TRIM_PROBABILITY", 0.0)
+        events = self._post_team_events(db, team, 4)
+        assert db.query(TimelineEntry).filter(TimelineEntry.user_id == test_user.id).count() == 4
+
+        monkeypatch.setattr(settings, "TIMELINE_TRIM_PROBABILITY", 1.0)
+        events += self._post_team_events(db, team, 1)
+        kept = db.query(TimelineEntry.event_id).filter(TimelineEntry.user_id == test_user.id)
+        assert sorted(event_id for event_id, in kept) == [e.id for e in events[-3:]]
+
+    def test_private_events_stay_off_home_feed(self, client, db, auth_headers, team):
+        """Test the home feed only shows public events, like the team feed."""
+        from app.models.activity import ActivityType
+        from app.services.activity_service import ActivityService
+
+        public = self._post_team_events(db, team, 1)
+        ActivityService(db).create_event(
+            user_id=public[0].user_id,
+            event_type=ActivityType.TEAM_JOINED,
+            title="Private team event",
+            team_id=team.id,
+            is_public=False,
+        )
+
+        response = client.get("/api/v1/activity/home", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.json()["items"]] == [public[0].id]
+
+    def test_large_team_falls_back_to_read_time(self, client, db, auth_headers, team, monkeypatch):
+        """Test large teams skip fan-out but still appear in the home feed."""
+        from app.core.config import settings
+        from app.models.activity import TimelineEntry
+
+        monkeypatch.setattr(settings, "TIMELINE_FANOUT_MAX_TEAM_SIZE", 1)
+        events = self._post_team_events(db, team, 2)
+        assert db.query(TimelineEntry).count() == 0
+
+        response = client.get("/api/v1/activity/home", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.json()["items"]] == [e.id for e in reversed(events)]
+
+
+class TestActivityStream:
+    """Test the live activity broker and stream endpoint."""
+
+    async def test_broker_replays_after_last_event_id(self):
+        """Test subscribers resume from Last-Event-ID and then receive live messages."""
+        from app.realtime import InMemoryBroker, Message
+
+        broker = InMemoryBroker(queue_size=10, replay_size=3)
+        for event_id in range(1, 6):
+            broker.publish("team:1", Message(event_id, "activity", "{}"))
+
+        subscription, replay, missed = broker.subscribe("team:1", last_event_id=3)
+        assert [m.id for m in replay] == [4, 5]
+        assert missed is False
+
+        broker.publish("team:1", Message(6, "activity", "{}"))
+        assert (await subscription.get(timeout=1)).id == 6
+
+        _, replay, missed = broker.subscribe("team:1", last_event_id=1)
+        assert [m.id for m in replay] == [4, 5, 6]
+        assert missed is True
+
+        _, replay, missed = broker.subscribe("team:2", last_event_id=1)
+        assert (replay, missed) == ([], True)
+
+    async def test_idle_channels_stop_publishing(self):
+        """Test channels idle past the grace period are not live and lose their replay buffer."""
+        from app.realtime import InMemoryBroker, Message
+
+        broker = InMemoryBroker(queue_size=10, replay_size=10, idle_grace_seconds=3600)
+        subscription, _, _ = broker.subscribe("team:1")
+        broker.publish("team:1", Message(1, "activity", "{}"))
+        broker.unsubscribe(subscription)
+        assert broker.live_channels(["team:1", "team:2"]) == {"team:1"}
+
+        broker.idle_grace_seconds = 0
+        assert broker.live_channels(["team:1"]) == set()
+        _, replay, missed = broker.subscribe("team:1", last_event_id=0)
+        assert (replay, missed) == ([], True)
+
+    async def test_slow_subscriber_is_dropped(self):
+        """Test a subscriber that falls behind its bounded queue is closed."""
+        from app.realtime import InMemoryBroker, Message
+
+        broker = InMemoryBroker(queue_size=2, replay_size=10)
+        subscription, _, _ = broker.subscribe("public")
+        for event_id in range(1, 4):
+            broker.publish("public", Message(event_id, "activity", "{}"))
+
+        assert await subscription.get(timeout=1) is None
+        assert subscription.overflowed is True
+
+    async def test_create_event_publishes_public_events(self, db, test_user):
+        """Test committed public events reach the public and user channels."""
+        from app.models.activity import ActivityType
+        from app.realtime import get_broker
+        from app.services.activity_service import ActivityService
+
+        channels = ("public", f"user:{test_user.id}")
+        subscriptions = [get_broker().subscribe(channel)[0] for channel in channels]
+        event = ActivityService(db).create_event(
+            user_id=test_user.id,
+            event_type=ActivityType.QUEST_COMPLETED,
+            title="Live event",
+        )
+        ActivityService(db).create_event(
+            user_id=test_user.id,
+            event_type=ActivityType.QUEST_COMPLETED,
+            title="Private event",
+            is_public=False,
+        )
+
+        for subscription in subscriptions:
+            message = await subscription.get(timeout=1)
+            assert message.id == event.id
+            assert '"username":"testuser"' in message.data
+            with pytest.raises(TimeoutError):
+                await subscription.get(timeout=0.05)
+
+    async def test_unwatched_events_are_not_published(self, db, test_user):
+        """Test events with no live channel are neither reloaded nor published."""
+        from sqlalchemy import event as sa_event
+        from app.models.activity import ActivityType
+        from app.realtime import get_broker
+        from app.services.activity_service import ActivityService
+
+        service = ActivityService(db)
+        event = service.create_event(
+            user_id=test_user.id,
+            event_type=ActivityType.QUEST_COMPLETED,
+            title="Unwatched",
+        )
+
+        executed = []
+
+        def record(conn, cursor, statement, *args):
+            executed.append(statement)
+
+        sa_event.listen(db.get_bind(), "before_cursor_execute", record)
+        try:
+            service.publish_events([event])
+        finally:
+            sa_event.remove(db.get_bind(), "before_cursor_execute", record)
+        assert executed == []
+
+        _, replay, missed = get_broker().subscribe("public", last_event_id=0)
+        assert (replay, missed) == ([], True)
+
+    def test_stream_rejects_unknown_scope(self, client):
+        """Test the stream only accepts known scopes."""
+        response = client.get("/api/v1/activity/stream", params={"scope": "everything"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestActivityEventWriter:
+    """Test the write-behind activity buffer."""
+
+    @pytest.fixture
+    def writer(self, db, monkeypatch):
+        """Swap in a started writer bound to the test database."""
+        from app.services import activity_service
+        from app.services.activity_writer import ActivityEventWriter
+        from tests.conftest import TestingSessionLocal
+
+        writer = ActivityEventWriter(
+            activity_service._write_buffered_events,
+            max_queue_size=3,
+            batch_size=2,
+            flush_interval_ms=3600 * 1000,
+            session_factory=TestingSessionLocal,
+        )
+        monkeypatch.setattr(activity_service, "activity_event_writer", writer)
+        writer.start()
+        yield writer
+        writer.close()
+
+    async def test_buffered_events_are_batched_on_close(self, db, test_user, writer):
+        """Test buffered events are written in batches and published when flushed."""
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.realtime import get_broker
+        from app.services.activity_service import ActivityService
+
+        subscription, _, _ = get_broker().subscribe("public")
+        service = ActivityService(db)
+        results = [
+            service.create_event(
+                user_id=test_user.id,
+                event_type=ActivityType.QUEST_COMPLETED,
+                title=f"Buffered {i}",
+            )
+            for i in range(3)
+        ]
+        assert results == [None, None, None]
+
+        writer.close()
+        assert writer.written == 3
+        titles = [title for title, in db.query(ActivityEvent.title).order_by(ActivityEvent.id)]
+        assert titles == ["Buffered 0", "Buffered 1", "Buffered 2"]
+
+        delivered = [await subscription.get(timeout=1) for _ in range(3)]
+        assert [message.data.count("Buffered") for message in delivered] == [1, 1, 1]
+
+    def test_durable_events_write_inline(self, db, test_user, writer):
+        """Test durable events bypass the buffer."""
+        from app.models.activity import ActivityType
+        from app.services.activity_service import ActivityService
+
+        event = ActivityService(db).create_event(
+            user_id=test_user.id,
+            event_type=ActivityType.QUEST_COMPLETED,
+            title="Durable",
+            durable=True,
+        )
+        assert event.id is not None
+        assert writer.written == 0
+
+    def test_failed_batch_falls_back_to_single_rows(self, db, test_user, writer):
+        """Test a batch with one bad row still writes the others."""
+        from app.models.activity import ActivityEvent, ActivityType
+
+        writer.retry_delay_seconds = 0
+        good = {"user_id": test_user.id, "event_type": ActivityType.QUEST_COMPLETED, "title": "Good"}
+        bad = {**good, "title": None}
+        writer._write([good, bad])
+
+        assert writer.written == 1
+        assert writer.failed == 1
+        assert [title for title, in db.query(ActivityEvent.title)] == ["Good"]
+
+
+class TestActivityRetention:
+    """Test activity retention and archive helpers."""
+
+    @pytest.mark.parametrize("partitioned, titles", [(True, ["Recent"]), (False, ["Recent", "Expired"])])
+    def test_feeds_hide_events_past_retention(self, client, db, test_user, monkeypatch, partitioned, titles):
+        """Test events older than the retention window drop out of partitioned feeds only."""
+        from app.core.config import settings
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.services import activity_service
+
+        monkeypatch.setattr(settings, "ACTIVITY_RETENTION_MONTHS", 1)
+        monkeypatch.setattr(activity_service, "is_partitioned", lambda db: partitioned)
+        now = datetime.utcnow()
+        for title, created_at in (("Recent", now), ("Expired", now - timedelta(days=70))):
+            db.add(ActivityEvent(
+                user_id=test_user.id,
+                event_type=ActivityType.QUEST_COMPLETED,
+                title=title,
+                is_public=True,
+                created_at=created_at,
+            ))
+        db.commit()
+
+        response = client.get("/api/v1/activity/")
+        assert [item["title"] for item in response.json()["items"]] == titles
+
+    def test_retention_cutoff_is_month_aligned(self, monkeypatch):
+        """Test the cutoff falls on the month boundary the archive job uses."""
+        from app.core.config import settings
+        from app.services.activity_service import retention_cutoff
+
+        monkeypatch.setattr(settings, "ACTIVITY_RETENTION_MONTHS", 3)
+        assert retention_cutoff(datetime(2026, 2, 17, 9, 30)) == datetime(2025, 11, 1)
+
+        monkeypatch.setattr(settings, "ACTIVITY_RETENTION_MONTHS", 0)
+        assert retention_cutoff(datetime(2026, 2, 17)) is None
+
+    def test_export_rows_jsonl(self, tmp_path):
+        """Test archived rows round-trip through gzip JSON Lines."""
+        import gzip
+        import json
+
+        from app.jobs.activity_jobs import export_rows_jsonl, partition_name
+
+        path = tmp_path / "archive" / f"{partition_name(datetime(2025, 1, 1))}.jsonl.gz"
+        rows = [{"id": 1, "created_at": datetime(2025, 1, 5)}, {"id": 2, "created_at": None}]
+        assert export_rows_jsonl(iter(rows), str(path)) == 2
+
+        assert path.name == "activity_events_y2025m01.jsonl.gz"
+        with gzip.open(path, "rt") as archive:
+            assert [json.loads(line) for line in archive] == [
+                {"id": 1, "created_at": "2025-01-05 00:00:00"},
+                {"id": 2, "created_at": None},
+            ]
+
+    def test_partition_jobs_skip_unpartitioned_databases(self, db):
+        """Test partition maintenance is a no-op outside partitioned Postgres."""
+        from app.jobs.activity_jobs import archive_activity_partitions, ensure_activity_partitions
+
+        assert ensure_activity_partitions(db) == []
+        assert archive_activity_partitions(db) == []
+
+
+class TestFeedPageCache:
+    """Test the feed page cache directly."""
+
+    def test_stale_render_is_not_stored(self):
+        """Test a page rendered before an invalidation is discarded."""
+        from app.services.feed_cache import InMemoryFeedPageCache
+
+        cache = InMemoryFeedPageCache(max_entries=2, ttl_seconds=60)
+        _, generation = cache.get("team:1", 20)
+        cache.invalidate(["team:1"])
+        cache.set("team:1", 20, b"stale", generation)
+        assert cache.get("team:1", 20)[0] is None
+
+        _, generation = cache.get("team:1", 20)
+        cache.set("team:1", 20, b"fresh", generation)
+        assert cache.get("team:1", 20)[0] == b"fresh"
+        assert cache.stats()["hit_rate"] == 0.25
+
+    def test_invalidations_reach_caches_sharing_a_broker(self):
+        """Test an invalidation in one worker's cache drops the page in another's."""
+        from app.realtime import InMemoryBroker
+        from app.services.feed_cache import InMemoryFeedPageCache
+
+        broker = InMemoryBroker(queue_size=10, replay_size=10)
+        caches = [InMemoryFeedPageCache(max_entries=2, ttl_seconds=60, broker=broker) for _ in range(2)]
+        for cache in caches:
+            cache.set("public", 20, b"page", cache.get("public", 20)[1])
+
+        caches[0].invalidate(["public"])
+        assert [cache.get("public", 20) for cache in caches] == [(None, 1), (None, 1)]
@@ -0,0 +1,303 @@
+"""Tests for badge endpoints and badge awarding."""
+
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+
+class TestBadgeEngine:
+    """Test set-based badge evaluation."""
+
+    @pytest.fixture
+    def badges(self, db):
+        """Create one badge per requirement type."""
+        from app.models.gamification import Badge
+
+        badges = [
+            Badge(name="First Quest", description="Complete a quest", icon="star",
+                  requirement_type="quest_count", requirement_value=1, xp_bonus=10),
+            Badge(name="Centurion", description="Earn 100 XP", icon="medal",
+                  requirement_type="xp_total", requirement_value=100),
+            Badge(name="Veteran", description="Reach level 5", icon="crown",
+                  requirement_type="level", requirement_value=5),
+        ]
+        db.add_all(badges)
+        db.commit()
+        return badges
+
+    @pytest.fixture
+    def statements(self, db):
+        """Record SQL statements run on the test connection."""
+        from sqlalchemy import event
+
+        executed = []
+
+        def record(conn, cursor, statement, *args):
+            executed.append(statement)
+
+        event.listen(db.get_bind(), "before_cursor_execute", record)
+        yield executed
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+
+    def test_awards_qualifying_badges_once(self, db, test_user, badges):
+        """Test qualifying badges are awarded with their XP bonus and events, and not again."""
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.models.gamification import UserBadge
+        from app.models.quest import Quest, QuestCompletion
+        from app.services.gamification_service import GamificationService
+        from app.services.user_stats_service import UserStatsService
+
+        quest = Quest(title="Quest", description="Do it", xp_reward=0)
+        db.add(quest)
+        db.commit()
+        completion = QuestCompletion(quest_id=quest.id, user_id=test_user.id, xp_earned=0)
+        db.add(completion)
+        db.flush()
+        UserStatsService(db).record_completion(test_user.id, completion.completed_at)
+        test_user.xp = 120
+        db.commit()
+
+        service = GamificationService(db)
+        awarded = service.check_and_award_badges(test_user)
+        assert {badge.name for badge in awarded} == {"First Quest", "Centurion"}
+        assert service.check_and_award_badges(test_user) == []
+
+        assert db.query(UserBadge).filter(UserBadge.user_id == test_user.id).count() == 2
+        db.refresh(test_user)
+        assert test_user.xp == 130
+        events = db.query(ActivityEvent).filter(ActivityEvent.event_type == ActivityType.BADGE_EARNED)
+        assert events.count() == 2
+
+    def test_recheck_runs_two_statements(self, db, test_user, badges, statements):
+        """Test a cached catalog check costs one stats query and one insert."""
+        from app.services.gamification_service import GamificationService
+
+        test_user.xp = 150
+        db.commit()
+        service = GamificationService(db)
+        service.check_and_award_badges(test_user)
+
+        statements.clear()
+        assert service.check_and_award_badges(test_user) == []
+        assert len(statements) == 2
+
+    def test_catalog_is_cached_until_invalidated(self, db, test_user, badges):
+        """Test badge changes apply after the catalog is invalidated."""
+        from app.services.badge_catalog import badge_catalog
+        from app.services.gamification_service import GamificationService
+
+        service = GamificationService(db)
+        assert service.check_and_award_badges(test_user) == []
+
+        badges[1].requirement_value = 0
+        db.commit()
+        assert service.check_and_award_badges(test_user) == []
+
+        badge_catalog.invalidate()
+        assert [badge.name for badge in service.check_and_award_badges(test_user)] == ["Centurion"]
+
+    def test_threshold_index_returns_only_crossed_badges(self, db, test_user):
+        """Test a stat change only yields badges with thresholds in (previous, current]."""
+        from app.models.gamification import Badge
+        from app.services.badge_catalog import UserStats, badge_catalog
+        from app.services.gamification_service import GamificationService
+
+        db.add_all([
+            Badge(name=f"XP {value}", description="XP milestone", icon="xp",
+                  requirement_type="xp_total", requirement_value=value)
+            for value in (2000, 100, 1000, 500)
+        ])
+        test_user.xp = 1100
+        db.commit()
+
+        current = UserStats(quest_count=0, xp=1100, level=4)
+        everything = badge_catalog.eligible(db, current)
+        assert [badge.requirement_value for badge in everything] == [100, 500, 1000]
+        crossed = badge_catalog.eligible(db, current, UserStats(quest_count=0, xp=900, level=4))
+        assert [badge.requirement_value for badge in crossed] == [1000]
+
+        previous = UserStats(quest_count=0, xp=900, level=4)
+        awarded = GamificationService(db).check_and_award_badges(test_user, previous, current)
+        assert [badge.name for badge in awarded] == ["XP 1000"]
+
+    def test_concurrent_windows_each_award_their_threshold(self, db, test_user):
+        """Test a window read in its own transaction still awards its badge after later changes."""
+        from app.models.gamification import Badge, UserBadge
+        from app.services.badge_catalog import stat_window
+        from app.services.gamification_service import GamificationService
+        from app.services.user_stats_service import UserStatsService
+
+        db.add(Badge(name="Five Quests", description="Complete five quests", icon="five",
+                     requirement_type="quest_count", requirement_value=5))
+        db.commit()
+
+        stats = UserStatsService(db)
+        counts = [stats.record_completion(test_user.id, datetime.utcnow()) for _ in range(6)]
+        db.commit()
+        assert counts == [1, 2, 3, 4, 5, 6]
+
+        # The completion that reached 6 checks (5, 6] and finds nothing ...
+        service = GamificationService(db)
+        assert service.check_and_award_badges(test_user, *stat_window(quest_counts=(5, 6))) == []
+        # ... but the one that reached 5 checks (4, 5], even though stats now read 6
+        awarded = service.check_and_award_badges(test_user, *stat_window(quest_counts=(4, 5)))
+        assert [badge.name for badge in awarded] == ["Five Quests"]
+        assert db.query(UserBadge).count() == 1
+
+    def test_bonus_xp_crossing_a_threshold_awards_that_badge(self, db, test_user):
+        """Test a badge bonus that crosses an xp_total threshold earns that badge too."""
+        from app.models.gamification import Badge
+        from app.services.badge_catalog import stat_window
+        from app.services.gamification_service import GamificationService
+
+        db.add_all([
+            Badge(name="First Quest", description="Complete a quest", icon="star",
+                  requirement_type="quest_count", requirement_value=1, xp_bonus=50),
+            Badge(name="Forty", description="Earn 40 XP", icon="xp",
+                  requirement_type="xp_total", requirement_value=40),
+        ])
+        db.commit()
+
+        awarded = GamificationService(db).check_and_award_badges(test_user, *stat_window(quest_counts=(0, 1)))
+        assert [badge.name for badge in awarded] == ["First Quest", "Forty"]
+
+    def test_quest_completion_awards_badge(self, client, auth_headers, db, test_user, badges):
+        """Test completing a first quest earns the quest_count badge in the background."""
+        from app.models.gamification import UserBadge
+        from app.models.quest import Quest
+
+        quest = Quest(title="Starter", description="Begin", xp_reward=5)
+        db.add(quest)
+        db.commit()
+
+        response = client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        earned = db.query(UserBadge).filter(UserBadge.user_id == test_user.id).all()
+        assert [user_badge.badge.name for user_badge in earned] == ["First Quest"]
+
+
+class TestBadgeBackfill:
+    """Test chunked badge backfills."""
+
+    @pytest.fixture
+    def users(self, db):
+        """Create users with 50, 150, 250 and 350 XP; the last one inactive."""
+        from app.models.user import User
+
+        users = [
+            User(email=f"user{index}@example.com", username=f"user{index}",
+                 hashed_password="x", xp=xp, is_active=index < 3)
+            for index, xp in enumerate((50, 150, 250, 350))
+        ]
+        db.add_all(users)
+        db.commit()
+        return users
+
+    @pytest.fixture
+    def badge(self, db):
+        """Create an XP badge with a bonus."""
+        from app.models.gamification import Badge
+
+        badge = Badge(name="Centurion", description="Earn 100 XP", icon="medal",
+                      requirement_type="xp_total", requirement_value=100, xp_bonus=10)
+        db.add(badge)
+        db.commit()
+        return badge
+
+    def test_awards_eligible_active_users(self, db, users, badge):
+        """Test a backfill awards badge, bonus XP and events to qualifying active users only."""
+        from app.jobs.badge_jobs import backfill_badge
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.models.gamification import UserBadge
+        from app.models.job_checkpoint import JobCheckpoint
+
+        chunks = []
+        result = backfill_badge(db, badge.id, chunk_size=2, progress=chunks.append)
+        assert result.awarded == 2
+        assert [chunk.scanned for chunk in chunks] == [2, 4]
+
+        earned = {user_badge.user_id for user_badge in db.query(UserBadge)}
+        assert earned == {users[1].id, users[2].id}
+        for user in users:
+            db.refresh(user)
+        assert [user.xp for user in users] == [50, 160, 260, 350]
+        events = db.query(ActivityEvent).filter(ActivityEvent.event_type == ActivityType.BADGE_EARNED)
+        assert events.count() == 2
+        assert db.query(JobCheckpoint).count() == 0
+
+        assert backfill_badge(db, badge.id).awarded == 0
+        assert db.query(UserBadge).count() == 2
+
+    def test_bonus_xp_levels_up_and_crosses_badges(self, db, users, badge):
+        """Test bonus XP writes level-up events and earns the badges it crosses."""
+        from app.jobs.badge_jobs import backfill_badge
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.models.gamification import Badge, UserBadge
+
+        crossed = Badge(name="XP 255", description="Earn 255 XP", icon="xp",
+                        requirement_type="xp_total", requirement_value=255)
+        db.add(crossed)
+        db.commit()
+
+        backfill_badge(db, badge.id)
+
+        level_ups = db.query(ActivityEvent).filter(ActivityEvent.event_type == ActivityType.USER_LEVEL_UP)
+        assert {event.user_id for event in level_ups} == {users[1].id, users[2].id}
+        holders = db.query(UserBadge.user_id).filter(UserBadge.badge_id == crossed.id)
+        assert [user_id for user_id, in holders] == [users[2].id]
+
+    def test_resumes_from_checkpoint(self, db, users, badge):
+        """Test an interrupted backfill skips users before its checkpoint."""
+        from app.jobs.badge_jobs import backfill_badge
+        from app.models.gamification import UserBadge
+        from app.models.job_checkpoint import JobCheckpoint
+
+        db.add(JobCheckpoint(name=f"badge_backfill:{badge.id}", position=users[1].id, processed=2, affected=0))
+        db.commit()
+
+        result = backfill_badge(db, badge.id)
+        assert (result.scanned, result.awarded) == (4, 1)
+        assert [user_badge.user_id for user_badge in db.query(UserBadge)] == [users[2].id]
+
+        assert backfill_badge(db, badge.id, restart=True).awarded == 1
+
+    def test_skips_inactive_and_unknown_badges(self, db, users, badge):
+        """Test inactive badges and unknown requirement types are skipped without stopping the run."""
+        from app.jobs.badge_jobs import backfill_badge, backfill_badges
+        from app.models.gamification import Badge, UserBadge
+
+        retired = Badge(name="Retired", description="No longer awarded", icon="box",
+                        requirement_type="xp_total", requirement_value=100, is_active=False)
+        mystery = Badge(name="Mystery", description="Unknown rule", icon="question",
+                        requirement_type="streak_days", requirement_value=3)
+        db.add_all([retired, mystery])
+        db.commit()
+
+        assert backfill_badge(db, retired.id).awarded == 0
+        results = backfill_badges(db, [mystery.id, badge.id])
+        assert [(result.badge_id, result.awarded) for result in results] == [(mystery.id, 0), (badge.id, 2)]
+        assert {user_badge.badge_id for user_badge in db.query(UserBadge)} == {badge.id}
+
+    def test_unknown_badge(self, db):
+        """Test backfilling a missing badge raises."""
+        from app.jobs.badge_jobs import backfill_badge
+
+        with pytest.raises(ValueError):
+            backfill_badge(db, 999)
+
+
+class TestBadgeEndpoints:
+    """Test badge endpoints."""
+
+    def test_list_badges(self, client, db):
+        """Test listing active badges."""
+        from app.models.gamification import Badge
+
+        db.add(Badge(name="Listed", description="Shown", icon="eye",
+                     requirement_type="level", requirement_value=2))
+        db.commit()
+
+        response = client.get("/api/v1/badges/")
+        assert response.status_code == status.HTTP_200_OK
+        assert [badge["name"] for badge in response.json()] == ["Listed"]
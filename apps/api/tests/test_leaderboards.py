@@ -0,0 +1,283 @@
+"""Tests for leaderboard endpoints."""
+
+import random
+
+import pytest
+from fastapi import status
+
+from app.jobs.scheduler import CoalescingScheduler
+from app.services.rank_index import RankIndex
+
+
+class TestRankIndex:
+    """Test the in-process rank index."""
+
+    def test_matches_sorted_order(self):
+        """Test ranks stay consistent with a full sort through random updates."""
+        rng = random.Random(42)
+        index = RankIndex()
+        scores = {user_id: rng.randint(0, 500) for user_id in range(1, 301)}
+        index.load(scores.items())
+
+        for _ in range(1000):
+            user_id = rng.randint(1, 350)
+            if rng.random() < 0.1 and user_id in scores:
+                index.remove(user_id)
+                del scores[user_id]
+            else:
+                scores[user_id] = rng.randint(0, 500)
+                index.update(user_id, scores[user_id])
+
+        expected = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        assert len(index) == len(expected)
+        assert index.top(len(expected)) == [
+            (rank, user_id, xp) for rank, (user_id, xp) in enumerate(expected, start=1)
+        ]
+        for rank, (user_id, _) in enumerate(expected, start=1):
+            assert index.rank_of(user_id) == rank
+
+    def test_unknown_user_has_no_rank(self):
+        """Test users missing from the index are unranked."""
+        index = RankIndex()
+        index.load([(1, 10)])
+        assert index.rank_of(2) is None
+        assert index.top(5) == [(1, 1, 10)]
+        assert index.around(2, radius=3) == []
+
+    def test_around_clamps_at_edges(self):
+        """Test the rank window is clipped at the top of the board."""
+        index = RankIndex()
+        index.load((user_id, 100 - user_id) for user_id in range(1, 11))
+        assert index.around(2, radius=2) == [(1, 1, 99), (2, 2, 98), (3, 3, 97), (4, 4, 96)]
+        assert [rank for rank, _, _ in index.around(10, radius=1)] == [9, 10]
+
+
+class TestCoalescingScheduler:
+    """Test the debounced job scheduler."""
+
+    def test_marks_coalesce_into_one_run(self, db):
+        """Test repeated marks collapse into a single batched run."""
+        runs = []
+        scheduler = CoalescingScheduler(
+            lambda session, dirty: runs.append(dict(dirty)),
+            debounce_seconds=3600,
+            max_delay_seconds=3600,
+            session_factory=lambda: db,
+        )
+        for _ in range(50):
+            scheduler.mark("global")
+        scheduler.mark("weekly")
+
+        assert runs == []
+        scheduler.flush()
+        assert runs == [{"global": 50, "weekly": 1}]
+
+        scheduler.flush()
+        assert len(runs) == 1
+
+
+class TestLeaderboardEndpoints:
+    """Test leaderboard endpoints."""
+
+    @pytest.fixture
+    def ranked_users(self, db):
+        """Create users with distinct XP totals."""
+        from app.models.user import User
+
+        users = []
+        for idx, xp in enumerate([300, 100, 500, 200]):
+            user = User(
+                email=f"player{idx}@example.com",
+                username=f"player{idx}",
+                hashed_password="not-a-real-hash",
+                xp=xp,
+            )
+            db.add(user)
+            users.append(user)
+        db.commit()
+        return users
+
+    def test_global_leaderboard(self, client, ranked_users):
+        """Test global leaderboard is ordered by XP."""
+        response = client.get("/api/v1/leaderboards/global")
+        assert response.status_code == status.HTTP_200_OK
+        entries = response.json()["entries"]
+        assert [e["xp"] for e in entries] == [500, 300, 200, 100]
+        assert [e["rank"] for e in entries] == [1, 2, 3, 4]
+
+    def test_global_rank(self, client, ranked_users):
+        """Test looking up a single user's global rank."""
+        response = client.get(f"/api/v1/leaderboards/global/rank/{ranked_users[3].id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["rank"] == 3
+
+    def test_global_leaderboard_around(self, client, ranked_users):
+        """Test the window around a user includes exact neighbouring ranks."""
+        response = client.get(
+            f"/api/v1/leaderboards/global/around/{ranked_users[3].id}",
+            params={"radius": 1},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        entries = response.json()["entries"]
+        assert [(e["rank"], e["xp"]) for e in entries] == [(2, 300), (3, 200), (4, 100)]
+
+    def test_rank_follows_xp_changes(self, client, auth_headers, ranked_users, db):
+        """Test completing a quest moves the user in the index."""
+        from app.models.quest import Quest
+
+        quest = Quest(title="Big Quest", description="Lots of XP", xp_reward=1000)
+        db.add(quest)
+        db.commit()
+
+        client.get("/api/v1/leaderboards/global")
+        client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+
+        response = client.get("/api/v1/leaderboards/global")
+        assert response.json()["entries"][0]["username"] == "testuser"
+
+    def test_period_leaderboards_use_rollups(self, client, auth_headers, db):
+        """Test quest completions feed the weekly and monthly rollups."""
+        from app.models.quest import Quest
+
+        quest = Quest(title="Weekly Quest", description="Earn some XP", xp_reward=40)
+        db.add(quest)
+        db.commit()
+
+        client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+
+        for board in ("weekly", "monthly"):
+            response = client.get(f"/api/v1/leaderboards/{board}")
+            assert response.status_code == status.HTTP_200_OK
+            entries = response.json()["entries"]
+            assert [(e["username"], e["xp"]) for e in entries] == [("testuser", 40)]
+
+    def test_rebuild_period_xp(self, db, test_user):
+        """Test the backfill rebuilds rollups from completion history."""
+        from app.models.quest import Quest, QuestCompletion
+        from app.services.leaderboard_service import LeaderboardService
+
+        quest = Quest(title="Old Quest", description="Done before rollups", xp_reward=15, is_repeatable=True)
+        db.add(quest)
+        db.commit()
+        db.add_all([
+            QuestCompletion(quest_id=quest.id, user_id=test_user.id, xp_earned=15, is_repeatable=True),
+            QuestCompletion(quest_id=quest.id, user_id=test_user.id, xp_earned=15, is_repeatable=True),
+        ])
+        db.commit()
+
+        service = LeaderboardService(db)
+        assert service.rebuild_period_xp() == 2
+        entries, _ = service.get_weekly_leaderboard()
+        assert [(e.user_id, e.xp) for e in entries] == [(test_user.id, 30)]
+        entries, _ = service.get_monthly_leaderboard()
+        assert [(e.user_id, e.xp) for e in entries] == [(test_user.id, 30)]
+
+    def test_snapshot_read_through(self, client, ranked_users, db):
+        """Test a cold board read caches a snapshot that later reads serve."""
+        from app.models.leaderboard import LeaderboardEntry, LeaderboardType
+        from app.models.team import Team, TeamMember
+
+        team = Team(name="Snap Team", slug="snap-team")
+        db.add(team)
+        db.commit()
+        db.add_all([TeamMember(team_id=team.id, user_id=u.id) for u in ranked_users[:2]])
+        db.commit()
+
+        response = client.get(f"/api/v1/leaderboards/team/{team.id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert "X-Computed-At" in response.headers
+        cached = (
+            db.query(LeaderboardEntry)
+            .filter(
+                LeaderboardEntry.leaderboard_type == LeaderboardType.TEAM,
+                LeaderboardEntry.scope_id == team.id,
+            )
+            .count()
+        )
+        assert cached == 2
+
+        etag = response.headers["ETag"]
+        response = client.get(
+            f"/api/v1/leaderboards/team/{team.id}",
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_empty_board_is_cached(self, client, db, monkeypatch):
+        """Test an empty board is cached as an empty snapshot rather than recomputed."""
+        from app.models.leaderboard import LeaderboardType
+        from app.models.team import Team
+        from app.services.leaderboard_service import LeaderboardService
+
+        team = Team(name="Empty Team", slug="empty-team")
+        db.add(team)
+        db.commit()
+
+        response = client.get(f"/api/v1/leaderboards/team/{team.id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["entries"] == []
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached board was recomputed")
+
+        monkeypatch.setattr(LeaderboardService, "compute_leaderboard", fail)
+        snapshot = LeaderboardService(db).get_cached_leaderboard(LeaderboardType.TEAM, scope_id=team.id)
+        assert snapshot.entries == []
+        assert snapshot.computed_at.isoformat() == response.headers["X-Computed-At"]
+
+    def test_completion_marks_affected_boards(self, client, auth_headers, test_user, db):
+        """Test a completion schedules only the boards its XP can move."""
+        from app.jobs.gamification_jobs import leaderboard_refresh_scheduler
+        from app.models.leaderboard import LeaderboardEntry, LeaderboardType
+        from app.models.project import Project
+        from app.models.quest import Quest
+
+        project = Project(name="Board Project", slug="board-project", owner_id=test_user.id)
+        db.add(project)
+        db.commit()
+        quest = Quest(title="Project Quest", description="Scoped", xp_reward=30, project_id=project.id)
+        db.add(quest)
+        db.commit()
+
+        client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+
+        assert set(leaderboard_refresh_scheduler.pending) == {
+            (LeaderboardType.GLOBAL, None),
+            (LeaderboardType.WEEKLY, None),
+            (LeaderboardType.MONTHLY, None),
+            (LeaderboardType.PROJECT, project.id),
+        }
+
+        leaderboard_refresh_scheduler.flush()
+        db.expire_all()
+        cached = db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.leaderboard_type == LeaderboardType.PROJECT,
+            LeaderboardEntry.scope_id == project.id,
+        ).all()
+        assert [(e.user_id, e.xp) for e in cached] == [(test_user.id, 30)]
+
+    def test_precompute_scoped_leaderboards(self, db, ranked_users):
+        """Test all team boards are ranked and cached in one pass."""
+        from app.jobs.gamification_jobs import recalculate_leaderboards
+        from app.models.team import Team, TeamMember
+        from app.services.leaderboard_service import LeaderboardService
+        from app.models.leaderboard import LeaderboardType
+
+        teams = [Team(name="Red", slug="red"), Team(name="Blue", slug="blue")]
+        db.add_all(teams)
+        db.commit()
+        db.add_all([
+            TeamMember(team_id=teams[0].id, user_id=ranked_users[0].id),
+            TeamMember(team_id=teams[0].id, user_id=ranked_users[2].id),
+            TeamMember(team_id=teams[1].id, user_id=ranked_users[1].id),
+            TeamMember(team_id=teams[1].id, user_id=ranked_users[3].id),
+        ])
+        db.commit()
+
+        recalculate_leaderboards(db)
+
+        service = LeaderboardService(db)
+        red = service.get_snapshot(LeaderboardType.TEAM, scope_id=teams[0].id)
+        blue = service.get_snapshot(LeaderboardType.TEAM, scope_id=teams[1].id)
+        assert [(e.rank, e.xp) for e in red.entries] == [(1, 500), (2, 300)]
+        assert [(e.rank, e.xp) for e in blue.entries] == [(1, 200), (2, 100)]
@@ -0,0 +1,90 @@
+"""Tests for realtime notification endpoints."""
+
+import pytest
+from fastapi import status
+from starlette.websockets import WebSocketDisconnect
+
+
+class TestNotificationSocket:
+    """Test the WebSocket notification channel."""
+
+    @pytest.fixture
+    def token(self, auth_headers):
+        """Access token for the test user."""
+        return auth_headers["Authorization"].split()[1]
+
+    def _connect(self, client, token):
+        return client.websocket_connect(f"/api/v1/notifications/ws?token={token}")
+
+    def test_rejects_missing_or_bad_token(self, client):
+        """Test unauthenticated sockets are closed before accept."""
+        for url in ("/api/v1/notifications/ws", "/api/v1/notifications/ws?token=nope"):
+            with pytest.raises(WebSocketDisconnect) as exc:
+                with client.websocket_connect(url):
+                    pass
+            assert exc.value.code == status.WS_1008_POLICY_VIOLATION
+
+    def test_pushes_xp_and_level_up(self, client, db, test_user, token):
+        """Test XP and level-up notifications reach the user's socket."""
+        from app.services.user_service import UserService
+
+        with self._connect(client, token) as websocket:
+            # A pong proves the subscription is registered
+            websocket.send_text("ping")
+            assert websocket.receive_json() == {"topic": "pong"}
+
+            UserService(db).add_xp(test_user, 150)
+
+            xp_frame = websocket.receive_json()
+            assert xp_frame["topic"] == "xp_gained"
+            assert xp_frame["data"] == {"xp": 150, "total_xp": 150, "level": 2}
+            level_frame = websocket.receive_json()
+            assert level_frame["topic"] == "level_up"
+            assert level_frame["data"] == {"level": 2, "previous_level": 1}
+
+    def test_pushes_rank_change_to_both_users(self, client, db, test_user, token):
+        """Test overtaking a user notifies the climber and the overtaken user."""
+        from app.core.security import create_access_token
+        from app.models.user import User
+        from app.services.leaderboard_service import LeaderboardService
+        from app.services.user_service import UserService
+
+        rival = User(email="rival@example.com", username="rival", hashed_password="x", xp=100)
+        db.add(rival)
+        db.commit()
+        LeaderboardService(db).load_rank_index()
+
+        with self._connect(client, token) as websocket, \
+                self._connect(client, create_access_token(rival.id)) as rival_websocket:
+            for socket in (websocket, rival_websocket):
+                socket.send_text("ping")
+                socket.receive_json()
+
+            UserService(db).add_xp(test_user, 200)
+
+            frames = [websocket.receive_json() for _ in range(3)]
+            rank_frame = next(f for f in frames if f["topic"] == "rank_change")
+            assert rank_frame["data"] == {"rank": 1, "previous_rank": 2}
+
+            rival_frame = rival_websocket.receive_json()
+            assert rival_frame["topic"] == "rank_change"
+            assert rival_frame["data"] == {"rank": 2, "previous_rank": 1, "overtaken_by": test_user.id}
+
+    def test_metrics_count_connections(self, client, token):
+        """Test the metrics endpoint reports open sockets."""
+        with self._connect(client, token) as websocket:
+            websocket.send_text("ping")
+            websocket.receive_json()
+
+            data = client.get("/metrics").json()
+            assert data["connections"]["websocket"]["active"] >= 1
+            assert data["broker_subscribers"] >= 1
+
+    def test_skips_users_with_no_listener(self, db, test_user):
+        """Test notifications for offline users are neither published nor buffered."""
+        from app.realtime import get_broker, notification_channel
+        from app.services.user_service import UserService
+
+        UserService(db).add_xp(test_user, 150)
+
+        assert get_broker()._history.get(notification_channel(test_user.id)) is None
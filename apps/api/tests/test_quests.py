@@ -121,3 +121,97 @@ class TestQuestEndpoints:
         data = response.json()
         assert data["title"] == "New Quest"
         assert data["xp_reward"] == 50
+
+    def test_complete_quest_commits_once(self, client, auth_headers, test_quest, test_user, db):
+        """Test completion, XP, level-up and activity are written in one transaction."""
+        from sqlalchemy import event
+
+        from app.models.activity import ActivityEvent, ActivityType
+
+        test_quest.xp_reward = 150
+        db.commit()
+
+        commits = []
+        count_commit = commits.append
+        event.listen(db, "after_commit", count_commit)
+        try:
+            response = client.post(
+                f"/api/v1/quests/{test_quest.id}/complete",
+                headers=auth_headers,
+            )
+        finally:
+            event.remove(db, "after_commit", count_commit)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(commits) == 1
+
+        db.refresh(test_user)
+        assert (test_user.xp, test_user.level) == (150, 2)
+        event_types = {e.event_type for e in db.query(ActivityEvent).filter(ActivityEvent.user_id == test_user.id)}
+        assert event_types == {ActivityType.QUEST_COMPLETED, ActivityType.USER_LEVEL_UP}
+
+    def test_xp_increment_is_atomic(self, db, test_user):
+        """Test XP is added to the stored total, not to a stale in-memory copy."""
+        from sqlalchemy import update
+
+        from app.models.user import User
+        from app.services.user_service import UserService
+
+        # Another transaction adds XP after test_user was loaded
+        db.execute(update(User.__table__).where(User.id == test_user.id).values(xp=400, level=3))
+        db.commit()
+        db.refresh(test_user)
+        test_user.xp = 0
+
+        change = UserService(db).apply_xp(test_user, 10)
+        db.commit()
+        assert (change.total_xp, change.previous_level, change.level) == (410, 3, 3)
+        assert not change.leveled_up
+        db.refresh(test_user)
+        assert test_user.xp == 410
+
+    def test_duplicate_completion_rejected_by_index(self, db, test_quest, test_user):
+        """Test a second one-off completion is rejected without awarding XP again."""
+        from app.models.quest import QuestCompletion
+        from app.services.quest_service import QuestService
+
+        service = QuestService(db)
+        service.complete_quest(test_quest, test_user)
+        with pytest.raises(ValueError):
+            service.complete_quest(test_quest, test_user)
+
+        db.refresh(test_user)
+        assert test_user.xp == 25
+        assert db.query(QuestCompletion).filter(QuestCompletion.user_id == test_user.id).count() == 1
+
+    def test_idempotency_key_replays_response(self, client, auth_headers, test_quest, test_user, db):
+        """Test a retried request with the same key replays the original response."""
+        test_quest.is_repeatable = True
+        db.commit()
+        url = f"/api/v1/quests/{test_quest.id}/complete"
+        headers = {**auth_headers, "Idempotency-Key": "retry-1"}
+
+        first = client.post(url, headers=headers)
+        retry = client.post(url, headers=headers)
+        assert first.status_code == retry.status_code == status.HTTP_200_OK
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+
+        db.refresh(test_user)
+        assert test_user.xp == 25
+
+        # A new key is a new completion of the repeatable quest
+        response = client.post(url, headers={**auth_headers, "Idempotency-Key": "retry-2"})
+        assert response.json()["id"] != first.json()["id"]
+
+    def test_idempotency_key_reused_for_other_request(self, client, auth_headers, test_quest, db):
+        """Test reusing a key for a different quest is rejected."""
+        from app.models.quest import Quest
+
+        other = Quest(title="Other Quest", description="Another one", xp_reward=5)
+        db.add(other)
+        db.commit()
+        headers = {**auth_headers, "Idempotency-Key": "reused"}
+
+        client.post(f"/api/v1/quests/{test_quest.id}/complete", headers=headers)
+        response = client.post(f"/api/v1/quests/{other.id}/complete", headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
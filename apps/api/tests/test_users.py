@@ -48,3 +48,174 @@ class TestUserEndpoints:
         """Test getting non-existent user fails."""
         response = client.get("/api/v1/users/99999")
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestXPLedger:
+    """Test the XP ledger and balance materialization."""
+
+    def test_awards_are_recorded_in_ledger(self, db, test_user):
+        """Test every XP award appends an applied ledger entry with its source."""
+        from app.models.xp_ledger import XPLedgerEntry, XPSource
+        from app.services.user_service import UserService
+        from app.services.xp_ledger_service import XPLedgerService
+
+        service = UserService(db)
+        service.add_xp(test_user, 30, XPSource.BADGE, 7)
+        service.add_xp(test_user, -5)
+
+        entries = db.query(XPLedgerEntry).order_by(XPLedgerEntry.id).all()
+        assert [(e.delta, e.source_type, e.source_id) for e in entries] == [
+            (30, XPSource.BADGE, 7),
+            (-5, XPSource.ADJUSTMENT, None),
+        ]
+        assert all(e.applied_at is not None for e in entries)
+        assert test_user.xp == 25
+        assert XPLedgerService(db).find_mismatches() == []
+
+    def test_async_awards_are_materialized_in_batches(self, db, test_user, monkeypatch):
+        """Test queued awards leave users.xp alone until the aggregator sums them."""
+        from app.core.config import settings
+        from app.jobs.gamification_jobs import materialize_xp_balances
+        from app.models.activity import ActivityEvent, ActivityType
+        from app.services.user_service import UserService
+
+        monkeypatch.setattr(settings, "XP_LEDGER_ASYNC", True)
+        service = UserService(db)
+        for _ in range(3):
+            _, leveled_up = service.add_xp(test_user, 50)
+            assert not leveled_up
+        db.refresh(test_user)
+        assert test_user.xp == 0
+
+        materialize_xp_balances(db)
+        db.refresh(test_user)
+        assert (test_user.xp, test_user.level) == (150, 2)
+        level_ups = db.query(ActivityEvent).filter(ActivityEvent.event_type == ActivityType.USER_LEVEL_UP)
+        assert level_ups.count() == 1
+
+    def test_materialized_xp_awards_badges(self, db, test_user, monkeypatch):
+        """Test XP applied by the aggregator is checked against XP badges."""
+        from app.core.config import settings
+        from app.jobs.gamification_jobs import materialize_xp_balances
+        from app.models.gamification import Badge, UserBadge
+        from app.services.user_service import UserService
+
+        db.add(Badge(name="Centurion", description="Earn 100 XP", icon="medal",
+                     requirement_type="xp_total", requirement_value=100))
+        db.commit()
+        monkeypatch.setattr(settings, "XP_LEDGER_ASYNC", True)
+        UserService(db).add_xp(test_user, 120)
+
+        materialize_xp_balances(db)
+        earned = db.query(UserBadge).filter(UserBadge.user_id == test_user.id).all()
+        assert [user_badge.badge.name for user_badge in earned] == ["Centurion"]
+
+    def test_repair_rebuilds_balances_from_ledger(self, db, test_user):
+        """Test the consistency checker finds and fixes drifted balances."""
+        from app.services.user_service import UserService
+        from app.services.xp_ledger_service import BalanceMismatch, XPLedgerService
+
+        UserService(db).add_xp(test_user, 400)
+        test_user.xp = 999
+        db.commit()
+
+        service = XPLedgerService(db)
+        assert service.find_mismatches() == [BalanceMismatch(test_user.id, 999, 400)]
+        service.repair_balances()
+        db.refresh(test_user)
+        assert (test_user.xp, test_user.level) == (400, 3)
+        assert service.find_mismatches() == []
+
+
+class TestUserStats:
+    """Test the materialized user_stats counters."""
+
+    def test_streak_follows_consecutive_days(self, db, test_user):
+        """Test completions extend, hold and restart the daily streak."""
+        from datetime import datetime
+
+        from app.services.user_stats_service import UserStatsService
+
+        service = UserStatsService(db)
+        for day in (1, 2, 2, 3, 7):
+            service.record_completion(test_user.id, datetime(2026, 3, day, 12))
+        db.commit()
+
+        stats = service.get(test_user.id)
+        assert stats.quest_completions == 5
+        assert (stats.current_streak, stats.longest_streak) == (1, 3)
+        assert stats.streak(datetime(2026, 3, 8).date()) == 1
+        assert stats.streak(datetime(2026, 3, 9).date()) == 0
+
+    def test_writes_keep_counters_in_step(self, client, auth_headers, db, test_user):
+        """Test completing a quest and creating and publishing a project update the stats endpoint."""
+        from app.models.quest import Quest
+
+        quest = Quest(title="Quest", description="Do it", xp_reward=10)
+        db.add(quest)
+        db.commit()
+
+        response = client.post(f"/api/v1/quests/{quest.id}/complete", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        response = client.post(
+            "/api/v1/projects/",
+            json={"name": "Stats", "slug": "stats"},
+            headers=auth_headers,
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        client.post(f"/api/v1/projects/{response.json()['id']}/publish", headers=auth_headers)
+
+        response = client.get(f"/api/v1/users/{test_user.id}/stats")
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert (stats["quest_completions"], stats["projects_created"], stats["projects_published"]) == (1, 1, 1)
+        assert stats["streak"] == 1
+        assert client.get("/api/v1/users/me/stats", headers=auth_headers).json() == stats
+
+    def test_status_updates_adjust_published_count(self, client, auth_headers, db, test_user):
+        """Test publishing or unpublishing through an update, or archiving, moves projects_published."""
+        from app.services.user_stats_service import UserStatsService
+
+        response = client.post(
+            "/api/v1/projects/",
+            json={"name": "Toggle", "slug": "toggle"},
+            headers=auth_headers,
+        )
+        url = f"/api/v1/projects/{response.json()['id']}"
+
+        def published():
+            db.expire_all()
+            return UserStatsService(db).get(test_user.id).projects_published
+
+        client.put(url, json={"status": "published"}, headers=auth_headers)
+        assert published() == 1
+        client.put(url, json={"name": "Still published"}, headers=auth_headers)
+        assert published() == 1
+        client.put(url, json={"status": "draft"}, headers=auth_headers)
+        assert published() == 0
+        client.put(url, json={"status": "published"}, headers=auth_headers)
+        client.delete(url, headers=auth_headers)
+        assert published() == 0
+        assert UserStatsService(db).repair() == []
+
+    def test_stats_of_unknown_user(self, client):
+        """Test the stats endpoint 404s for a missing user."""
+        response = client.get("/api/v1/users/99999/stats")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_repair_rebuilds_drifted_rows(self, db, test_user):
+        """Test repair recounts from source tables and only rewrites rows that differ."""
+        from app.models.quest import Quest, QuestCompletion
+        from app.services.user_stats_service import UserStatsService
+
+        quest = Quest(title="Quest", description="Do it", xp_reward=0)
+        db.add(quest)
+        db.commit()
+        db.add(QuestCompletion(quest_id=quest.id, user_id=test_user.id, xp_earned=0))
+        db.commit()
+
+        service = UserStatsService(db)
+        assert service.repair() == [test_user.id]
+        stats = service.get(test_user.id)
+        assert (stats.quest_completions, stats.current_streak, stats.longest_streak) == (1, 1, 1)
+        assert service.repair() == []
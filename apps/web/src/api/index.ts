@@ -114,8 +114,11 @@ export const questsApi = {
     return response.data;
   },
 
-  complete: async (id: number): Promise<QuestCompletion> => {
-    const response = await api.post<QuestCompletion>(`/quests/${id}/complete`);
+  // Pass the same idempotencyKey when retrying so the quest is only completed once
+  complete: async (id: number, idempotencyKey: string = crypto.randomUUID()): Promise<QuestCompletion> => {
+    const response = await api.post<QuestCompletion>(`/quests/${id}/complete`, undefined, {
+      headers: { 'Idempotency-Key': idempotencyKey },
+    });
     return response.data;
   },
 
@@ -163,19 +166,30 @@ export const leaderboardsApi = {
 
 // Activity API
 export const activityApi = {
-  getFeed: async (page = 1, perPage = 20): Promise<ActivityFeedResponse> => {
+  getFeed: async (page = 1, perPage = 20, cursor?: string): Promise<ActivityFeedResponse> => {
     const response = await api.get<ActivityFeedResponse>('/activity/', {
-      params: { page, per_page: perPage },
+      params: { page, per_page: perPage, cursor },
     });
     return response.data;
   },
 
-  getMyActivity: async (page = 1, perPage = 20): Promise<ActivityFeedResponse> => {
+  getMyActivity: async (page = 1, perPage = 20, cursor?: string): Promise<ActivityFeedResponse> => {
     const response = await api.get<ActivityFeedResponse>('/activity/my-activity', {
-      params: { page, per_page: perPage },
+      params: { page, per_page: perPage, cursor },
+    });
+    return response.data;
+  },
+
+  getHome: async (page = 1, perPage = 20, cursor?: string): Promise<ActivityFeedResponse> => {
+    const response = await api.get<ActivityFeedResponse>('/activity/home', {
+      params: { page, per_page: perPage, cursor },
     });
     return response.data;
   },
+
+  // Server-Sent Events URL for live activity, e.g. scope 'team:42'
+  streamUrl: (scope = 'public'): string =>
+    `${api.defaults.baseURL}/activity/stream?scope=${encodeURIComponent(scope)}`,
 };
 
 // Badges API
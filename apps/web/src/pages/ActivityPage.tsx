@@ -1,4 +1,5 @@
-import { useQuery } from '@tanstack/react-query';
+import { useEffect } from 'react';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { activityApi } from '../api';
 import { Card, EmptyState } from '../components/Card';
 import { Badge } from '../components/Badge';
@@ -12,7 +13,7 @@ import {
   Zap,
   Award,
 } from 'lucide-react';
-import type { ActivityEvent, ActivityType } from '../types';
+import type { ActivityEvent, ActivityFeedResponse, ActivityType } from '../types';
 
 const activityIcons: Record<ActivityType, React.ReactNode> = {
   user_registered: <Star className="w-4 h-4" />,
@@ -95,6 +96,24 @@ export default function ActivityPage() {
     queryFn: () => activityApi.getFeed(1, 50),
   });
 
+  // Prepend live events as they happen
+  const queryClient = useQueryClient();
+  useEffect(() => {
+    const source = new EventSource(activityApi.streamUrl());
+    source.addEventListener('activity', (event) => {
+      const activity: ActivityEvent = JSON.parse((event as MessageEvent).data);
+      queryClient.setQueryData<ActivityFeedResponse>(['activity'], (feed) =>
+        feed && !feed.items.some((item) => item.id === activity.id)
+          ? { ...feed, items: [activity, ...feed.items] }
+          : feed
+      );
+    });
+    source.addEventListener('resync', () => {
+      queryClient.invalidateQueries({ queryKey: ['activity'] });
+    });
+    return () => source.close();
+  }, [queryClient]);
+
   return (
     <div className="space-y-6">
       {/* Header */}
@@ -212,10 +212,11 @@ export interface ActivityEvent {
 
 export interface ActivityFeedResponse {
   items: ActivityEvent[];
-  total: number;
+  total: number | null;
   page: number;
   per_page: number;
   has_more: boolean;
+  next_cursor: string | null;
 }
 
 // API Error type